@@ -0,0 +1,42 @@
+# -*- coding: UTF-8 -*-
+"""
+Micro-benchmark: cost of creating captcha and solution objects with and without type checks
+
+Usage (from the project root): python -m benchmarks.bench_construction [number]
+"""
+
+import sys
+import timeit
+
+from unicaps._captcha import HCaptcha, RecaptchaV2
+from unicaps._captcha.base import trusted_mode
+from unicaps._captcha.funcaptcha import FunCaptchaSolution
+from unicaps._captcha.recaptcha_v2 import RecaptchaV2Solution
+
+CASES = {
+    'RecaptchaV2Solution(token)': lambda: RecaptchaV2Solution('token'),
+    'FunCaptchaSolution(token)': lambda: FunCaptchaSolution('token'),
+    'RecaptchaV2(site_key, page_url)': lambda: RecaptchaV2('site-key', 'https://example.com'),
+    'HCaptcha(site_key, page_url, ...)': lambda: HCaptcha('site-key', 'https://example.com',
+                                                          is_invisible=True, api_domain='x.com'),
+}
+
+
+def _measure(func, number: int) -> float:
+    """ Best of 5 runs, ns per call """
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e9
+
+
+def main(number: int = 100000) -> None:
+    """ Print the results """
+
+    print(f"{'case':<36}{'checked, ns':>14}{'trusted, ns':>14}{'speedup':>10}")
+    for name, func in CASES.items():
+        checked = _measure(func, number)
+        with trusted_mode():
+            trusted = _measure(func, number)
+        print(f"{name:<36}{checked:>14.0f}{trusted:>14.0f}{checked / trusted:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
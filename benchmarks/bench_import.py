@@ -0,0 +1,38 @@
+# -*- coding: UTF-8 -*-
+"""
+Startup benchmark: time of "import unicaps" measured by "python -X importtime"
+
+Usage (from the project root): python -m benchmarks.bench_import [number of top modules]
+"""
+
+import subprocess
+import sys
+from typing import Dict
+
+
+def get_import_times(statement: str = 'import unicaps') -> Dict[str, int]:
+    """ Cumulative import time (in microseconds) of every module imported by the statement """
+
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            stderr=subprocess.PIPE, check=True, universal_newlines=True).stderr
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+def main(number: int = 15) -> None:
+    """ Print the results """
+
+    times = get_import_times()
+    print(f"import unicaps: {times['unicaps'] / 1000:.1f} ms, {len(times)} modules")
+    print(f"{'module':<52}{'cumulative, ms':>16}")
+    for module, cumulative in sorted(times.items(), key=lambda item: -item[1])[:number]:
+        print(f"{module:<52}{cumulative / 1000:>16.1f}")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
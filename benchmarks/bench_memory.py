@@ -0,0 +1,75 @@
+# -*- coding: UTF-8 -*-
+"""
+Memory benchmark: size of stored SolvedCaptcha objects
+
+Usage (from the project root): python -m benchmarks.bench_memory [number]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from unicaps._captcha import ImageCaptcha, RecaptchaV2
+from unicaps._captcha.base import trusted_mode
+from unicaps._captcha.image import ImageCaptchaSolution
+from unicaps._captcha.recaptcha_v2 import RecaptchaV2Solution
+from unicaps._service.base import CaptchaTask, SolvedCaptcha
+
+IMAGE = b'\x89PNG\r\n\x1a\n' + b'\x00' * 4096
+
+
+class _Service:
+    """ Stand-in of a service: only the result options are used """
+
+    def __init__(self, release_results: bool = False, detach_results: bool = False):
+        self.release_results = release_results
+        self.detach_results = detach_results
+
+
+def _create_results(service, number: int, image: bool) -> list:
+    results = []
+    for i in range(number):
+        if image:
+            # every image is a separate object, like the downloaded ones
+            captcha = ImageCaptcha(IMAGE + i.to_bytes(4, 'big'))
+            solution = ImageCaptchaSolution('text')
+        else:
+            captcha = RecaptchaV2('site-key', 'https://example.com')
+            solution = RecaptchaV2Solution('token')
+
+        task = CaptchaTask(service, captcha, str(i))
+        task._result = (solution, None, {})  # pylint: disable=protected-access
+        start_time = time.monotonic_ns()
+        results.append(SolvedCaptcha(task, solution, start_time, start_time, cost=0.001))
+    return results
+
+
+def _measure(service, number: int, image: bool) -> float:
+    """ Bytes per result """
+
+    tracemalloc.start()
+    with trusted_mode():
+        results = _create_results(service, number, image)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return size / number
+
+
+def main(number: int = 1000000) -> None:
+    """ Print the results """
+
+    modes = {
+        'default': _Service(),
+        'release_payload': _Service(release_results=True),
+        'release_payload + detach': _Service(release_results=True, detach_results=True),
+    }
+    print(f"{number} results")
+    print(f"{'mode':<28}{'RecaptchaV2, B':>16}{'ImageCaptcha, B':>18}")
+    for name, service in modes.items():
+        print(f"{name:<28}{_measure(service, number, False):>16.0f}"
+              f"{_measure(service, number, True):>18.0f}")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
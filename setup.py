@@ -14,6 +14,11 @@ setuptools.setup(
     url="https://github.com/sergey-scat/unicaps",
     packages=setuptools.find_packages(),
     install_requires=["httpx>=0.22.0", "enforce-typing>=1.0.0"],
+    extras_require={
+        "http2": ["httpx[http2]>=0.22.0"],
+        "images": ["Pillow>=8.0.0"],
+        "tracing": ["opentelemetry-api>=1.0.0"]
+    },
     classifiers=[
         "Development Status :: 5 - Production/Stable",
         "Intended Audience :: Developers",
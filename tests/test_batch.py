@@ -0,0 +1,106 @@
+# -*- coding: UTF-8 -*-
+"""
+CaptchaBatch tests
+"""
+
+import threading
+from concurrent.futures import wait
+from unittest import mock
+
+import pytest
+
+from unicaps import CaptchaSolver
+from unicaps._captcha import RecaptchaV2
+from unicaps._service.poller import ThreadTaskPoller
+from unicaps.exceptions import BadInputDataError
+
+
+def _response(data):
+    response = mock.Mock()
+    response.json = lambda: data
+    return response
+
+
+@pytest.fixture
+def solver():
+    solver = CaptchaSolver('2captcha.com', 'test')
+    service = solver._service
+    service._thread_poller = ThreadTaskPoller(service, tick=0.01)
+    for settings in service.settings.values():
+        settings.polling_delay = 0
+        settings.polling_interval = 0.05
+        settings.solution_timeout = 5
+    yield solver
+    solver.close()
+
+
+def _mock_transport(solver, solved_ids):
+    requests = []
+    lock = threading.Lock()
+
+    def make_request(request_data, request=None):
+        with lock:
+            requests.append(request_data)
+
+        if request_data['url'].endswith('/in.php'):
+            if request_data['data']['googlekey'] == 'bad':
+                return _response(dict(status=0, request='ERROR_GOOGLEKEY'))
+            return _response(dict(status=1, request=request_data['data']['pageurl']))
+
+        params = request_data['params']
+        ids = params['ids'].split(',') if 'ids' in params else [params['id']]
+        answers = [f'token{i}' if i in solved_ids else 'CAPCHA_NOT_READY' for i in ids]
+        if len(answers) == 1 and answers[0] == 'CAPCHA_NOT_READY':
+            return _response(dict(status=0, request='CAPCHA_NOT_READY'))
+        return _response(dict(status=1, request='|'.join(answers)))
+
+    solver._service._transport._make_request = make_request
+    return requests
+
+
+def test_batch_submit(solver):
+    requests = _mock_transport(solver, solved_ids={str(i) for i in range(10)})
+
+    with solver.batch(max_workers=4) as batch:
+        futures = [batch.submit(RecaptchaV2('key', str(i))) for i in range(10)]
+        futures.append(batch.submit(RecaptchaV2('bad', '10')))
+
+    assert [future.result().solution.token for future in futures[:10]] == \
+        [f'token{i}' for i in range(10)]
+    assert isinstance(futures[10].exception(), BadInputDataError)
+
+    # the tasks are checked in batches, the solved ones are fetched one by one (with the cost)
+    poll_requests = [r for r in requests if r['url'].endswith('/res.php')]
+    batch_requests = [r for r in poll_requests if 'ids' in r['params']]
+    assert len(batch_requests) < 10
+    assert len(poll_requests) - len(batch_requests) == 10
+
+
+def test_batch_cancel_all(solver):
+    _mock_transport(solver, solved_ids=set())
+
+    batch = solver.batch()
+    futures = [batch.submit(RecaptchaV2('key', str(i))) for i in range(5)]
+    wait(futures, timeout=0.2)
+
+    assert batch.cancel_all() == 5
+    assert all(future.cancelled() for future in futures)
+    batch.shutdown()
+    assert batch.pending_count == 0
+    assert solver._service._thread_poller.pending_count == 0
+
+
+def test_batch_coalescing(solver):
+    solved_ids = set()
+    requests = _mock_transport(solver, solved_ids)
+    solver.enable_coalescing(tokens=True)
+
+    with solver.batch(max_workers=3) as batch:
+        futures = [batch.submit(RecaptchaV2('key', '1')) for _ in range(3)]
+        wait(futures, timeout=0.2)
+        solved_ids.add('1')
+
+    # the identical CAPTCHAs share a single task
+    assert [r['url'].endswith('/in.php') for r in requests].count(True) == 1
+    assert all(future.result() is futures[0].result() for future in futures)
+    assert solver._service.single_flight.shared_count == 2
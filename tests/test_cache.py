@@ -0,0 +1,172 @@
+# -*- coding: UTF-8 -*-
+"""
+Solution cache tests
+"""
+
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+from unicaps import (AsyncCaptchaSolver, CaptchaSolver, CaptchaSolvingService,
+                     RoutedCaptchaSolver)
+from unicaps._captcha.image import ImageCaptchaSolution
+from unicaps._service import cache as cache_module
+from unicaps.cache import MemorySolutionCache, SQLiteSolutionCache
+from unicaps.captcha import ImageCaptcha, RecaptchaV2, TextCaptcha
+from unicaps.common import CaptchaCharType
+
+PNG_IMAGE = b'\x89PNG\r\n\x1a\n' + b'\x00' * 32
+
+
+def _mock_solving(service, requests, is_async=False):
+    """ Every image is solved as "text" """
+
+    def make_request(request_data, request=None):
+        requests.append(request_data)
+        response = Mock()
+        response.json = lambda: dict(status=1, request='1' if 'body' in request_data.get(
+            'data', {}) else 'text')
+        return response
+
+    async def make_request_async(request_data, request=None):
+        return make_request(request_data, request)
+
+    if is_async:
+        service._transport._make_request_async = make_request_async
+    else:
+        service._transport._make_request = make_request
+    for settings in service.settings.values():
+        settings.polling_delay = 0
+
+
+def test_fingerprint():
+    fingerprint = ImageCaptcha(PNG_IMAGE).get_fingerprint()
+
+    assert fingerprint == ImageCaptcha(memoryview(PNG_IMAGE)).get_fingerprint()
+    assert fingerprint != ImageCaptcha(PNG_IMAGE + b'\x00').get_fingerprint()
+    assert fingerprint != ImageCaptcha(PNG_IMAGE,
+                                       char_type=CaptchaCharType.NUMERIC).get_fingerprint()
+    assert TextCaptcha('text').get_fingerprint() != TextCaptcha('text2').get_fingerprint()
+    recaptcha_fingerprint = RecaptchaV2('key', 'url').get_fingerprint()
+    assert recaptcha_fingerprint != RecaptchaV2('key', 'url2').get_fingerprint()
+    # token CAPTCHAs are never cached
+    assert not RecaptchaV2.SOLUTION_REUSABLE
+
+
+def test_memory_cache(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+    cache = MemorySolutionCache(max_size=2, ttl=10)
+
+    cache.set('1', ImageCaptchaSolution('one'))
+    cache.set('2', ImageCaptchaSolution('two'))
+    assert cache.get('1').text == 'one'
+    # the least recently used one is evicted
+    cache.set('3', ImageCaptchaSolution('three'))
+    assert cache.get('2') is None
+    assert len(cache) == 2
+
+    now[0] = 10
+    assert cache.get('1') is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    with pytest.raises(ValueError):
+        MemorySolutionCache(max_size=0)
+
+
+def test_sqlite_cache(tmp_path, monkeypatch):
+    path = tmp_path / 'cache.sqlite'
+    with SQLiteSolutionCache(path, max_size=2) as cache:
+        cache.set('1', ImageCaptchaSolution('one'))
+        cache.set('2', ImageCaptchaSolution('two'))
+
+    # the solutions are kept on disk
+    with SQLiteSolutionCache(path, max_size=2, ttl=10) as cache:
+        assert cache.get('1') == ImageCaptchaSolution('one')
+        cache.set('3', ImageCaptchaSolution('three'))
+        assert cache.get('2') is None
+        assert len(cache) == 2
+
+        cache.delete('1')
+        assert cache.get('1') is None
+
+        now = cache_module.time.time()
+        monkeypatch.setattr(cache_module.time, 'time', lambda: now + 10)
+        assert cache.get('3') is None
+        assert len(cache) == 0
+
+
+def test_solver_cache():
+    requests = []
+    with CaptchaSolver('2captcha.com', 'test') as solver, MemorySolutionCache() as cache:
+        solver.set_solution_cache(cache)
+        _mock_solving(solver._service, requests)
+
+        solved = solver.solve_image_captcha(PNG_IMAGE)
+        assert not solved.cached
+        assert len(requests) == 2
+
+        cached = solver.solve_image_captcha(PNG_IMAGE)
+        assert cached.cached
+        assert cached.solution.text == 'text'
+        assert cached.cost == 0.0
+        assert cached.solving_time < 0.01
+        assert len(requests) == 2
+
+        # different options - different CAPTCHA
+        solver.solve_image_captcha(PNG_IMAGE, char_type=CaptchaCharType.NUMERIC)
+        assert len(requests) == 4
+
+        # a bad solution is evicted without a request for the cached one
+        assert cached.report_bad()
+        assert len(requests) == 4
+        assert not solver.solve_image_captcha(PNG_IMAGE).cached
+
+
+def test_solve_many_cache():
+    requests = []
+    with CaptchaSolver('2captcha.com', 'test') as solver, MemorySolutionCache() as cache:
+        solver.set_solution_cache(cache)
+        _mock_solving(solver._service, requests)
+
+        solved = solver.solve_image_captcha(PNG_IMAGE)
+        results = list(solver.solve_many([ImageCaptcha(PNG_IMAGE) for _ in range(2)]))
+
+        assert all(result.cached for result in results)
+        assert all(result.solution == solved.solution for result in results)
+        assert len(requests) == 2
+
+
+def test_solver_cache_async():
+    requests = []
+
+    async def solve():
+        solver = AsyncCaptchaSolver('2captcha.com', 'test')
+        solver.set_solution_cache(MemorySolutionCache())
+        _mock_solving(solver._service, requests, is_async=True)
+        try:
+            return [await solver.solve_image_captcha(PNG_IMAGE) for _ in range(2)]
+        finally:
+            await solver.close()
+
+    solved, cached = asyncio.run(solve())
+
+    assert not solved.cached
+    assert cached.cached
+    assert cached.solution == solved.solution
+    assert len(requests) == 2
+
+
+def test_router_cache():
+    requests = []
+    cache = MemorySolutionCache()
+    with RoutedCaptchaSolver({'2captcha.com': 'test'}) as solver:
+        solver.set_solution_cache(cache)
+        _mock_solving(solver._service.services[CaptchaSolvingService.TWOCAPTCHA], requests)
+
+        solved = solver.solve_image_captcha(PNG_IMAGE)
+        assert solver.solve_image_captcha(PNG_IMAGE).cached
+
+        # the solution reported as bad is evicted
+        solved.report_bad()
+        assert len(cache) == 0
@@ -1,7 +1,16 @@
 # -*- coding: UTF-8 -*-
 
-from unicaps._captcha import CaptchaType
-from unicaps._captcha.base import BaseCaptcha, BaseCaptchaSolution
+from dataclasses import dataclass
+
+import pytest
+
+from unicaps import CaptchaSolver
+from unicaps._captcha import (CAPTCHA_REGISTRY, CaptchaRegistry, CaptchaType, ImageCaptcha,
+                              RecaptchaV2)
+from unicaps._captcha.base import (BaseCaptcha, BaseCaptchaSolution, is_trusted_mode,
+                                   set_trusted_mode, trusted_mode)
+from unicaps._captcha.image import ImageCaptchaSolution
+from unicaps._captcha.recaptcha_v2 import RecaptchaV2Solution
 
 
 def test_captcha_class_base(captcha_class):
@@ -67,3 +76,71 @@ def test_captchasolution_obj_get_string(captcha_class):
     solution_obj = solution_class(*field_values)
 
     assert str(solution_obj) == '\n'.join(str(v) for v in field_values)
+
+
+def test_captcha_registry():
+    """
+    Checks registering of custom CAPTCHA classes.
+    """
+    @dataclass
+    class CustomImage(ImageCaptcha):
+        extra: str = ''
+
+    @dataclass
+    class CustomImageResult(ImageCaptchaSolution):
+        score: float = 0.0
+
+    registry = CaptchaRegistry()
+    with pytest.raises(ValueError):
+        registry.get_classes(CaptchaType.IMAGE)
+
+    registry.register(CaptchaType.IMAGE, CustomImage, CustomImageResult)
+    assert CaptchaType.IMAGE in registry
+    assert registry.get_classes(CaptchaType.IMAGE) == (CustomImage, CustomImageResult)
+    assert registry.get_captcha_info(CustomImage) == (CaptchaType.IMAGE, CustomImageResult)
+    assert registry.get_solution_info(CustomImageResult) == (CaptchaType.IMAGE, CustomImage)
+
+    with pytest.raises(TypeError):
+        registry.register(CaptchaType.IMAGE, CustomImage, CustomImage)
+
+    # unregistered subclasses get the classes of the parent
+    assert CustomImage.get_type() is CaptchaType.IMAGE
+    assert CustomImage.get_solution_class() is ImageCaptchaSolution
+    assert CAPTCHA_REGISTRY.get_classes(CaptchaType.IMAGE) == (ImageCaptcha, ImageCaptchaSolution)
+
+
+def test_trusted_mode():
+    """
+    Checks that the types aren't checked in the trusted mode only.
+    """
+    with pytest.raises(TypeError):
+        RecaptchaV2Solution(1)
+
+    with trusted_mode():
+        assert RecaptchaV2Solution(1).token == 1
+
+    set_trusted_mode(True)
+    try:
+        assert RecaptchaV2('key', 1).page_url == 1
+        with trusted_mode(False):
+            with pytest.raises(TypeError):
+                RecaptchaV2('key', 1)
+    finally:
+        set_trusted_mode(False)
+
+
+def test_trusted_solver():
+    """
+    Checks the trusted mode of the solver.
+    """
+    with CaptchaSolver('2captcha.com', 'test') as solver:
+        with pytest.raises(TypeError):
+            solver._create_captcha(RecaptchaV2, 'key', 1)
+
+    with CaptchaSolver('2captcha.com', 'test', trusted=True) as solver:
+        assert solver._create_captcha(RecaptchaV2, 'key', 1).page_url == 1
+
+        # the responses are parsed in the trusted mode
+        solver._service._transport.make_request = lambda request, *args: is_trusted_mode()
+        assert solver._service._make_request('GetBalance') is True
+    assert not is_trusted_mode()
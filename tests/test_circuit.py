@@ -0,0 +1,212 @@
+# -*- coding: UTF-8 -*-
+"""
+Circuit breaker tests
+"""
+
+import asyncio
+import time
+from unittest.mock import Mock
+
+import pytest
+from unicaps import (AsyncCaptchaSolver, CaptchaSolver, CaptchaSolvingService,
+                     RoutedCaptchaSolver)
+from unicaps._router import FAILOVER_EXCEPTIONS
+from unicaps.captcha import CaptchaType
+from unicaps.circuit import CircuitBreaker, CircuitState
+from unicaps.exceptions import (BadInputDataError, CircuitOpenError, MalformedRequestError,
+                                NetworkError, ServiceTooBusy, UnableToSolveError)
+
+PNG_IMAGE = b'\x89PNG\r\n\x1a\n' + b'\x00' * 32
+IMAGE = CaptchaType.IMAGE
+
+
+def test_circuit_opens():
+    events = []
+    breaker = CircuitBreaker('service', failure_threshold=3, reset_timeout=10,
+                             listener=events.append)
+
+    for _ in range(2):
+        breaker.record(IMAGE, NetworkError())
+    # a success resets the number of failures
+    breaker.record(IMAGE)
+    for _ in range(2):
+        breaker.record(IMAGE, ServiceTooBusy())
+    assert breaker.get_state(IMAGE) is CircuitState.CLOSED
+    assert not breaker.allow(IMAGE, 60)
+
+    breaker.record(IMAGE, ServiceTooBusy())
+    assert breaker.get_state(IMAGE) is CircuitState.OPEN
+    with pytest.raises(CircuitOpenError) as exc_info:
+        breaker.allow(IMAGE, 60)
+    assert 0 < exc_info.value.retry_after <= 10
+
+    # the other CAPTCHA types are not affected
+    assert not breaker.allow(CaptchaType.RECAPTCHAV2, 60)
+
+    assert [(event.service, event.captcha_type, event.old_state, event.new_state, event.failures)
+            for event in events] == [
+        ('service', IMAGE, CircuitState.CLOSED, CircuitState.OPEN, 3)
+    ]
+
+
+def test_circuit_ignores_captcha_errors():
+    breaker = CircuitBreaker(failure_threshold=1)
+
+    breaker.record(IMAGE, BadInputDataError())
+    breaker.record(IMAGE, UnableToSolveError())
+
+    assert breaker.get_state(IMAGE) is CircuitState.CLOSED
+
+
+def test_circuit_half_open():
+    events = []
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05, listener=events.append)
+    breaker.record(IMAGE, NetworkError())
+    time.sleep(0.05)
+
+    # the probe fails
+    assert breaker.allow(IMAGE, 60)
+    with pytest.raises(CircuitOpenError):
+        breaker.record_probe(IMAGE, False)
+    assert breaker.get_state(IMAGE) is CircuitState.OPEN
+    time.sleep(0.05)
+
+    # the probe is OK, a single trial request is allowed
+    assert breaker.allow(IMAGE, 60)
+    breaker.record_probe(IMAGE, True)
+    with pytest.raises(CircuitOpenError):
+        breaker.allow(IMAGE, 60)
+
+    # the trial request failed because of the CAPTCHA
+    breaker.record(IMAGE, BadInputDataError())
+    assert breaker.allow(IMAGE, 60)
+    breaker.record(IMAGE)
+
+    assert breaker.get_state(IMAGE) is CircuitState.CLOSED
+    assert [(event.old_state, event.new_state) for event in events] == [
+        (CircuitState.CLOSED, CircuitState.OPEN),
+        (CircuitState.OPEN, CircuitState.HALF_OPEN),
+        (CircuitState.HALF_OPEN, CircuitState.OPEN),
+        (CircuitState.OPEN, CircuitState.HALF_OPEN),
+        (CircuitState.HALF_OPEN, CircuitState.CLOSED),
+    ]
+
+
+def test_circuit_trial_failure():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=0.05)
+    for _ in range(5):
+        breaker.record(IMAGE, NetworkError())
+    time.sleep(0.05)
+
+    assert breaker.allow(IMAGE, 60)
+    breaker.record(IMAGE, NetworkError())
+
+    assert breaker.get_state(IMAGE) is CircuitState.OPEN
+
+
+def test_circuit_abandoned_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record(IMAGE, NetworkError())
+    time.sleep(0.05)
+
+    assert breaker.allow(IMAGE, 0.05)
+    time.sleep(0.05)
+    # the result of the trial request is not received in time
+    assert breaker.allow(IMAGE, 0.05)
+
+
+def test_circuit_bad_params():
+    with pytest.raises(ValueError):
+        CircuitBreaker(failure_threshold=0)
+    with pytest.raises(ValueError):
+        CircuitBreaker(reset_timeout=0)
+
+
+def _mock_transport(solver, create_responses, poll_responses=None):
+    """ The service returns the responses, the requests are returned """
+
+    requests = []
+
+    def make_request(request_data, request=None):
+        requests.append(request_data)
+        response = Mock()
+        if request_data['url'].endswith('/in.php'):
+            response.json = lambda: create_responses.pop(0)
+        elif request_data['params'].get('action') == 'getbalance':
+            response.json = lambda: dict(status=1, request='1.0')
+        else:
+            response.json = lambda: (poll_responses or [dict(status=1, request='text')]).pop(0)
+        return response
+
+    async def make_request_async(request_data, request=None):
+        return make_request(request_data, request)
+
+    solver._service._transport._make_request = make_request
+    solver._service._transport._make_request_async = make_request_async
+    for settings in solver._service.settings.values():
+        settings.polling_delay = 0
+    return requests
+
+
+def test_solver_circuit_breaker():
+    events = []
+    solver = CaptchaSolver(CaptchaSolvingService.TWOCAPTCHA, 'key')
+    solver.enable_circuit_breaker(failure_threshold=2, reset_timeout=0.05,
+                                  listener=events.append)
+    responses = [dict(status=0, request='ERROR_NO_SLOT_AVAILABLE') for _ in range(2)]
+    requests = _mock_transport(solver, responses + [dict(status=1, request='1')])
+
+    for _ in range(2):
+        with pytest.raises(ServiceTooBusy):
+            solver.solve_image_captcha(PNG_IMAGE)
+    # no requests are sent while the circuit is open
+    with pytest.raises(CircuitOpenError):
+        solver.solve_image_captcha(PNG_IMAGE)
+    assert len(requests) == 2
+
+    time.sleep(0.05)
+    # the status is checked, then the task is created and solved
+    assert solver.solve_image_captcha(PNG_IMAGE).solution.text == 'text'
+    assert requests[2]['params']['action'] == 'getbalance'
+    assert len(requests) == 5
+    assert [event.new_state for event in events] == [
+        CircuitState.OPEN, CircuitState.HALF_OPEN, CircuitState.CLOSED
+    ]
+    assert events[0].service == '2captcha.com'
+
+
+def test_solver_circuit_breaker_async():
+    solver = AsyncCaptchaSolver(CaptchaSolvingService.TWOCAPTCHA, 'key')
+    solver.enable_circuit_breaker(failure_threshold=2)
+    _mock_transport(solver, [dict(status=1, request='1') for _ in range(2)],
+                    [dict(status=0, request='ERROR_WRONG_CAPTCHA_ID') for _ in range(2)])
+
+    async def solve():
+        for _ in range(2):
+            with pytest.raises(MalformedRequestError):
+                await solver.solve_image_captcha(PNG_IMAGE)
+        with pytest.raises(CircuitOpenError):
+            await solver.solve_image_captcha(PNG_IMAGE)
+
+    asyncio.run(solve())
+    assert solver._service.circuit_breaker.get_state(IMAGE) is CircuitState.OPEN
+
+
+def test_solver_circuit_breaker_disabled():
+    solver = CaptchaSolver(CaptchaSolvingService.TWOCAPTCHA, 'key')
+    solver.enable_circuit_breaker()
+    solver.enable_circuit_breaker(False)
+
+    assert solver._service.circuit_breaker is None
+
+
+def test_router_circuit_breaker():
+    solver = RoutedCaptchaSolver({CaptchaSolvingService.TWOCAPTCHA: 'key1',
+                                  CaptchaSolvingService.ANTI_CAPTCHA: 'key2'})
+    solver.enable_circuit_breaker(failure_threshold=3)
+
+    assert CircuitOpenError in FAILOVER_EXCEPTIONS
+    assert {name.value: service.circuit_breaker.service
+            for name, service in solver._service.services.items()} == {
+        '2captcha.com': '2captcha.com', 'anti-captcha.com': 'anti-captcha.com'
+    }
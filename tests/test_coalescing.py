@@ -0,0 +1,188 @@
+# -*- coding: UTF-8 -*-
+"""
+Coalescing of identical CAPTCHAs tests
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+from unicaps import AsyncCaptchaSolver, CaptchaSolver
+from unicaps._service.singleflight import SingleFlight
+from unicaps.captcha import ImageCaptcha, RecaptchaV2
+
+PNG_IMAGE = b'\x89PNG\r\n\x1a\n' + b'\x00' * 32
+
+
+def _mock_solving(solver, solve_time=0.05):
+    """ Replace solving of a CAPTCHA with a delay, return the list of solved CAPTCHAs """
+
+    calls = []
+
+    async def solve_captcha_async(captcha, proxy=None, user_agent=None, cookies=None):
+        calls.append(captcha)
+        await asyncio.sleep(solve_time)
+        return object()
+
+    def solve_captcha(captcha, proxy=None, user_agent=None, cookies=None):
+        calls.append(captcha)
+        time.sleep(solve_time)
+        return object()
+
+    solver._service._solve_captcha_async = solve_captcha_async
+    solver._service._solve_captcha = solve_captcha
+    return calls
+
+
+def _solve_concurrently(solver, captchas, **kwargs):
+    async def solve():
+        return await asyncio.gather(
+            *(solver._service.solve_captcha_async(captcha, **kwargs) for captcha in captchas)
+        )
+
+    return asyncio.run(solve())
+
+
+def test_coalescing_async():
+    solver = AsyncCaptchaSolver('2captcha.com', 'test')
+    solver.enable_coalescing()
+    calls = _mock_solving(solver)
+
+    results = _solve_concurrently(solver, [ImageCaptcha(PNG_IMAGE) for _ in range(5)])
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert solver._service.single_flight.shared_count == 4
+
+    # the next request after the solving is a new one
+    _solve_concurrently(solver, [ImageCaptcha(PNG_IMAGE)])
+    assert len(calls) == 2
+
+
+def test_coalescing_different_params():
+    solver = AsyncCaptchaSolver('2captcha.com', 'test')
+    solver.enable_coalescing()
+    calls = _mock_solving(solver)
+
+    _solve_concurrently(solver, [ImageCaptcha(PNG_IMAGE), ImageCaptcha(PNG_IMAGE + b'\x00')])
+    assert len(calls) == 2
+
+    async def solve():
+        captcha = ImageCaptcha(PNG_IMAGE)
+        await asyncio.gather(solver._service.solve_captcha_async(captcha, user_agent='agent1'),
+                             solver._service.solve_captcha_async(captcha, user_agent='agent2'))
+
+    asyncio.run(solve())
+    assert len(calls) == 4
+
+
+@pytest.mark.parametrize("tokens,tasks", [(False, 3), (True, 1)])
+def test_coalescing_tokens(tokens, tasks):
+    solver = AsyncCaptchaSolver('2captcha.com', 'test')
+    solver.enable_coalescing(tokens=tokens)
+    calls = _mock_solving(solver)
+
+    _solve_concurrently(solver, [RecaptchaV2('key', 'url') for _ in range(3)])
+
+    assert len(calls) == tasks
+
+
+def test_coalescing_disabled():
+    solver = AsyncCaptchaSolver('2captcha.com', 'test')
+    solver.enable_coalescing()
+    solver.enable_coalescing(False)
+    calls = _mock_solving(solver)
+
+    _solve_concurrently(solver, [ImageCaptcha(PNG_IMAGE) for _ in range(2)])
+
+    assert len(calls) == 2
+
+
+def test_coalescing_cancel():
+    single_flight = SingleFlight()
+    started = []
+
+    async def func():
+        started.append(1)
+        await asyncio.sleep(0.1)
+        return 'result'
+
+    async def run():
+        first = asyncio.ensure_future(single_flight.call_async('key', func))
+        second = asyncio.ensure_future(single_flight.call_async('key', func))
+        await asyncio.sleep(0.01)
+
+        # the call goes on while somebody waits for it
+        first.cancel()
+        assert await second == 'result'
+
+        # the call is cancelled if nobody waits for it
+        third = asyncio.ensure_future(single_flight.call_async('key', func))
+        await asyncio.sleep(0.01)
+        call = single_flight._calls['key']
+        third.cancel()
+        await asyncio.sleep(0.01)
+        return call.future.cancelled()
+
+    assert asyncio.run(run())
+    assert len(started) == 2
+
+
+def test_coalescing_future():
+    single_flight = SingleFlight()
+    futures = []
+
+    def func():
+        futures.append(Future())
+        return futures[-1]
+
+    first = single_flight.call_future('key', func)
+    second = single_flight.call_future('key', func)
+    assert len(futures) == 1
+    assert single_flight.shared_count == 1
+
+    # the call goes on while somebody waits for it
+    first.cancel()
+    assert not futures[0].cancelled()
+    futures[0].set_result('result')
+    assert second.result() == 'result'
+
+    # the call is cancelled if nobody waits for it
+    third = single_flight.call_future('key', func)
+    assert len(futures) == 2
+    third.cancel()
+    assert futures[1].cancelled()
+    assert not single_flight._future_calls
+
+
+def test_coalescing_threads():
+    solver = CaptchaSolver('2captcha.com', 'test')
+    solver.enable_coalescing()
+    calls = _mock_solving(solver, solve_time=0.2)
+    barrier = threading.Barrier(4)
+
+    def solve(_):
+        barrier.wait()
+        return solver.solve_image_captcha(PNG_IMAGE)
+
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(solve, range(4)))
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_coalescing_error():
+    single_flight = SingleFlight()
+
+    async def func():
+        await asyncio.sleep(0.01)
+        raise ValueError('error')
+
+    async def run():
+        return await asyncio.gather(*(single_flight.call_async('key', func) for _ in range(2)),
+                                    return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(run()))
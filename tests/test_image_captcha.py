@@ -1,12 +1,23 @@
 # -*- coding: UTF-8 -*-
 
+import asyncio
 import base64
+import importlib.util
+import io
+import os
 import os.path
 import pathlib
+import struct
+from unittest import mock
+from urllib.parse import parse_qs
 
+import httpx
 import pytest
+from unicaps import CaptchaSolver
+from unicaps.cache import MemorySolutionCache
 from unicaps.captcha import ImageCaptcha
-from unicaps.exceptions import BadInputDataError
+from unicaps.exceptions import BadInputDataError, UnicapsException
+from unicaps.preprocessing import ImagePipeline
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
 IMAGE_FILE = os.path.join(DATA_DIR, 'image.jpg')
@@ -49,3 +60,204 @@ def test_bad_image():
     """ Bad image input test """
     with pytest.raises(BadInputDataError):
         ImageCaptcha(image=b'bad_image_data')
+
+
+def test_image_from_memoryview(image_bytes, image_base64):
+    """ Memoryview input test """
+    captcha = ImageCaptcha(image=memoryview(image_bytes))
+    assert image_bytes == captcha.get_image_bytes()
+    assert image_base64 == captcha.get_image_base64()
+
+
+def test_image_from_stream(image_bytes):
+    """ Stream input test """
+    captcha = ImageCaptcha(image=io.BytesIO(image_bytes))
+    assert image_bytes == captcha.get_image_bytes()
+    assert captcha.get_image_file().read() == image_bytes
+
+
+def test_image_path_read_lazily(tmp_path, image_bytes):
+    """ The image file is read when it's needed only """
+    path = tmp_path / 'image.jpg'
+    path.write_bytes(image_bytes[:64])
+    captcha = ImageCaptcha(image=path)
+
+    path.write_bytes(image_bytes)
+    assert captcha._image_bytes is None
+    assert image_bytes == captcha.get_image_bytes()
+
+    image_file = captcha.get_image_file()
+    assert image_file.name == 'captcha.' + captcha.get_image_type()
+    assert image_file.seek(0, os.SEEK_END) == len(image_bytes)
+    assert b''.join(iter(lambda: image_file.read(1000), b'')) == image_bytes
+    # the file is closed at the end and re-opened on the next read
+    image_file.seek(0)
+    assert image_file.read() == image_bytes
+
+
+def test_image_base64_cached(image_bytes, image_base64):
+    """ BASE64 image is encoded once """
+    captcha = ImageCaptcha(image=image_bytes)
+    assert captcha.get_image_base64() == image_base64
+    assert captcha.get_image_base64() is captcha.get_image_base64()
+
+
+JPEG_IMAGE = (b'\xff\xd8' + b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9 +
+              b'\xff\xc0' + struct.pack('>HBHH', 17, 8, 75, 170) + b'\x00' * 12)
+IMAGES = {
+    'png': (b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR' + struct.pack('>II', 170, 75) + b'\x00' * 8,
+            (170, 75)),
+    'jpeg': (JPEG_IMAGE, (170, 75)),
+    'gif': (b'GIF89a' + struct.pack('<HH', 170, 75) + b'\x00' * 16, (170, 75)),
+    'bmp': (b'BM' + b'\x00' * 12 + struct.pack('<Iii', 40, 170, -75) + b'\x00' * 8, (170, 75)),
+    'webp': (b'RIFF\x00\x00\x00\x00WEBPVP8 \x00\x00\x00\x00\x00\x00\x00\x9d\x01\x2a' +
+             struct.pack('<HH', 170, 75) + b'\x00' * 4, (170, 75)),
+    'tiff': (b'II*\x00' + struct.pack('<IH', 8, 2) + struct.pack('<HHII', 256, 3, 1, 170) +
+             struct.pack('<HHII', 257, 4, 1, 75) + b'\x00' * 4, (170, 75)),
+    'avif': (b'\x00\x00\x00\x1cftypavif' + b'\x00' * 16 + b'\x00\x00\x00\x14ispe' +
+             struct.pack('>III', 0, 170, 75), (170, 75)),
+}
+
+
+@pytest.mark.parametrize("image_type", IMAGES)
+def test_image_type_and_size(image_type):
+    """ Image type and size detection test """
+    image, size = IMAGES[image_type]
+    captcha = ImageCaptcha(image=image)
+    assert captcha.get_image_type() == image_type
+    assert captcha.get_image_size() == size
+
+
+@pytest.mark.parametrize("image,size", [
+    (b'RIFF\x00\x00\x00\x00WEBPVP8L\x00\x00\x00\x00\x2f' +
+     struct.pack('<I', 169 | 74 << 14) + b'\x00' * 8, (170, 75)),
+    (b'RIFF\x00\x00\x00\x00WEBPVP8X\x00\x00\x00\x00\x00\x00\x00\x00' +
+     (169).to_bytes(3, 'little') + (74).to_bytes(3, 'little') + b'\x00' * 4, (170, 75)),
+    (b'MM\x00*' + struct.pack('>IH', 8, 2) + struct.pack('>HHIHH', 256, 3, 1, 170, 0) +
+     struct.pack('>HHII', 257, 4, 1, 75) + b'\x00' * 4, (170, 75)),
+])
+def test_image_size_variants(image, size):
+    """ Image size of WebP lossless/extended and big-endian TIFF test """
+    assert ImageCaptcha(image=image).get_image_size() == size
+
+
+def test_image_size_from_path(image_path, tmp_path):
+    """ Image size from the file test (JPEG size far from the beginning) """
+    assert ImageCaptcha(image=image_path).get_image_size() == (170, 75)
+
+    path = tmp_path / 'image.jpg'
+    path.write_bytes(JPEG_IMAGE[:20] + b'\xff\xe1' + struct.pack('>H', 65000) + b'\x00' * 64998 +
+                     JPEG_IMAGE[20:])
+    assert ImageCaptcha(image=path).get_image_size() == (170, 75)
+
+
+def test_image_size_not_found():
+    """ Truncated image test """
+    with pytest.raises(BadInputDataError):
+        ImageCaptcha(image=JPEG_IMAGE[:20]).get_image_size()
+
+
+def test_image_pipeline_without_reencoding(image_bytes):
+    """ Image pipeline enforcing the max file size only """
+    captcha = ImageCaptcha(image=image_bytes)
+    with ImagePipeline(reencode=False) as pipeline:
+        assert pipeline.process(captcha, max_filesize=len(image_bytes)) is captcha
+        with pytest.raises(BadInputDataError):
+            pipeline.process(captcha, max_filesize=len(image_bytes) - 1)
+
+        assert pipeline.stats.images == 2
+        assert pipeline.stats.bytes_in == pipeline.stats.bytes_out == len(image_bytes) * 2
+        assert pipeline.stats.bytes_saved == 0
+
+
+def test_image_pipeline_bad_params(monkeypatch):
+    """ Image pipeline parameters test """
+    with pytest.raises(ValueError):
+        ImagePipeline(reencode=False, grayscale=True)
+
+    monkeypatch.setattr(importlib.util, 'find_spec', lambda name: None)
+    with pytest.raises(UnicapsException):
+        ImagePipeline()
+
+
+def test_image_pipeline_service(image_bytes):
+    """ Image CAPTCHA is processed before upload with the max file size of the service """
+    captcha = ImageCaptcha(image=image_bytes)
+    processed = ImageCaptcha(image=IMAGES['png'][0])
+    pipeline = mock.Mock()
+    pipeline.process.return_value = processed
+    requests = []
+
+    def make_request(request_data, request=None):
+        requests.append(request_data)
+        response = mock.Mock()
+        response.json = lambda: dict(status=1, request='1')
+        return response
+
+    with CaptchaSolver('2captcha.com', 'test') as solver:
+        solver.set_image_pipeline(pipeline)
+        solver._service._transport._make_request = make_request
+        task = solver._service.create_task(captcha)
+
+    pipeline.process.assert_called_once_with(captcha, 100 * 1024)
+    assert task.captcha is processed
+    assert requests[0]['data']['body'] == processed.get_image_base64().decode()
+
+
+def test_image_pipeline_reencoding():
+    """ Image pipeline re-encoding and downscaling the image (requires Pillow) """
+    image_module = pytest.importorskip('PIL.Image')
+    image = image_module.new('RGB', (400, 200), (200, 30, 30))
+    output = io.BytesIO()
+    image.save(output, 'PNG', compress_level=0)
+    captcha = ImageCaptcha(image=output.getvalue())
+
+    with ImagePipeline(grayscale=True, max_dimension=100, max_workers=1) as pipeline:
+        processed = pipeline.process(captcha)
+        assert processed.get_image_size() == (100, 50)
+        assert processed.get_image_type() == 'png'
+        assert pipeline.stats.bytes_saved > 0
+
+        processed = asyncio.run(pipeline.process_async(captcha, max_filesize=100))
+        assert len(processed.get_image_bytes()) <= 100
+
+
+def test_image_path_read_once_per_solving(tmp_path, image_bytes, monkeypatch):
+    """ The image file is read once per solving and read again by the next one """
+    path = tmp_path / 'image.jpg'
+    path.write_bytes(image_bytes)
+    changed_image = image_bytes + b'\x00'
+    uploads = []
+
+    def handler(request):
+        if request.url.path == '/in.php':
+            uploads.append(parse_qs(request.read().decode())['body'][0].encode())
+            return httpx.Response(200, json=dict(status=1, request=str(len(uploads))))
+        return httpx.Response(200, json=dict(status=1, request='text'))
+
+    reads = []
+    read_bytes = pathlib.Path.read_bytes
+    monkeypatch.setattr(pathlib.Path, 'read_bytes',
+                        lambda self: reads.append(self) or read_bytes(self))
+
+    with CaptchaSolver('2captcha.com', 'test') as solver:
+        solver.set_solution_cache(MemorySolutionCache())
+        solver.set_image_pipeline(ImagePipeline(reencode=False))
+        solver._service._transport.session = httpx.Client(transport=httpx.MockTransport(handler))
+        for settings in solver._service.settings.values():
+            settings.polling_delay = 0
+
+        captcha = ImageCaptcha(image=path)
+        solver._service.solve_captcha(captcha)
+        # the fingerprint, the image pipeline and the upload share the bytes
+        assert len(reads) == 1
+        assert uploads[0] == base64.b64encode(image_bytes)
+
+        path.write_bytes(changed_image)
+        solver._service.solve_captcha(captcha)
+        assert len(reads) == 2
+        assert uploads[1] == base64.b64encode(changed_image)
+
+    # outside of solving the file is read every time
+    assert captcha.get_image_base64() == base64.b64encode(changed_image)
+    assert captcha._image_base64 is None
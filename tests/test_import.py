@@ -0,0 +1,81 @@
+# -*- coding: UTF-8 -*-
+"""
+Lazy imports tests
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.bench_import import get_import_times
+
+PROVIDER_MODULES = ('anti_captcha', 'azcaptcha', 'captcha_guru', 'cptch_net', 'deathbycaptcha',
+                    'rucaptcha', 'twocaptcha')
+CAPTCHA_MODULES = ('capy', 'funcaptcha', 'geetest', 'geetest_v4', 'hcaptcha', 'image',
+                   'keycaptcha', 'recaptcha_v2', 'recaptcha_v3', 'text', 'tiktok')
+# max import time of unicaps relative to its HTTP client (it's about 2.5 now)
+IMPORT_TIME_BUDGET = 4
+
+
+def _get_imported_modules(statement: str) -> set:
+    """ Modules loaded after the statement in a fresh interpreter """
+
+    # importlib.import_module() calls aren't reported by "python -X importtime"
+    output = subprocess.run(
+        [sys.executable, '-c', f'{statement}\nimport sys\nprint("\\n".join(sys.modules))'],
+        stdout=subprocess.PIPE, check=True, universal_newlines=True
+    ).stdout
+    return set(output.splitlines())
+
+
+def test_import_time():
+    # the best of several runs, as the machine load adds noise
+    unicaps_time = min(get_import_times('import unicaps')['unicaps'] for _ in range(3))
+    httpx_time = min(get_import_times('import httpx')['httpx'] for _ in range(3))
+
+    assert unicaps_time < IMPORT_TIME_BUDGET * httpx_time
+
+
+def test_import_unicaps():
+    modules = _get_imported_modules('import unicaps')
+
+    for name in PROVIDER_MODULES:
+        assert f'unicaps._service.{name}' not in modules
+    for name in CAPTCHA_MODULES:
+        assert f'unicaps._captcha.{name}' not in modules
+    assert 'concurrent.futures.process' not in modules
+    assert 'sqlite3' not in modules
+    assert 'enforce_typing' not in modules
+
+
+def test_import_provider_on_demand():
+    modules = _get_imported_modules(
+        'from unicaps import CaptchaSolver, CaptchaSolvingService\n'
+        'CaptchaSolver(CaptchaSolvingService.TWOCAPTCHA, "key")'
+    )
+
+    assert 'unicaps._service.twocaptcha' in modules
+    assert 'unicaps._service.anti_captcha' not in modules
+
+
+@pytest.mark.parametrize("statement", [
+    'from unicaps.captcha import RecaptchaV2',
+    'from unicaps._captcha import RecaptchaV2Solution',
+    'from unicaps.captcha import CAPTCHA_REGISTRY, CaptchaType\n'
+    'CAPTCHA_REGISTRY.get_classes(CaptchaType.RECAPTCHAV2)',
+])
+def test_import_captcha_on_demand(statement):
+    modules = _get_imported_modules(statement)
+
+    assert 'unicaps._captcha.recaptcha_v2' in modules
+    assert 'unicaps._captcha.hcaptcha' not in modules
+
+
+def test_lazy_attributes():
+    from unicaps import captcha, _captcha  # pylint: disable=import-outside-toplevel
+
+    assert captcha.RecaptchaV2 is _captcha.RecaptchaV2
+    assert 'RecaptchaV2' in dir(_captcha)
+    with pytest.raises(AttributeError):
+        captcha.Unknown  # pylint: disable=pointless-statement
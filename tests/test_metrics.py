@@ -0,0 +1,178 @@
+# -*- coding: UTF-8 -*-
+"""
+Metrics tests
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from unicaps import (AsyncCaptchaSolver, CaptchaSolver, CaptchaSolvingService,
+                     RoutedCaptchaSolver)
+from unicaps._misc.metrics import ServiceMetrics
+from unicaps._transport.http_transport import StandardHTTPTransport
+from unicaps.captcha import CaptchaType
+from unicaps.exceptions import UnableToSolveError
+from unicaps.metrics import METRICS, PrometheusMetrics
+
+PNG_IMAGE = b'\x89PNG\r\n\x1a\n' + b'\x00' * 32
+LABELS = dict(captcha_type='ImageCaptcha', service='2captcha.com')
+
+
+def test_render():
+    metrics = PrometheusMetrics(buckets=dict(unicaps_polls_per_solution=(3, 1)))
+    metrics.inc('unicaps_tasks_created_total', (('service', 'a"b'),), 2)
+    metrics.inc('unicaps_tasks_in_flight', (('service', 'x'),))
+    metrics.inc('unicaps_tasks_in_flight', (('service', 'x'),), -1)
+    metrics.observe('unicaps_polls_per_solution', (('service', 'x'),), 1)
+    metrics.observe('unicaps_polls_per_solution', (('service', 'x'),), 2)
+    metrics.observe('unicaps_polls_per_solution', (('service', 'x'),), 7)
+
+    assert metrics.render() == (
+        '# HELP unicaps_polls_per_solution Number of requests checking a task for its solution\n'
+        '# TYPE unicaps_polls_per_solution histogram\n'
+        'unicaps_polls_per_solution_bucket{service="x",le="1"} 1\n'
+        'unicaps_polls_per_solution_bucket{service="x",le="3"} 2\n'
+        'unicaps_polls_per_solution_bucket{service="x",le="+Inf"} 3\n'
+        'unicaps_polls_per_solution_sum{service="x"} 10\n'
+        'unicaps_polls_per_solution_count{service="x"} 3\n'
+        '# HELP unicaps_tasks_created_total Tasks created\n'
+        '# TYPE unicaps_tasks_created_total counter\n'
+        'unicaps_tasks_created_total{service="a\\"b"} 2\n'
+        '# HELP unicaps_tasks_in_flight Tasks waiting for the solutions\n'
+        '# TYPE unicaps_tasks_in_flight gauge\n'
+        'unicaps_tasks_in_flight{service="x"} 0\n'
+    )
+
+
+def test_metric_types():
+    assert {metric_type for metric_type, _, _ in METRICS.values()} == {
+        'counter', 'gauge', 'histogram'
+    }
+    assert all((metric_type == 'histogram') == bool(buckets)
+               for metric_type, _, buckets in METRICS.values())
+
+
+def test_service_metrics():
+    metrics = PrometheusMetrics()
+    service_metrics = ServiceMetrics(metrics, '2captcha.com')
+
+    service_metrics.task_created(CaptchaType.IMAGE)
+    service_metrics.wait_started(CaptchaType.IMAGE)
+    service_metrics.wait_finished(CaptchaType.IMAGE, 12.5, 3, 0.001)
+    service_metrics.wait_started(CaptchaType.IMAGE)
+    service_metrics.wait_finished(CaptchaType.IMAGE, 20, 5, None, UnableToSolveError())
+
+    assert metrics.get_value('unicaps_tasks_created_total', **LABELS) == 1
+    assert metrics.get_value('unicaps_tasks_in_flight', **LABELS) == 0
+    assert metrics.get_histogram('unicaps_solve_duration_seconds', **LABELS) == (1, 12.5)
+    assert metrics.get_histogram('unicaps_polls_per_solution', **LABELS) == (1, 3)
+    assert metrics.get_value('unicaps_spend_total', **LABELS) == 0.001
+    assert metrics.get_value('unicaps_errors_total', error='UnableToSolveError', **LABELS) == 1
+
+
+def _get_solver(solver_class, responses):
+    """ 2captcha solver receiving the responses of res.php one by one """
+
+    polls = []
+
+    def handler(request):
+        if request.url.path == '/in.php':
+            return httpx.Response(200, json=dict(status=1, request='1'))
+        polls.append(request)
+        response = responses[min(len(polls), len(responses)) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return httpx.Response(200, json=response)
+
+    solver = solver_class(CaptchaSolvingService.TWOCAPTCHA, 'key',
+                          transport_settings=dict(backoff_factor=0))
+    transport = solver._service._transport
+    transport.session = httpx.Client(transport=httpx.MockTransport(handler))
+    transport.session_async = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    for settings in solver._service.settings.values():
+        settings.polling_delay = 0
+        settings.polling_interval = 0
+    return solver
+
+
+RESPONSES = [dict(status=0, request='CAPCHA_NOT_READY'), httpx.ConnectError('refused'),
+             dict(status=1, request='text')]
+
+
+def _check_metrics(metrics):
+    assert metrics.get_value('unicaps_tasks_created_total', **LABELS) == 1
+    assert metrics.get_value('unicaps_tasks_in_flight', **LABELS) == 0
+    assert metrics.get_histogram('unicaps_solve_duration_seconds', **LABELS)[0] == 1
+    # the retries of a poll are not counted
+    assert metrics.get_histogram('unicaps_polls_per_solution', **LABELS)[1] == 2
+
+    labels = dict(host='2captcha.com', path='/res.php')
+    assert metrics.get_value('unicaps_http_requests_total', status='200', **labels) == 2
+    assert metrics.get_value('unicaps_http_requests_total', status='ConnectError', **labels) == 1
+    assert metrics.get_histogram('unicaps_http_request_duration_seconds', **labels)[0] == 3
+    assert metrics.get_value('unicaps_http_requests_total', host='2captcha.com',
+                             path='/in.php', status='200') == 1
+
+
+def test_solver_metrics():
+    metrics = PrometheusMetrics()
+    solver = _get_solver(CaptchaSolver, RESPONSES)
+    solver.set_metrics(metrics)
+
+    assert solver.solve_image_captcha(PNG_IMAGE).solution.text == 'text'
+    _check_metrics(metrics)
+
+
+def test_solver_metrics_async():
+    metrics = PrometheusMetrics()
+    solver = _get_solver(AsyncCaptchaSolver, RESPONSES)
+    solver.set_metrics(metrics)
+
+    assert asyncio.run(solver.solve_image_captcha(PNG_IMAGE)).solution.text == 'text'
+    _check_metrics(metrics)
+
+
+def test_solver_metrics_errors():
+    metrics = PrometheusMetrics()
+    solver = _get_solver(CaptchaSolver, [dict(status=0, request='ERROR_CAPTCHA_UNSOLVABLE')])
+    solver.set_metrics(metrics)
+
+    with pytest.raises(UnableToSolveError):
+        solver.solve_image_captcha(PNG_IMAGE)
+
+    assert metrics.get_value('unicaps_errors_total', error='UnableToSolveError', **LABELS) == 1
+    assert metrics.get_value('unicaps_tasks_in_flight', **LABELS) == 0
+    assert metrics.get_histogram('unicaps_solve_duration_seconds', **LABELS) == (0, 0.0)
+
+
+def test_solver_metrics_disabled():
+    solver = CaptchaSolver(CaptchaSolvingService.TWOCAPTCHA, 'key')
+    solver.set_metrics(PrometheusMetrics())
+    solver.set_metrics(None)
+
+    assert solver._service.metrics is None
+    assert solver._service._transport.metrics is None
+
+
+def test_router_metrics():
+    metrics = PrometheusMetrics()
+    solver = RoutedCaptchaSolver({CaptchaSolvingService.TWOCAPTCHA: 'key1',
+                                  CaptchaSolvingService.ANTI_CAPTCHA: 'key2'})
+    solver.set_metrics(metrics)
+
+    assert {service.metrics.service for service in solver._service.services.values()} == {
+        '2captcha.com', 'anti-captcha.com'
+    }
+
+
+def test_shared_transport_metrics():
+    transport = StandardHTTPTransport()
+    solver = RoutedCaptchaSolver({CaptchaSolvingService.TWOCAPTCHA: 'key1',
+                                  CaptchaSolvingService.ANTI_CAPTCHA: 'key2'}, transport=transport)
+    solver.set_metrics(PrometheusMetrics())
+
+    # the shared transport is configured by its owner
+    assert transport.metrics is None
+    assert all(service.metrics is not None for service in solver._service.services.values())
+    transport.close()
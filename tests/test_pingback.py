@@ -0,0 +1,185 @@
+# -*- coding: UTF-8 -*-
+"""
+Pingback mode tests
+"""
+
+import asyncio
+import json
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from unittest import mock
+
+import pytest
+
+from unicaps import AsyncCaptchaSolver, CaptchaSolver
+from unicaps._captcha import FunCaptcha, RecaptchaV2
+from unicaps._service.base import CaptchaTask
+from unicaps._service.poller import TaskPoller, ThreadTaskPoller
+from unicaps._transport.pingback import PingbackReceiver
+from unicaps.exceptions import UnableToSolveError, UnicapsException
+
+
+def _response(data):
+    response = mock.Mock()
+    response.json = lambda: data
+    return response
+
+
+def _post(port, data, path='/pingback/secret', content_type='application/x-www-form-urlencoded'):
+    """ Local stand-in of the solving service sending a callback """
+
+    if content_type == 'application/json':
+        body = json.dumps(data).encode()
+    else:
+        body = urllib.parse.urlencode(data).encode()
+
+    request = urllib.request.Request(f'http://127.0.0.1:{port}{path}', data=body,
+                                     headers={'Content-Type': content_type})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+
+
+def _setup(solver, poller):
+    service = solver._service
+    setattr(service, '_poller' if poller is TaskPoller else '_thread_poller',
+            poller(service, tick=0.01))
+    for settings in service.settings.values():
+        settings.polling_delay = 0
+        settings.polling_interval = 0.05
+        settings.pingback_polling_interval = 30
+        settings.solution_timeout = 5
+    solver.enable_pingback('http://example.com/pingback', port=0, token='secret')
+    return solver._pingback_receiver.port
+
+
+def test_pingback_async():
+    solver = AsyncCaptchaSolver('2captcha.com', 'test')
+    port = _setup(solver, TaskPoller)
+    requests = []
+
+    async def make_request(request_data, request=None):
+        requests.append(request_data)
+        return _response(dict(status=1, request='1'))
+
+    solver._service._transport._make_request_async = make_request
+
+    async def solve():
+        loop = asyncio.get_running_loop()
+        task = asyncio.ensure_future(solver.solve_recaptcha_v2('key', 'url'))
+        while not solver._service._poller.pending_count:
+            await asyncio.sleep(0.01)
+
+        status = await loop.run_in_executor(None, _post, port, dict(id='1', code='token'))
+        result = await task
+        await solver.close()
+        return status, result
+
+    status, solved = asyncio.run(solve())
+
+    assert status == 200
+    assert solved.solution.token == 'token'
+    assert requests[0]['data']['pingback'] == 'http://example.com/pingback/secret'
+    # no polling at all
+    assert len(requests) == 1
+
+
+def test_pingback_sync():
+    solver = CaptchaSolver('2captcha.com', 'test')
+    port = _setup(solver, ThreadTaskPoller)
+    requests = []
+
+    def make_request(request_data, request=None):
+        requests.append(request_data)
+        return _response(dict(status=1, request='token|r=eu-west-1', price='0.003'))
+
+    solver._service._transport._make_request = make_request
+    service = solver._service
+    tasks = [CaptchaTask(service, RecaptchaV2('key', 'url'), '1'),
+             CaptchaTask(service, RecaptchaV2('key', 'url'), '2'),
+             CaptchaTask(service, FunCaptcha('key', 'url'), '3')]
+    futures = [service.wait_for_solution_future(task) for task in tasks]
+
+    assert _post(port, dict(id='1', code='token1')) == 200
+    assert _post(port, dict(id='2', code='ERROR_CAPTCHA_UNSOLVABLE'),
+                 content_type='application/json') == 200
+    # FunCaptcha solution isn't a plain string, so the task is checked right away
+    assert _post(port, dict(id='3', code='token')) == 200
+
+    assert futures[0].result(timeout=5)[0].token == 'token1'
+    assert isinstance(futures[1].exception(timeout=5), UnableToSolveError)
+    assert futures[2].result(timeout=5)[0].token == 'token|r=eu-west-1'
+    assert [request['params']['id'] for request in requests] == ['3']
+    solver.close()
+
+
+def test_pingback_solve_sync():
+    """ Plain sync solving waits for the solution sent via pingback """
+
+    solver = CaptchaSolver('2captcha.com', 'test')
+    port = _setup(solver, ThreadTaskPoller)
+    requests = []
+
+    def make_request(request_data, request=None):
+        requests.append(request_data)
+        if request_data['url'].endswith('/in.php'):
+            threading.Timer(0.1, _post, (port, dict(id='1', code='text'))).start()
+        return _response(dict(status=1, request='1'))
+
+    solver._service._transport._make_request = make_request
+
+    solved = solver.solve_image_captcha(b'\x89PNG\r\n\x1a\n' + b'\x00' * 32)
+
+    assert solved.solution.text == 'text'
+    # no polling at all
+    assert len(requests) == 1
+    solver.close()
+
+
+def test_pingback_receiver_bad_requests():
+    handler = mock.Mock()
+    receiver = PingbackReceiver(handler, path='/pingback', token='secret')
+    receiver.start()
+    try:
+        assert _post(receiver.port, dict(code='token')) == 400
+        assert _post(receiver.port, dict(id='1', code='token'), path='/other') == 404
+        # the secret token is missing or wrong
+        assert _post(receiver.port, dict(id='1', code='token'), path='/pingback') == 404
+        assert _post(receiver.port, dict(id='1', code='token'), path='/pingback/other') == 404
+    finally:
+        receiver.close()
+    handler.assert_not_called()
+
+
+def test_pingback_receiver_handler_error():
+    handler = mock.Mock(side_effect=RuntimeError('failed'))
+    receiver = PingbackReceiver(handler, path='/pingback', token='secret')
+    receiver.start()
+    try:
+        assert _post(receiver.port, dict(id='1', code='token')) == 500
+    finally:
+        receiver.close()
+    handler.assert_called_once_with('1', 'token')
+
+
+def test_pingback_random_token():
+    solver = CaptchaSolver('2captcha.com', 'test')
+    solver.enable_pingback('http://example.com:8080/pingback?x=1', port=0)
+    try:
+        url = urllib.parse.urlsplit(solver._service.pingback_url)
+        prefix, token = url.path.rsplit('/', maxsplit=1)
+        assert (url.netloc, prefix, url.query) == ('example.com:8080', '/pingback', 'x=1')
+        assert len(token) >= 16
+        assert solver._pingback_receiver._host == '127.0.0.1'
+    finally:
+        solver.close()
+
+
+def test_pingback_not_supported():
+    with CaptchaSolver('anti-captcha.com', 'test') as solver:
+        with pytest.raises(UnicapsException):
+            solver.enable_pingback('http://example.com/pingback')
@@ -0,0 +1,256 @@
+# -*- coding: UTF-8 -*-
+"""
+Shared task poller tests
+"""
+
+import asyncio
+import importlib
+from unittest import mock
+
+import pytest
+
+from unicaps._captcha import CaptchaType, FunCaptcha, ImageCaptcha, RecaptchaV2
+from unicaps._service.base import AsyncCaptchaTask, Settings
+from unicaps._service.poller import TaskPoller
+from unicaps._service.polling import AdaptivePollingStrategy, PollingStrategy, get_solve_time
+from unicaps._service.twocaptcha import Service
+from unicaps.exceptions import (BadInputDataError, ServiceError, SolutionWaitTimeout,
+                                UnableToSolveError)
+
+PNG_IMAGE = b'\x89PNG\r\n\x1a\n' + b'\x00' * 32
+
+
+def _response(data):
+    response = mock.Mock()
+    response.json = lambda: data
+    return response
+
+
+@pytest.fixture
+def service():
+    service = Service('test')
+    service._poller = TaskPoller(service, tick=0.01)
+    for settings in service.settings.values():
+        settings.polling_delay = 0
+        settings.polling_interval = 0.05
+        settings.solution_timeout = 1
+    return service
+
+
+def _mock_transport(service, responder):
+    requests = []
+
+    async def make_request(request_data, request=None):
+        requests.append(request_data)
+        return _response(responder(request_data, len(requests)))
+
+    service._transport._make_request_async = make_request
+    return requests
+
+
+def _wait_all(service, tasks):
+    async def wait():
+        return await asyncio.gather(
+            *(service.wait_for_solution_async(task) for task in tasks),
+            return_exceptions=True
+        )
+    return asyncio.run(wait())
+
+
+def test_multi_id_poll(service):
+    tasks = [AsyncCaptchaTask(service, RecaptchaV2('key', 'url'), str(i)) for i in range(3)]
+
+    def responder(request_data, count):
+        if 'ids' in request_data['params']:
+            assert request_data['params']['ids'] == '0,1,2'
+            return dict(status=1, request='token0|CAPCHA_NOT_READY|ERROR_CAPTCHA_UNSOLVABLE')
+
+        # the solved task is fetched with its cost, the task left is checked by a single request
+        task_id = request_data['params']['id']
+        price = {'0': '0.002', '1': '0.003'}[task_id]
+        return dict(status=1, request='token' + task_id, price=price)
+
+    requests = _mock_transport(service, responder)
+    results = _wait_all(service, tasks)
+
+    assert results[0][0].token == 'token0'
+    assert results[0][1] == 0.002
+    assert results[1][0].token == 'token1'
+    assert results[1][1] == 0.003
+    assert isinstance(results[2], UnableToSolveError)
+    assert [request['params'].get('id') for request in requests] == [None, '0', '1']
+    assert all(task.is_done() for task in tasks[:2])
+
+
+def test_multi_id_poll_fetch_failed(service):
+    tasks = [AsyncCaptchaTask(service, RecaptchaV2('key', 'url'), str(i)) for i in range(2)]
+
+    def responder(request_data, count):
+        if 'ids' in request_data['params']:
+            return dict(status=1, request='token0|token1')
+        return dict(status=0, request='ERROR_NO_SUCH_CAPCHA_ID')
+
+    _mock_transport(service, responder)
+    results = _wait_all(service, tasks)
+
+    # the solutions of the batch are used without the cost
+    assert [(result[0].token, result[1]) for result in results] == [('token0', None),
+                                                                     ('token1', None)]
+
+
+def test_single_poll_for_image_captcha(service):
+    """ Image answers may contain "|", so they are never checked in a batch """
+    tasks = [AsyncCaptchaTask(service, ImageCaptcha(PNG_IMAGE), str(i)) for i in range(2)]
+
+    def responder(request_data, count):
+        assert request_data['params']['action'] == 'get2'
+        return dict(status=1, request='a|b', price='0.001')
+
+    requests = _mock_transport(service, responder)
+    results = _wait_all(service, tasks)
+
+    assert [(result[0].text, result[1]) for result in results] == [('a|b', 0.001)] * 2
+    assert len(requests) == 2
+
+
+def test_single_poll_for_unsupported_type(service):
+    tasks = [AsyncCaptchaTask(service, FunCaptcha('key', 'url'), str(i)) for i in range(2)]
+
+    def responder(request_data, count):
+        assert request_data['params']['action'] == 'get2'
+        return dict(status=1, request='token|r=eu-west-1', price='0.003')
+
+    requests = _mock_transport(service, responder)
+    results = _wait_all(service, tasks)
+
+    assert [result[0].token for result in results] == ['token|r=eu-west-1'] * 2
+    assert [result[1] for result in results] == [0.003] * 2
+    assert len(requests) == 2
+
+
+def test_polling_delay_is_respected(service):
+    service.settings[CaptchaType.RECAPTCHAV2].polling_delay = 0.2
+    task = AsyncCaptchaTask(service, RecaptchaV2('key', 'url'), '1')
+    poll_times = []
+
+    def responder(request_data, count):
+        poll_times.append(asyncio.get_event_loop().time())
+        return dict(status=1, request='token')
+
+    _mock_transport(service, responder)
+
+    async def wait():
+        start_time = asyncio.get_event_loop().time()
+        await service.wait_for_solution_async(task)
+        return start_time
+
+    start_time = asyncio.run(wait())
+    assert poll_times[0] - start_time >= 0.2
+
+
+def test_solution_timeout(service):
+    service.settings[CaptchaType.RECAPTCHAV2].solution_timeout = 0.1
+    task = AsyncCaptchaTask(service, RecaptchaV2('key', 'url'), '1')
+
+    _mock_transport(service, lambda request_data, count: dict(status=0,
+                                                              request='CAPCHA_NOT_READY'))
+    result, = _wait_all(service, [task])
+
+    assert isinstance(result, SolutionWaitTimeout)
+    assert service._poller.pending_count == 0
+
+
+def test_adaptive_strategy():
+    settings = Settings(polling_delay=5, polling_interval=3)
+    strategy = AdaptivePollingStrategy(percentile=0.5, step=0.2, min_samples=10)
+
+    # not enough samples yet
+    assert strategy.get_first_delay(settings) == 5
+    assert strategy.get_next_interval(settings, 5) == 3
+
+    for solve_time in range(1, 11):
+        strategy.record(solve_time)
+
+    assert strategy.get_first_delay(settings) == 5
+    assert strategy.get_next_interval(settings, 5) == 2
+    # the interval is limited by the settings' polling_interval and the min_interval
+    assert strategy.get_next_interval(Settings(polling_interval=1), 5) == 1
+    assert strategy.get_next_interval(settings, 9.5) == 1
+    # slower than all the learned tasks: backing off up to the polling_interval
+    assert strategy.get_next_interval(settings, 10.5) == 1
+    assert strategy.get_next_interval(settings, 12) == 2
+    assert strategy.get_next_interval(settings, 20) == 3
+
+
+def test_adaptive_strategy_tail_polls():
+    """ A task slower than the learned p-quantile isn't polled more often than the fixed way """
+
+    settings = Settings(polling_delay=10, polling_interval=5)
+    strategy = AdaptivePollingStrategy(percentile=0.5, step=0.15, min_samples=10,
+                                       min_interval=1)
+    for _ in range(20):
+        strategy.record(10)
+
+    def count_polls(polling_strategy, solve_time):
+        elapsed = polling_strategy.get_first_delay(settings)
+        polls = 1
+        while elapsed < solve_time:
+            elapsed += polling_strategy.get_next_interval(settings, elapsed)
+            polls += 1
+        return polls
+
+    fixed_polls = count_polls(PollingStrategy(), 60)
+    assert fixed_polls == 11
+    # 10, 11, 12, 14, 18, then every 5 seconds
+    assert count_polls(strategy, 60) == fixed_polls + 3
+
+
+def test_get_solve_time():
+    assert get_solve_time(10, None, 15) == 5
+    assert get_solve_time(10, 14, 16) == 5
+
+
+def test_adaptive_polling(service):
+    strategy = AdaptivePollingStrategy(min_samples=1, min_interval=0.01)
+    strategy.record(0.1)
+    service.settings[CaptchaType.RECAPTCHAV2].polling_strategy = strategy
+    task = AsyncCaptchaTask(service, RecaptchaV2('key', 'url'), '1')
+    poll_times = []
+
+    def responder(request_data, count):
+        poll_times.append(asyncio.get_event_loop().time())
+        return dict(status=1, request='token')
+
+    _mock_transport(service, responder)
+
+    async def wait():
+        start_time = asyncio.get_event_loop().time()
+        await service.wait_for_solution_async(task)
+        return start_time
+
+    start_time = asyncio.run(wait())
+    # polling_delay is 0, the first check is made when the task is expected to be solved
+    assert poll_times[0] - start_time >= 0.1
+    assert len(strategy._samples) == 2
+
+
+@pytest.mark.parametrize('module_name', ['azcaptcha', 'cptch_net'])
+def test_multi_solution_request_of_2captcha_clones(module_name):
+    """ The shared multi-task request keeps the res.php request and the errors of the service """
+
+    module = importlib.import_module(f'unicaps._service.{module_name}')
+    service = module.Service('test')
+    tasks = [AsyncCaptchaTask(service, RecaptchaV2('key', 'url'), str(i)) for i in range(2)]
+
+    request = module.MultiSolutionRequest(service)
+    request_data = request.prepare(tasks)
+    assert request_data['url'] == service.BASE_URL + '/res.php'
+    assert request_data['params']['ids'] == '0,1'
+    assert 'headers' not in request_data
+
+    results = request.process_response(_response(dict(status=1, request='token|ERROR')))['results']
+    assert results['0']['solution'].token == 'token'
+    if module_name == 'cptch_net':
+        assert isinstance(results['1'], BadInputDataError)
+    else:
+        assert isinstance(results['1'], ServiceError)
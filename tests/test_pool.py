@@ -0,0 +1,169 @@
+# -*- coding: UTF-8 -*-
+"""
+TokenPool tests
+"""
+
+import asyncio
+import time
+
+import pytest
+from unicaps import AsyncCaptchaSolver
+from unicaps._captcha import RecaptchaV2
+from unicaps._captcha.recaptcha_v2 import RecaptchaV2Solution
+from unicaps._service.base import AsyncCaptchaTask, AsyncSolvedCaptcha
+from unicaps.exceptions import ServiceTooBusy, UnicapsException
+from unicaps.pool import TokenPool
+
+CAPTCHA = RecaptchaV2('key', 'url')
+
+
+class _Service:
+    """ Solves every CAPTCHA in solve_time seconds, the tokens are numbered """
+
+    def __init__(self, solve_time: float = 0.05, error: Exception = None):
+        self.solve_time = solve_time
+        self.error = error
+        self.calls = []
+
+    async def solve_captcha_async(self, captcha, proxy=None, user_agent=None, cookies=None):
+        self.calls.append((captcha, proxy, user_agent, cookies))
+        token = str(len(self.calls))
+        start_time = time.monotonic_ns()
+        await asyncio.sleep(self.solve_time)
+        if self.error is not None:
+            raise self.error
+
+        task = AsyncCaptchaTask(self, captcha, token)
+        task._result = (RecaptchaV2Solution(token), 0.002, {})
+        return AsyncSolvedCaptcha(task, task._result[0], start_time, time.monotonic_ns(),
+                                  cost=0.002)
+
+
+def _run(pool_factory, scenario):
+    async def run():
+        async with pool_factory() as pool:
+            return await scenario(pool)
+
+    return asyncio.run(run())
+
+
+def test_pool_warm_up():
+    service = _Service()
+
+    async def scenario(pool):
+        await pool.warm_up(CAPTCHA, size=2)
+        await asyncio.sleep(0.1)
+        assert pool.get_size(CAPTCHA) == 2
+
+        start_time = time.monotonic()
+        token = await pool.get(CAPTCHA)
+        assert time.monotonic() - start_time < 0.01
+        # the token handed out is replaced
+        assert pool.pending_count == 1
+        return pool, token
+
+    pool, token = _run(lambda: TokenPool(service), scenario)
+
+    assert token.solution.token == '2'  # the freshest one
+    assert (pool.stats.hits, pool.stats.misses, pool.stats.solved) == (1, 0, 2)
+
+
+def test_pool_miss():
+    service = _Service()
+
+    async def scenario(pool):
+        tokens = await asyncio.gather(pool.get(CAPTCHA), pool.get(CAPTCHA))
+        return pool, tokens
+
+    pool, tokens = _run(lambda: TokenPool(service), scenario)
+
+    assert sorted(token.solution.token for token in tokens) == ['1', '2']
+    assert pool.stats.misses == 2
+
+
+def test_pool_renews_tokens():
+    service = _Service(solve_time=0.02)
+
+    async def scenario(pool):
+        await pool.warm_up(CAPTCHA, size=1)
+        await asyncio.sleep(0.5)
+        # the replacement may be solved while the old token is still valid
+        assert 1 <= pool.get_size(CAPTCHA) <= 2
+        return (await pool.get(CAPTCHA)).solving_time
+
+    solving_time = _run(lambda: TokenPool(service, token_ttl=0.2, safety_margin=0.05),
+                        scenario)
+
+    # the tokens are renewed before they expire
+    assert len(service.calls) >= 3
+    assert solving_time < 0.2
+
+
+def test_pool_no_tokens_for_sparse_demand():
+    service = _Service()
+
+    async def scenario(pool):
+        await pool.get(CAPTCHA)
+        return pool.pending_count
+
+    # one request a minute, while the tokens are valid for 1 second
+    assert _run(lambda: TokenPool(service, token_ttl=1, safety_margin=0.1), scenario) == 0
+    assert len(service.calls) == 1
+
+
+def test_pool_keys():
+    service = _Service()
+
+    async def scenario(pool):
+        await pool.get(CAPTCHA, user_agent='agent')
+        await pool.get(RecaptchaV2('key', 'url'), user_agent='agent')
+        await pool.get(RecaptchaV2('key', 'url2'), user_agent='agent')
+        return len(pool._entries)
+
+    # equal CAPTCHAs share the tokens
+    assert _run(lambda: TokenPool(service), scenario) == 2
+    assert service.calls[0][2] == 'agent'
+
+
+def test_pool_error():
+    service = _Service(error=ServiceTooBusy('busy'))
+
+    async def scenario(pool):
+        with pytest.raises(ServiceTooBusy):
+            await pool.get(CAPTCHA)
+        return pool
+
+    pool = _run(lambda: TokenPool(service), scenario)
+    assert pool.stats.errors >= 1
+
+
+def test_pool_close():
+    service = _Service(solve_time=10)
+
+    async def scenario():
+        pool = TokenPool(service)
+        waiter = asyncio.ensure_future(pool.get(CAPTCHA))
+        await asyncio.sleep(0.01)
+        await pool.close()
+        with pytest.raises(UnicapsException):
+            await waiter
+        with pytest.raises(UnicapsException):
+            await pool.get(CAPTCHA)
+        return pool
+
+    assert asyncio.run(scenario()).pending_count == 0
+
+
+def test_pool_bad_params():
+    with pytest.raises(ValueError):
+        TokenPool(_Service(), max_size=0)
+    with pytest.raises(ValueError):
+        TokenPool(_Service(), token_ttl=5, safety_margin=10)
+
+
+def test_solver_token_pool():
+    solver = AsyncCaptchaSolver('2captcha.com', 'test')
+    pool = solver.token_pool(max_size=5)
+
+    assert pool._service is solver._service
+    assert pool.max_size == 5
@@ -0,0 +1,215 @@
+# -*- coding: UTF-8 -*-
+"""
+Rate limiter tests
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+import pytest
+from unicaps import CaptchaSolver, CaptchaSolvingService, RoutedCaptchaSolver
+from unicaps._service import ratelimit as ratelimit_module
+from unicaps.exceptions import NetworkError, ServiceTooBusy, TooManyRequestsError
+from unicaps.ratelimit import RateLimit, RateLimiter
+
+
+class _Counter:
+    """ Max number of the concurrent calls """
+
+    def __init__(self):
+        self.current = 0
+        self.max = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.max = max(self.max, self.current)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        with self._lock:
+            self.current -= 1
+
+
+def test_rate():
+    limit = RateLimit(rate=50, max_in_flight=10, burst=1)
+
+    start_time = time.monotonic()
+    for _ in range(6):
+        with limit:
+            pass
+
+    assert time.monotonic() - start_time >= 0.09
+    assert limit.stats.requests == 6
+    assert limit.stats.delayed == 5
+
+
+def test_max_in_flight_threads():
+    limit = RateLimit(rate=1000, max_in_flight=2)
+    counter = _Counter()
+
+    def request(_):
+        with limit, counter:
+            time.sleep(0.02)
+
+    with ThreadPoolExecutor(6) as executor:
+        list(executor.map(request, range(6)))
+
+    assert counter.max == 2
+    assert limit.in_flight == 0
+
+
+def test_max_in_flight_async():
+    limit = RateLimit(rate=1000, max_in_flight=2)
+    counter = _Counter()
+
+    async def request():
+        async with limit:
+            with counter:
+                await asyncio.sleep(0.02)
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(6)))
+
+    asyncio.run(run())
+    assert counter.max == 2
+    assert limit.in_flight == 0
+
+
+def test_shared_by_threads_and_coroutines():
+    limit = RateLimit(rate=1000, max_in_flight=1)
+    counter = _Counter()
+
+    def request():
+        with limit, counter:
+            time.sleep(0.02)
+
+    async def request_async():
+        async with limit:
+            with counter:
+                await asyncio.sleep(0.02)
+
+    async def run():
+        thread = threading.Thread(target=request)
+        async with limit:
+            thread.start()
+            await asyncio.sleep(0.02)
+        # the coroutine waits for the thread
+        await asyncio.gather(request_async(), request_async())
+        thread.join()
+
+    asyncio.run(run())
+    assert counter.max == 1
+
+
+def test_cancelled_waiter():
+    limit = RateLimit(rate=1000, max_in_flight=1)
+
+    async def run():
+        async with limit:
+            waiter = asyncio.ensure_future(limit.acquire_async())
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            await asyncio.sleep(0.01)
+        async with limit:
+            return limit.in_flight
+
+    assert asyncio.run(run()) == 1
+
+
+@pytest.mark.parametrize("exception", [ServiceTooBusy('busy'), TooManyRequestsError('limit')])
+def test_aimd(monkeypatch, exception):
+    limit = RateLimit(rate=10, max_in_flight=8)
+
+    with pytest.raises(type(exception)):
+        with limit:
+            raise exception
+    assert (limit.rate, limit.in_flight_limit) == (5, 4)
+
+    # the overload errors of the concurrent requests cause a single decrease
+    limit.acquire()
+    limit.release(exception)
+    assert (limit.rate, limit.stats.overloads, limit.stats.backoffs) == (5, 2, 1)
+
+    monkeypatch.setattr(ratelimit_module, 'BACKOFF_COOLDOWN', 0)
+    limit.acquire()
+    limit.release(exception)
+    assert (limit.rate, limit.in_flight_limit) == (2.5, 2)
+
+    # the other errors don't change the limits
+    limit.acquire()
+    limit.release(NetworkError())
+    assert (limit.rate, limit.in_flight_limit) == (2.5, 2)
+
+    # the limits are restored by the successful requests
+    for _ in range(100):
+        limit._increase()
+    assert (limit.rate, limit.in_flight_limit) == (10, 8)
+
+
+def test_bad_params():
+    with pytest.raises(ValueError):
+        RateLimit(rate=0, max_in_flight=1)
+    with pytest.raises(ValueError):
+        RateLimiter(max_in_flight=0)
+
+
+def _mock_transport(solver, responses):
+    """ The service returns the responses to the requests creating tasks """
+
+    def make_request(request_data, request=None):
+        response = Mock()
+        if request_data['url'].endswith('/in.php'):
+            response.json = lambda: responses.pop(0)
+        else:
+            response.json = lambda: dict(status=1, request='text')
+        return response
+
+    solver._service._transport._make_request = make_request
+    for settings in solver._service.settings.values():
+        settings.polling_delay = 0
+
+
+def test_solver_rate_limiter():
+    rate_limiter = RateLimiter()
+    solver = CaptchaSolver(CaptchaSolvingService.TWOCAPTCHA, 'key')
+    solver.set_rate_limiter(rate_limiter)
+    _mock_transport(solver, [dict(status=0, request='ERROR_NO_SLOT_AVAILABLE'),
+                             dict(status=1, request='1')])
+
+    with pytest.raises(ServiceTooBusy):
+        solver.solve_image_captcha(b'\x89PNG\r\n\x1a\n' + b'\x00' * 32)
+    assert solver.solve_image_captcha(b'\x89PNG\r\n\x1a\n' + b'\x00' * 32).solution.text == 'text'
+
+    create_limit = rate_limiter.get_limit(solver._service, 'create')
+    poll_limit = rate_limiter.get_limit(solver._service, 'poll')
+    assert (create_limit.stats.requests, create_limit.stats.overloads) == (2, 1)
+    assert create_limit.rate < create_limit.max_rate
+    assert (poll_limit.stats.requests, poll_limit.stats.overloads) == (1, 0)
+
+
+def test_rate_limiter_keys():
+    rate_limiter = RateLimiter()
+    solver1 = CaptchaSolver(CaptchaSolvingService.TWOCAPTCHA, 'key')
+    solver2 = CaptchaSolver(CaptchaSolvingService.TWOCAPTCHA, 'key')
+    solver3 = CaptchaSolver(CaptchaSolvingService.TWOCAPTCHA, 'key2')
+    solver4 = CaptchaSolver(CaptchaSolvingService.ANTI_CAPTCHA, 'key')
+
+    limit = rate_limiter.get_limit(solver1._service)
+    assert rate_limiter.get_limit(solver2._service) is limit
+    assert rate_limiter.get_limit(solver3._service) is not limit
+    assert rate_limiter.get_limit(solver4._service) is not limit
+    assert rate_limiter.get_limit(solver1._service, 'poll') is not limit
+
+
+def test_router_rate_limiter():
+    rate_limiter = RateLimiter()
+    solver = RoutedCaptchaSolver({CaptchaSolvingService.TWOCAPTCHA: 'key1',
+                                  CaptchaSolvingService.ANTI_CAPTCHA: 'key2'})
+    solver.set_rate_limiter(rate_limiter)
+
+    assert all(service.rate_limiter is rate_limiter
+               for service in solver._service.services.values())
@@ -0,0 +1,272 @@
+# -*- coding: UTF-8 -*-
+"""
+RoutedCaptchaSolver tests
+"""
+
+import asyncio
+from concurrent.futures import Future
+from unittest import mock
+
+import pytest
+
+from unicaps import AsyncRoutedCaptchaSolver, CaptchaSolvingService, RoutedCaptchaSolver
+from unicaps._captcha import CaptchaType, RecaptchaV2
+from unicaps._captcha.recaptcha_v2 import RecaptchaV2Solution
+from unicaps._router import HedgingPolicy, Scoreboard
+from unicaps._service.base import AsyncCaptchaTask, CaptchaTask
+from unicaps.exceptions import (CircuitOpenError, LowBalanceError, NetworkError, ServiceTooBusy,
+                                UnableToSolveError, UnicapsException)
+
+TWOCAPTCHA = CaptchaSolvingService.TWOCAPTCHA
+ANTI_CAPTCHA = CaptchaSolvingService.ANTI_CAPTCHA
+RECAPTCHAV2 = CaptchaType.RECAPTCHAV2
+
+
+def test_scoreboard_latency():
+    scoreboard = Scoreboard()
+    for _ in range(10):
+        scoreboard.record_success(TWOCAPTCHA, RECAPTCHAV2, 30)
+        scoreboard.record_success(ANTI_CAPTCHA, RECAPTCHAV2, 20)
+
+    assert scoreboard.rank([TWOCAPTCHA, ANTI_CAPTCHA], RECAPTCHAV2) == [ANTI_CAPTCHA, TWOCAPTCHA]
+    assert scoreboard.get_stats(ANTI_CAPTCHA, RECAPTCHAV2)['p50'] == 20
+
+    # the faster service degrades
+    for _ in range(10):
+        scoreboard.record_error(ANTI_CAPTCHA, RECAPTCHAV2)
+    assert scoreboard.rank([TWOCAPTCHA, ANTI_CAPTCHA], RECAPTCHAV2) == [TWOCAPTCHA, ANTI_CAPTCHA]
+
+
+def test_scoreboard_cost():
+    scoreboard = Scoreboard(cost_weight=10000)
+    scoreboard.record_success(TWOCAPTCHA, RECAPTCHAV2, 30, cost=0.001)
+    scoreboard.record_success(ANTI_CAPTCHA, RECAPTCHAV2, 20, cost=0.003)
+
+    assert scoreboard.rank([TWOCAPTCHA, ANTI_CAPTCHA], RECAPTCHAV2) == [TWOCAPTCHA, ANTI_CAPTCHA]
+
+
+def test_scoreboard_wasted_cost():
+    scoreboard = Scoreboard(cost_weight=10000)
+    for _ in range(2):
+        scoreboard.record_success(TWOCAPTCHA, RECAPTCHAV2, 30, cost=0.001)
+        scoreboard.record_success(ANTI_CAPTCHA, RECAPTCHAV2, 30, cost=0.0015)
+    assert scoreboard.rank([ANTI_CAPTCHA, TWOCAPTCHA], RECAPTCHAV2) == [TWOCAPTCHA, ANTI_CAPTCHA]
+
+    # every 2captcha solution is paid twice
+    for _ in range(2):
+        scoreboard.record_wasted_cost(TWOCAPTCHA, RECAPTCHAV2, 0.001)
+
+    assert scoreboard.get_price(TWOCAPTCHA, RECAPTCHAV2) == pytest.approx(0.001)
+    assert scoreboard.get_stats(TWOCAPTCHA, RECAPTCHAV2)['cost'] == pytest.approx(0.002)
+    assert scoreboard.rank([TWOCAPTCHA, ANTI_CAPTCHA], RECAPTCHAV2) == [ANTI_CAPTCHA, TWOCAPTCHA]
+
+
+def test_scoreboard_unexplored():
+    scoreboard = Scoreboard()
+    scoreboard.record_success(TWOCAPTCHA, RECAPTCHAV2, 30)
+    scoreboard.record_error(ANTI_CAPTCHA, RECAPTCHAV2)
+
+    assert scoreboard.rank([ANTI_CAPTCHA, TWOCAPTCHA], RECAPTCHAV2) == [TWOCAPTCHA, ANTI_CAPTCHA]
+
+
+def _mock_services(solver, errors, task_class=CaptchaTask):
+    """ Mock create_task() and wait_for_solution() of the services """
+
+    def wait_for_solution(task):
+        task._result = (RecaptchaV2Solution(task.task_id), 0.002, {})
+        return task._result
+
+    async def wait_for_solution_async(task):
+        return wait_for_solution(task)
+
+    for name, service in solver._service.services.items():
+        def create_task(captcha, *args, name=name, service=service):
+            if name in errors:
+                raise errors[name]
+            return task_class(service, captcha, name.value)
+
+        async def create_task_async(captcha, *args, create_task=create_task):
+            return create_task(captcha, *args)
+
+        service.create_task = mock.Mock(side_effect=create_task)
+        service.create_task_async = create_task_async
+        service.wait_for_solution = wait_for_solution
+        service.wait_for_solution_async = wait_for_solution_async
+
+
+@pytest.fixture
+def solver():
+    solver = RoutedCaptchaSolver({TWOCAPTCHA: 'key1', 'anti-captcha.com': 'key2'})
+    yield solver
+    solver.close()
+
+
+def test_router_failover(solver):
+    _mock_services(solver, {TWOCAPTCHA: ServiceTooBusy('busy')})
+
+    solved = solver.solve_recaptcha_v2('key', 'url')
+
+    assert solved.solution.token == ANTI_CAPTCHA.value
+    assert solved.cost == 0.002
+    assert solver.scoreboard.get_stats(TWOCAPTCHA, RECAPTCHAV2)['error_rate'] > 0.5
+    assert solver.scoreboard.get_stats(ANTI_CAPTCHA, RECAPTCHAV2)['p50'] is not None
+
+    # the failed service is tried last now
+    solved = solver.solve_recaptcha_v2('key', 'url')
+    assert solved.solution.token == ANTI_CAPTCHA.value
+    assert solver._service.services[TWOCAPTCHA].create_task.call_count == 1
+
+
+def test_router_all_failed(solver):
+    _mock_services(solver, {TWOCAPTCHA: ServiceTooBusy('busy'),
+                            ANTI_CAPTCHA: LowBalanceError('no money')})
+
+    with pytest.raises((ServiceTooBusy, LowBalanceError)):
+        solver.solve_recaptcha_v2('key', 'url')
+
+
+def test_router_batch(solver):
+    _mock_services(solver, {TWOCAPTCHA: ServiceTooBusy('busy')})
+
+    def wait_for_solution_future(task):
+        future = Future()
+        future.set_result(solver._service.services[ANTI_CAPTCHA].wait_for_solution(task))
+        return future
+
+    for service in solver._service.services.values():
+        service.wait_for_solution_future = wait_for_solution_future
+
+    with solver.batch() as batch:
+        future = batch.submit(RecaptchaV2('key', 'url'))
+
+    assert future.result().solution.token == ANTI_CAPTCHA.value
+    assert future.result().provider == ANTI_CAPTCHA
+    assert solver.scoreboard.get_stats(ANTI_CAPTCHA, RECAPTCHAV2)['cost'] == 0.002
+
+
+def test_router_unsupported_captcha():
+    with RoutedCaptchaSolver({'cptch.net': 'key'}) as solver:
+        with pytest.raises(UnicapsException):
+            solver.solve_hcaptcha('key', 'url')
+
+
+def test_router_bad_params():
+    with pytest.raises(ValueError):
+        RoutedCaptchaSolver({})
+    with pytest.raises(ValueError):
+        RoutedCaptchaSolver({'unknown.com': 'key'})
+
+
+def test_router_failover_async():
+    async def solve():
+        solver = AsyncRoutedCaptchaSolver({TWOCAPTCHA: 'key1', ANTI_CAPTCHA: 'key2'})
+        _mock_services(solver, {ANTI_CAPTCHA: ServiceTooBusy('busy')}, AsyncCaptchaTask)
+        try:
+            return await solver.solve_recaptcha_v2('key', 'url')
+        finally:
+            await solver.close()
+
+    solved = asyncio.run(solve())
+    assert solved.solution.token == TWOCAPTCHA.value
+
+
+def test_router_failover_while_waiting(solver):
+    _mock_services(solver, {})
+    service = solver._service.services[TWOCAPTCHA]
+    service.wait_for_solution = mock.Mock(side_effect=NetworkError('unreachable'))
+
+    solved = solver.solve_recaptcha_v2('key', 'url')
+
+    assert solved.provider == ANTI_CAPTCHA
+    assert service.wait_for_solution.call_count == 1
+    assert solver.scoreboard.get_stats(TWOCAPTCHA, RECAPTCHAV2)['error_rate'] > 0.5
+
+
+def test_router_no_failover_on_unsolvable(solver):
+    _mock_services(solver, {})
+    for service in solver._service.services.values():
+        service.wait_for_solution = mock.Mock(side_effect=UnableToSolveError('unsolvable'))
+
+    with pytest.raises(UnableToSolveError):
+        solver.solve_recaptcha_v2('key', 'url')
+    assert solver._service.services[ANTI_CAPTCHA].create_task.call_count == 0
+
+
+def test_router_failover_while_waiting_async():
+    async def solve():
+        solver = AsyncRoutedCaptchaSolver({TWOCAPTCHA: 'key1', ANTI_CAPTCHA: 'key2'})
+        _mock_services(solver, {}, AsyncCaptchaTask)
+
+        async def wait_for_solution_async(task):
+            raise CircuitOpenError('open')
+
+        solver._service.services[TWOCAPTCHA].wait_for_solution_async = wait_for_solution_async
+        try:
+            return await solver.solve_recaptcha_v2('key', 'url')
+        finally:
+            await solver.close()
+
+    solved = asyncio.run(solve())
+    assert solved.provider == ANTI_CAPTCHA
+
+
+def _run_hedged(solve_times, hedging, solve_count=1):
+    async def solve():
+        solver = AsyncRoutedCaptchaSolver({TWOCAPTCHA: 'key1', ANTI_CAPTCHA: 'key2'},
+                                          hedging=hedging)
+        _mock_services(solver, {}, AsyncCaptchaTask)
+        reported = []
+        for name, service in solver._service.services.items():
+            async def wait_for_solution_async(task, name=name):
+                await asyncio.sleep(solve_times[name])
+                task._result = (RecaptchaV2Solution(name.value), 0.002, {})
+                return task._result
+
+            async def report_bad_async(solved_captcha):
+                reported.append(solved_captcha.solution.token)
+
+            service.wait_for_solution_async = wait_for_solution_async
+            service.report_bad_async = report_bad_async
+
+        # 2captcha is the best one, but its tail is long
+        solver.scoreboard.record_success(TWOCAPTCHA, RECAPTCHAV2, 0.05, cost=0.002)
+        try:
+            results = [await solver.solve_recaptcha_v2('key', 'url') for _ in range(solve_count)]
+            await asyncio.sleep(max(solve_times.values()))
+            return solver, results, reported
+        finally:
+            await solver.close()
+
+    return asyncio.run(solve())
+
+
+def test_hedging():
+    solver, (solved,), reported = _run_hedged({TWOCAPTCHA: 0.5, ANTI_CAPTCHA: 0.05},
+                                              HedgingPolicy(percentile=0.9))
+
+    assert solved.solution.token == ANTI_CAPTCHA.value
+    assert solved.provider == ANTI_CAPTCHA
+    assert solver.hedging_stats.hedges == 1
+    assert solver.hedging_stats.wins == 1
+    assert solver.hedging_stats.cost == 0.002
+    # the cancelled task of 2captcha is charged anyway
+    assert solver.scoreboard.get_stats(TWOCAPTCHA, RECAPTCHAV2)['cost'] == pytest.approx(
+        0.004, rel=0.01)
+    assert not reported
+
+
+def test_hedging_report_loser():
+    solver, (solved,), reported = _run_hedged({TWOCAPTCHA: 0.3, ANTI_CAPTCHA: 0.05},
+                                              HedgingPolicy(report_loser=True))
+
+    assert solved.provider == ANTI_CAPTCHA
+    assert reported == [TWOCAPTCHA.value]
+    assert solver.hedging_stats.cost == 0.002
+
+
+def test_no_hedging_if_solved_in_time():
+    solver, (solved,), _ = _run_hedged({TWOCAPTCHA: 0.01, ANTI_CAPTCHA: 0.01},
+                                       HedgingPolicy(min_delay=0.2))
+
+    assert solved.provider == TWOCAPTCHA
+    assert solver.hedging_stats.hedges == 0
@@ -12,6 +12,7 @@ import pytest
 
 from unicaps._captcha import CaptchaType
 from unicaps._service import SOLVING_SERVICE
+from unicaps.exceptions import UnicapsException
 
 from data.data import (BASE_TASK_REQUEST_DATA, INPUT_TEST_DATA_FOR_TASK_PREPARE_FUNC,
                        OUTPUT_TEST_DATA_FOR_TASK_PREPARE_FUNC,
@@ -122,6 +123,36 @@ def test_if_solution_request_is_present(service_module, captcha_type):
     )
 
 
+def test_supported_captchas(service_module, service_instance):
+    """ Checks the set of supported captchas and the dispatch table built once per class """
+
+    module_name = service_module.__name__.split('.')[-1]
+    assert service_instance.supported_captchas == frozenset(SERVICE_MODULES_FOR_TEST[module_name])
+    assert service_module.Service('test2')._dispatch is service_instance._dispatch
+
+    for captcha_type in CaptchaType:
+        if is_captcha_supported(service_module, captcha_type):
+            assert service_instance._get_task_request_class(captcha_type) is getattr(
+                service_module, captcha_type.value + 'TaskRequest'
+            )
+        else:
+            with pytest.raises(UnicapsException):
+                service_instance._get_task_request_class(captcha_type)
+
+    with pytest.raises(UnicapsException):
+        service_instance._make_request('Unknown')
+
+
+def test_wrapped_requests():
+    """ Checks that the wrapped requests of cap.guru are dispatched """
+
+    service = importlib.import_module('unicaps._service.captcha_guru').Service('test')
+    assert service.supported_captchas == frozenset((
+        CaptchaType.IMAGE, CaptchaType.RECAPTCHAV2, CaptchaType.RECAPTCHAV3,
+        CaptchaType.HCAPTCHA, CaptchaType.GEETEST
+    ))
+
+
 @pytest.mark.parametrize("req", BASE_REQUESTS)
 def test_base_request_signature_of_prepare_func(service_module, req):
     """ Checks signature of the <captcha>TaskRequest.prepare() function """
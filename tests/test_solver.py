@@ -2,13 +2,19 @@
 """
 CaptchaSolver tests
 """
+import asyncio
+from concurrent.futures import Future
+from datetime import datetime
 from unittest.mock import Mock
 
 import pytest
-from unicaps import CaptchaSolver, CaptchaSolvingService
-from unicaps.captcha import CaptchaType
+from unicaps import AsyncCaptchaSolver, CaptchaSolver, CaptchaSolvingService
+from unicaps.captcha import CaptchaType, TextCaptcha
+from unicaps._captcha.text import TextCaptchaSolution
+from unicaps.exceptions import UnableToSolveError, UnicapsException
 
 API_KEY = 'TEST_API_KEY'
+PNG_IMAGE = b'\x89PNG\r\n\x1a\n' + b'\x00' * 32
 
 
 @pytest.fixture(scope="module")
@@ -67,3 +73,106 @@ def test_call_solve_func(mocked_captcha_solver, captcha_instance):
     func(
         **{k: v for k, v in captcha_instance.__dict__.items() if not k.startswith('_')}
     )
+
+
+def test_solve_many(captcha_solver, monkeypatch):
+    captchas = [TextCaptcha(f'text{i}') for i in range(5)]
+
+    def create_task(captcha, proxy, user_agent, cookies):
+        if captcha.text == 'text3':
+            raise UnableToSolveError()
+        return Mock(captcha=captcha, task_id=captcha.text, user_agent=user_agent)
+
+    def wait_for_solution_future(task):
+        future = Future()
+        future.set_result((TextCaptchaSolution(task.captcha.text), None, {}))
+        return future
+
+    monkeypatch.setattr(captcha_solver._service, 'create_task', create_task)
+    monkeypatch.setattr(captcha_solver._service, 'wait_for_solution_future',
+                        wait_for_solution_future)
+    results = list(captcha_solver.solve_many(
+        captchas[:4] + [dict(captcha=captchas[4], user_agent='UA')], max_in_flight=2
+    ))
+
+    assert len(results) == 5
+    assert sum(isinstance(result, UnableToSolveError) for result in results) == 1
+    solved = {result.solution.text: result for result in results
+              if not isinstance(result, Exception)}
+    assert set(solved) == {'text0', 'text1', 'text2', 'text4'}
+    assert solved['text4'].task.user_agent == 'UA'
+
+
+def test_solve_many_bad_item(mocked_captcha_solver):
+    with pytest.raises(ValueError):
+        list(mocked_captcha_solver.solve_many([dict(captcha=TextCaptcha('text'), bad_key=1)]))
+
+
+def test_solve_many_async():
+    in_flight = []
+    max_in_flight = []
+
+    class Service:
+        async def solve_captcha_async(self, captcha, **kwargs):
+            in_flight.append(captcha)
+            max_in_flight.append(len(in_flight))
+            await asyncio.sleep(0.01 * (5 - int(captcha.text)))
+            in_flight.remove(captcha)
+            return captcha.text
+
+    solver = AsyncCaptchaSolver('2captcha.com', API_KEY)
+    solver._service = Service()
+
+    async def solve_many():
+        return [result async for result in solver.solve_many(
+            (TextCaptcha(str(i)) for i in range(5)), max_in_flight=3
+        )]
+
+    results = asyncio.run(solve_many())
+
+    assert sorted(results) == ['0', '1', '2', '3', '4']
+    assert results[0] == '2'  # the shortest task of the first batch
+    assert max(max_in_flight) == 3
+
+
+def _mock_solving(solver):
+    responses = iter([dict(status=1, request='1'), dict(status=1, request='text')])
+
+    def make_request(request_data, request=None):
+        response = Mock()
+        response.json = lambda data=next(responses): data
+        return response
+
+    solver._service._transport._make_request = make_request
+    for settings in solver._service.settings.values():
+        settings.polling_delay = 0
+
+
+def test_solved_captcha_compact():
+    with CaptchaSolver('2captcha.com', API_KEY) as solver:
+        _mock_solving(solver)
+        solved = solver.solve_image_captcha(PNG_IMAGE)
+
+    assert not hasattr(solved, '__dict__')
+    assert not hasattr(solved.task, '__dict__')
+    assert isinstance(solved.start_time_ns, int)
+    assert 0 <= solved.solving_time < 5
+    assert solved.start_time <= solved.end_time
+    assert abs((datetime.now() - solved.end_time).total_seconds()) < 5
+    # the payload is kept by default
+    assert solved.task.captcha.get_image_bytes() == PNG_IMAGE
+
+
+@pytest.mark.parametrize("detach", [False, True])
+def test_solved_captcha_release(detach):
+    with CaptchaSolver('2captcha.com', API_KEY) as solver:
+        solver.set_result_options(release_payload=True, detach=detach)
+        _mock_solving(solver)
+        solved = solver.solve_image_captcha(PNG_IMAGE)
+
+    assert solved.solution.text == 'text'
+    assert solved.task.captcha.get_image_bytes() == b''
+    assert (solved.task.service is None) is detach
+    if detach:
+        with pytest.raises(UnicapsException):
+            solved.report_good()
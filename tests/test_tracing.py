@@ -0,0 +1,200 @@
+# -*- coding: UTF-8 -*-
+"""
+Tracing tests
+"""
+
+import asyncio
+import importlib.util
+
+import httpx
+import pytest
+from unicaps import (AsyncCaptchaSolver, CaptchaSolver, CaptchaSolvingService,
+                     RoutedCaptchaSolver)
+from unicaps._misc.tracing import NO_SPAN, NO_TRACER
+from unicaps.captcha import ImageCaptcha
+from unicaps.exceptions import SolutionNotReadyYet, UnableToSolveError, UnicapsException
+from unicaps.tracing import HookTracer, OpenTelemetryTracer, Tracer
+
+PNG_IMAGE = b'\x89PNG\r\n\x1a\n' + b'\x00' * 32
+
+
+class ListTracer(HookTracer):
+    """ Keeps the started and ended spans """
+
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def on_start(self, span):
+        self.events.append(('start', span.name))
+
+    def on_end(self, span):
+        self.events.append(('end', span))
+
+    def get_spans(self, name):
+        return [span for event, span in self.events if event == 'end' and span.name == name]
+
+
+def _mock_service(service, responses):
+    """ Make the 2captcha service receive the responses of res.php one by one """
+
+    polls = []
+
+    def handler(request):
+        if request.url.path == '/in.php':
+            return httpx.Response(200, json=dict(status=1, request='17'))
+        polls.append(request)
+        return httpx.Response(200, json=responses[min(len(polls), len(responses)) - 1])
+
+    transport = service._transport
+    transport.session = httpx.Client(transport=httpx.MockTransport(handler))
+    transport.session_async = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    for settings in service.settings.values():
+        settings.polling_delay = 0
+        settings.polling_interval = 0
+
+
+def _get_solver(solver_class, responses):
+    """ 2captcha solver receiving the responses of res.php one by one """
+
+    solver = solver_class(CaptchaSolvingService.TWOCAPTCHA, 'key')
+    _mock_service(solver._service, responses)
+    return solver
+
+
+RESPONSES = [dict(status=0, request='CAPCHA_NOT_READY'), dict(status=1, request='text')]
+
+
+def _check_spans(tracer):
+    solve, = tracer.get_spans('unicaps.solve')
+    assert solve.attributes == dict(service='2captcha.com', captcha_type='ImageCaptcha',
+                                    task_id='17')
+    assert solve.exception is None and solve.duration >= 0
+
+    create, = tracer.get_spans('unicaps.create_task')
+    assert create.attributes['task_id'] == '17'
+    wait, = tracer.get_spans('unicaps.wait')
+    assert wait.attributes['task_id'] == '17'
+    assert create.end_time <= wait.start_time
+
+    polls = tracer.get_spans('unicaps.poll')
+    assert [span.attributes['poll'] for span in polls] == [1, 2]
+    assert isinstance(polls[0].exception, SolutionNotReadyYet)
+    assert polls[1].exception is None
+    # time until the first poll
+    assert polls[0].start_time >= wait.start_time
+
+    requests = tracer.get_spans('unicaps.request')
+    assert [span.attributes for span in requests] == [
+        dict(request='ImageCaptchaTaskRequest', task_id='17'),
+        dict(request='ImageCaptchaSolutionRequest', task_id='17'),
+        dict(request='ImageCaptchaSolutionRequest', task_id='17'),
+    ]
+    for name in ('unicaps.request.prepare', 'unicaps.request.http', 'unicaps.request.parse'):
+        assert len(tracer.get_spans(name)) == 3
+
+    # the phases of a request are nested
+    assert tracer.events[:4] == [('start', 'unicaps.solve'), ('start', 'unicaps.create_task'),
+                                 ('start', 'unicaps.request'),
+                                 ('start', 'unicaps.request.prepare')]
+
+
+def test_solver_tracing():
+    tracer = ListTracer()
+    solver = _get_solver(CaptchaSolver, RESPONSES)
+    solver.set_tracer(tracer)
+
+    assert solver.solve_image_captcha(PNG_IMAGE).solution.text == 'text'
+    _check_spans(tracer)
+
+
+def test_solver_tracing_async():
+    tracer = ListTracer()
+    solver = _get_solver(AsyncCaptchaSolver, RESPONSES)
+    solver.set_tracer(tracer)
+
+    assert asyncio.run(solver.solve_image_captcha(PNG_IMAGE)).solution.text == 'text'
+    _check_spans(tracer)
+
+
+def test_batch_tracing():
+    tracer = ListTracer()
+    solver = _get_solver(CaptchaSolver, RESPONSES)
+    solver.set_tracer(tracer)
+
+    with solver.batch() as batch:
+        future = batch.submit(ImageCaptcha(PNG_IMAGE))
+    assert future.result().solution.text == 'text'
+
+    # the span lasts until the solution is received by the poller
+    solve, = tracer.get_spans('unicaps.solve')
+    assert solve.attributes == dict(service='2captcha.com', captcha_type='ImageCaptcha',
+                                    task_id='17')
+    assert solve.end_time >= tracer.get_spans('unicaps.poll')[-1].end_time
+    solver.close()
+
+
+def test_solver_tracing_errors():
+    tracer = ListTracer()
+    solver = _get_solver(CaptchaSolver, [dict(status=0, request='ERROR_CAPTCHA_UNSOLVABLE')])
+    solver.set_tracer(tracer)
+
+    with pytest.raises(UnableToSolveError):
+        solver.solve_image_captcha(PNG_IMAGE)
+
+    for name in ('unicaps.solve', 'unicaps.wait', 'unicaps.poll'):
+        span, = tracer.get_spans(name)
+        assert isinstance(span.exception, UnableToSolveError)
+
+
+def test_hook_callables():
+    started = []
+    ended = []
+    tracer = HookTracer(on_start=started.append, on_end=ended.append)
+
+    with tracer.span('phase', task_id='1', poll=None) as span:
+        span.set_attribute('cached', True)
+
+    assert started == ended == [span]
+    assert span.attributes == dict(task_id='1', cached=True)
+
+
+def test_tracing_disabled():
+    assert Tracer().span('phase', task_id='1') is NO_SPAN
+
+    solver = CaptchaSolver(CaptchaSolvingService.TWOCAPTCHA, 'key')
+    solver.set_tracer(ListTracer())
+    solver.set_tracer(None)
+
+    assert solver._service.tracer is NO_TRACER
+    assert solver._service._transport.tracer is NO_TRACER
+
+
+def test_router_tracing():
+    solver = RoutedCaptchaSolver({CaptchaSolvingService.TWOCAPTCHA: 'key1',
+                                  CaptchaSolvingService.ANTI_CAPTCHA: 'key2'})
+    solver.set_tracer(ListTracer())
+
+    assert {service.tracer.service for service in solver._service.services.values()} == {
+        '2captcha.com', 'anti-captcha.com'
+    }
+
+
+def test_router_solve_tracing():
+    tracer = ListTracer()
+    solver = RoutedCaptchaSolver({CaptchaSolvingService.TWOCAPTCHA: 'key'})
+    _mock_service(solver._service.services[CaptchaSolvingService.TWOCAPTCHA], RESPONSES)
+    solver.set_tracer(tracer)
+
+    assert solver.solve_image_captcha(PNG_IMAGE).solution.text == 'text'
+
+    solve, = tracer.get_spans('unicaps.solve')
+    assert solve.attributes == dict(captcha_type='ImageCaptcha', task_id='17')
+    assert tracer.get_spans('unicaps.create_task')[0].attributes['service'] == '2captcha.com'
+
+
+@pytest.mark.skipif(importlib.util.find_spec('opentelemetry') is not None,
+                    reason='OpenTelemetry is installed')
+def test_opentelemetry_missing():
+    with pytest.raises(UnicapsException):
+        OpenTelemetryTracer()
@@ -0,0 +1,260 @@
+# -*- coding: UTF-8 -*-
+"""
+HTTP transport tests
+"""
+
+import asyncio
+import base64
+from unittest import mock
+
+import httpx
+import pytest
+
+from unicaps import CaptchaSolver, CaptchaSolvingService, RoutedCaptchaSolver
+from unicaps._captcha import CaptchaType, ImageCaptcha
+from unicaps._transport.http_transport import (HTTPRequestJSON, StandardHTTPTransport,
+                                               _parse_retry_after)
+from unicaps.exceptions import NetworkError, UnicapsException
+
+
+def test_default_settings():
+    transport = StandardHTTPTransport()
+
+    assert transport.settings['http2'] is False
+    assert transport.settings['max_connections'] == 100
+    assert transport.settings['handle_http_errors'] is True
+    transport.close()
+
+
+def test_settings_passed_to_clients():
+    settings = dict(max_connections=500, max_keepalive_connections=50, keepalive_expiry=30,
+                    connect_timeout=5, read_timeout=20, pool_timeout=60)
+
+    solver = CaptchaSolver('2captcha.com', 'test', transport_settings=settings)
+    with mock.patch('httpx.Client') as client, mock.patch('httpx.AsyncClient') as async_client:
+        assert solver._service._transport.session is client.return_value
+        assert solver._service._transport.session_async is async_client.return_value
+
+    for client_class in (client, async_client):
+        kwargs = client_class.call_args[1]
+        assert kwargs['http2'] is False
+        assert kwargs['limits'] == httpx.Limits(max_connections=500,
+                                                max_keepalive_connections=50,
+                                                keepalive_expiry=30)
+        assert kwargs['timeout'] == httpx.Timeout(connect=5, read=20, write=30, pool=60)
+
+    # the source dict isn't changed
+    assert 'http2' not in settings
+    assert solver._service._transport.settings['read_timeout'] == 20
+
+
+def test_lazy_clients():
+    with mock.patch('httpx.Client') as client, mock.patch('httpx.AsyncClient') as async_client:
+        transport = StandardHTTPTransport()
+        client.assert_not_called()
+        async_client.assert_not_called()
+
+        session = transport.session
+        assert transport.session is session
+        client.assert_called_once()
+        async_client.assert_not_called()
+
+        transport.close()
+    session.close.assert_called_once()
+
+
+def test_close_both_clients():
+    transport = StandardHTTPTransport()
+    session, session_async = transport.session, transport.session_async
+    transport.close()
+
+    assert session.is_closed
+    assert session_async.is_closed
+
+    async def close_async():
+        transport = StandardHTTPTransport()
+        session, session_async = transport.session, transport.session_async
+        await transport.close_async()
+        return session, session_async
+
+    for session in asyncio.run(close_async()):
+        assert session.is_closed
+
+
+def test_shared_transport():
+    transport = StandardHTTPTransport()
+    with CaptchaSolver('2captcha.com', 'key1', transport=transport) as solver1, \
+            CaptchaSolver('anti-captcha.com', 'key2', transport=transport) as solver2:
+        assert solver1._service._transport is solver2._service._transport is transport
+        session = transport.session
+
+    # the shared transport is closed by its owner only
+    assert not session.is_closed
+    transport.close()
+    assert session.is_closed
+
+    with pytest.raises(ValueError):
+        CaptchaSolver('2captcha.com', 'key', transport_settings={}, transport=transport)
+
+
+def test_unknown_setting():
+    with pytest.raises(ValueError):
+        CaptchaSolver('2captcha.com', 'test', transport_settings=dict(max_sockets=10))
+
+
+class _Request(HTTPRequestJSON):
+    def __init__(self, idempotent=True):
+        super().__init__(None)
+        self.idempotent = idempotent
+
+    def prepare(self, **kwargs):
+        request = super().prepare(**kwargs)
+        request.update(method='GET', url='http://test.local/')
+        return request
+
+
+def _get_transport(responses, **settings):
+    """ Transport returning the responses (or raising the exceptions) one by one """
+
+    calls = []
+
+    def handler(request):
+        response = responses[min(len(calls), len(responses) - 1)]
+        calls.append(request)
+        if isinstance(response, Exception):
+            raise response
+        return httpx.Response(response.status_code, headers=response.headers,
+                              content=response.content)
+
+    settings.setdefault('backoff_factor', 0)
+    transport = StandardHTTPTransport(settings)
+    transport.session = httpx.Client(transport=httpx.MockTransport(handler))
+    transport.session_async = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return transport, calls
+
+
+OK = httpx.Response(200, json=dict(status=1))
+BAD_GATEWAY = httpx.Response(502)
+
+
+def test_retry_idempotent():
+    transport, calls = _get_transport([BAD_GATEWAY, httpx.ReadTimeout('timeout'), OK])
+
+    assert transport.make_request(_Request()) == dict(status=1)
+    assert len(calls) == 3
+
+
+def test_no_retry_non_idempotent():
+    transport, calls = _get_transport([BAD_GATEWAY, OK])
+
+    with pytest.raises(NetworkError):
+        transport.make_request(_Request(idempotent=False))
+    assert len(calls) == 1
+
+    transport, calls = _get_transport([httpx.ReadTimeout('timeout'), OK])
+    with pytest.raises(NetworkError):
+        transport.make_request(_Request(idempotent=False))
+    assert len(calls) == 1
+
+
+def test_retry_non_idempotent_not_sent():
+    transport, calls = _get_transport([httpx.ConnectError('refused'), OK])
+
+    assert transport.make_request(_Request(idempotent=False)) == dict(status=1)
+    assert len(calls) == 2
+
+
+def test_retry_after():
+    transport, calls = _get_transport(
+        [httpx.Response(429, headers={'Retry-After': '7'}), OK], backoff_max=10
+    )
+
+    with mock.patch('time.sleep') as sleep:
+        assert transport.make_request(_Request(idempotent=False)) == dict(status=1)
+    sleep.assert_called_once_with(7)
+    assert len(calls) == 2
+
+
+def test_max_retries():
+    transport, calls = _get_transport([BAD_GATEWAY], max_retries=2)
+
+    with pytest.raises(NetworkError):
+        transport.make_request(_Request())
+    assert len(calls) == 3
+
+
+def test_retry_budget():
+    transport, calls = _get_transport([BAD_GATEWAY], retry_budget_min=3, retry_budget_ratio=0)
+
+    for _ in range(2):
+        with pytest.raises(NetworkError):
+            transport.make_request(_Request())
+    # 1 + 3 retries, then the budget is exhausted
+    assert len(calls) == 5
+
+
+def test_retry_async():
+    transport, calls = _get_transport([BAD_GATEWAY, OK])
+
+    assert asyncio.run(transport.make_request_async(_Request())) == dict(status=1)
+    assert len(calls) == 2
+
+
+def test_parse_retry_after():
+    assert _parse_retry_after('5') == 5
+    assert _parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+    assert _parse_retry_after('bad') is None
+    assert _parse_retry_after(None) is None
+
+
+def test_request_handles_http_errors():
+    class _NoErrorsRequest(_Request):
+        handle_http_errors = False
+
+    transport, _ = _get_transport([httpx.Response(400, json=dict(error='bad'))], max_retries=0)
+
+    assert transport.make_request(_NoErrorsRequest()) == dict(error='bad')
+    with pytest.raises(NetworkError):
+        transport.make_request(_Request())
+    transport.close()
+
+
+@pytest.mark.parametrize("service_name", ['2captcha.com', 'azcaptcha.com', 'deathbycaptcha.com'])
+def test_multipart_image_upload(service_name, tmp_path):
+    image = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 64
+    path = tmp_path / 'captcha.png'
+    path.write_bytes(image)
+
+    solver = CaptchaSolver(service_name, 'test')
+    solver.enable_multipart_upload()
+    service = solver._service
+    transport, calls = _get_transport([OK])
+
+    request = service._get_task_request_class(CaptchaType.IMAGE)(service)
+    transport._make_request(request.prepare(ImageCaptcha(path), None, None, None), request)
+
+    content = calls[0].read()
+    assert calls[0].headers['content-type'].startswith('multipart/form-data')
+    assert image in content
+    assert base64.b64encode(image) not in content
+    transport.close()
+    solver.close()
+
+
+def test_multipart_upload_not_supported():
+    with CaptchaSolver('anti-captcha.com', 'test') as solver:
+        with pytest.raises(UnicapsException):
+            solver.enable_multipart_upload()
+
+
+def test_router_multipart_upload():
+    with RoutedCaptchaSolver({'2captcha.com': 'key1', 'anti-captcha.com': 'key2'}) as solver:
+        solver.enable_multipart_upload()
+        services = solver._service.services
+        # anti-captcha.com keeps base64
+        assert services[CaptchaSolvingService.TWOCAPTCHA].multipart_upload
+        assert not services[CaptchaSolvingService.ANTI_CAPTCHA].multipart_upload
+
+    with RoutedCaptchaSolver({'anti-captcha.com': 'key'}) as solver:
+        with pytest.raises(UnicapsException):
+            solver.enable_multipart_upload()
@@ -7,6 +7,8 @@ Unicaps package
 # pylint: disable=unused-import,import-error
 from ._solver import CaptchaSolver
 from ._solver_async import AsyncCaptchaSolver
+from ._router import RoutedCaptchaSolver, AsyncRoutedCaptchaSolver
 from ._service import CaptchaSolvingService
 
-__all__ = ('CaptchaSolver', 'AsyncCaptchaSolver', 'CaptchaSolvingService')
+__all__ = ('CaptchaSolver', 'AsyncCaptchaSolver', 'RoutedCaptchaSolver', 'AsyncRoutedCaptchaSolver',
+           'CaptchaSolvingService')
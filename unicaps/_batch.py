@@ -0,0 +1,105 @@
+# -*- coding: UTF-8 -*-
+"""
+CaptchaBatch class
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, Optional, Set
+
+from ._captcha.base import BaseCaptcha  # type: ignore
+from ._misc.proxy import ProxyServer
+from ._service.singleflight import copy_future_state
+
+# default number of worker threads creating the tasks
+BATCH_MAX_WORKERS = 10
+
+
+class CaptchaBatch:
+    """Batch of CAPTCHAs solved in the background :class:`CaptchaBatch <CaptchaBatch>` object.
+
+    The tasks are created by a pool of worker threads (the solution cache and the coalescing
+    apply as in solve_captcha()), then all of them are checked by a single shared poller of
+    the service. So the threads don't sleep while the CAPTCHAs are being solved and all of them
+    share the same HTTP connection pool.
+
+    :param service: solving service instance.
+    :param max_workers: (optional) Number of worker threads creating the tasks.
+    """
+
+    def __init__(self, service, max_workers: int = BATCH_MAX_WORKERS):
+        self._service = service
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='unicaps-batch')
+        self._futures: Set[Future] = set()
+        self._lock = threading.Lock()
+
+    def submit(self, captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
+               user_agent: Optional[str] = None,
+               cookies: Optional[Dict[str, str]] = None) -> Future:
+        r"""Submits CAPTCHA to solve.
+
+        :param captcha: Captcha to solve.
+        :param proxy: (optional) Proxy to use while solving the CAPTCHA.
+        :param user_agent: (optional) User-Agent to use while solving the CAPTCHA.
+        :param cookies: (optional) Cookies to use while solving the CAPTCHA.
+        :return: Future of :class:`SolvedCaptcha <SolvedCaptcha>` object
+        :rtype: concurrent.futures.Future
+        """
+
+        future: Future = Future()
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._discard)
+
+        self._executor.submit(self._solve, future, captcha, proxy, user_agent, cookies)
+        return future
+
+    def _discard(self, future: Future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def _solve(self, future: Future, captcha, proxy, user_agent, cookies):
+        if future.done():  # cancelled
+            return
+
+        solved_future = self._service.solve_captcha_future(captcha, proxy, user_agent, cookies)
+        solved_future.add_done_callback(lambda solved: copy_future_state(solved, future))
+        future.add_done_callback(lambda future: future.cancelled() and solved_future.cancel())
+
+    @property
+    def pending_count(self) -> int:
+        """Number of CAPTCHAs not solved yet"""
+        return len(self._futures)
+
+    def cancel_all(self) -> int:
+        """Cancels all the outstanding CAPTCHAs
+
+        :return: Number of cancelled CAPTCHAs
+        :rtype: int
+        """
+
+        with self._lock:
+            futures = list(self._futures)
+        return sum(future.cancel() for future in futures)
+
+    def shutdown(self, wait_all: bool = True, cancel: bool = False) -> None:
+        """Shuts down the batch
+
+        :param wait_all: (optional) Wait for all the outstanding CAPTCHAs to be solved.
+        :param cancel: (optional) Cancel all the outstanding CAPTCHAs.
+        """
+
+        if cancel:
+            self.cancel_all()
+        if wait_all:
+            with self._lock:
+                futures = list(self._futures)
+            wait(futures)
+        self._executor.shutdown(wait=wait_all)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(cancel=exc_type is not None)
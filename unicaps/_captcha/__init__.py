@@ -2,19 +2,54 @@
 
 """ CAPTCHAs """
 
+import importlib
+from typing import TYPE_CHECKING
+
 # pylint: disable=unused-import,import-error
-from .image import ImageCaptcha
-from .text import TextCaptcha
-from .recaptcha_v2 import RecaptchaV2
-from .recaptcha_v3 import RecaptchaV3
-from .hcaptcha import HCaptcha
-from .funcaptcha import FunCaptcha
-from .keycaptcha import KeyCaptcha
-from .geetest import GeeTest
-from .geetest_v4 import GeeTestV4
-from .capy import CapyPuzzle
-from .tiktok import TikTokCaptcha
-from .base import CaptchaType
+from .base import CaptchaType, CaptchaRegistry, CAPTCHA_REGISTRY
+
+if TYPE_CHECKING:
+    from .image import ImageCaptcha
+    from .text import TextCaptcha
+    from .recaptcha_v2 import RecaptchaV2
+    from .recaptcha_v3 import RecaptchaV3
+    from .hcaptcha import HCaptcha
+    from .funcaptcha import FunCaptcha
+    from .keycaptcha import KeyCaptcha
+    from .geetest import GeeTest
+    from .geetest_v4 import GeeTestV4
+    from .capy import CapyPuzzle
+    from .tiktok import TikTokCaptcha
+
+# class name -> module of the class (the module is imported on the first use of the class)
+_CLASS_MODULES = {
+    'ImageCaptcha': 'image',
+    'TextCaptcha': 'text',
+    'RecaptchaV2': 'recaptcha_v2',
+    'RecaptchaV3': 'recaptcha_v3',
+    'HCaptcha': 'hcaptcha',
+    'FunCaptcha': 'funcaptcha',
+    'KeyCaptcha': 'keycaptcha',
+    'GeeTest': 'geetest',
+    'GeeTestV4': 'geetest_v4',
+    'CapyPuzzle': 'capy',
+    'TikTokCaptcha': 'tiktok',
+}
+_CLASS_MODULES.update({name + 'Solution': module for name, module in _CLASS_MODULES.items()})
+
+
+def __getattr__(name: str):
+    if name not in _CLASS_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f'{__name__}.{_CLASS_MODULES[name]}'), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_CLASS_MODULES))
+
 
 __all__ = (
     'ImageCaptcha',
@@ -28,5 +63,7 @@ __all__ = (
     'GeeTestV4',
     'CapyPuzzle',
     'TikTokCaptcha',
-    'CaptchaType'
+    'CaptchaType',
+    'CaptchaRegistry',
+    'CAPTCHA_REGISTRY'
 )
@@ -3,11 +3,21 @@
 Base CAPTCHA stuff
 """
 
+import contextlib
+import contextvars
 import enum
+import hashlib
 import importlib
 from abc import ABC
 from dataclasses import asdict, dataclass, fields, MISSING
-from typing import Dict
+from functools import wraps
+from typing import Any, ContextManager, Dict, Iterator, Optional, Tuple, Type
+
+
+# trusted mode of the current context (None - use the global one)
+_TRUSTED_MODE: contextvars.ContextVar = contextvars.ContextVar('unicaps_trusted_mode',
+                                                               default=None)
+_trusted_mode_default = False
 
 
 class CaptchaType(enum.Enum):
@@ -26,21 +36,95 @@ class CaptchaType(enum.Enum):
     TIKTOK = "TikTokCaptcha"
 
 
+def set_trusted_mode(enabled: bool) -> None:
+    """
+    Enable or disable the trusted mode globally: the types of captcha and solution fields
+    aren't checked on creation of the objects.
+    """
+
+    global _trusted_mode_default  # pylint: disable=global-statement
+    _trusted_mode_default = enabled
+
+
+def is_trusted_mode() -> bool:
+    """ Check if the trusted mode is enabled in the current context """
+
+    trusted: Optional[bool] = _TRUSTED_MODE.get()
+    return _trusted_mode_default if trusted is None else trusted
+
+
+@contextlib.contextmanager
+def trusted_mode(enabled: bool = True) -> Iterator[None]:
+    """ Enable (or disable) the trusted mode in the current context """
+
+    token = _TRUSTED_MODE.set(enabled)
+    try:
+        yield
+    finally:
+        _TRUSTED_MODE.reset(token)
+
+
+def enforce_types(cls):
+    """ Check the types of the dataclass fields on creation (unless in the trusted mode) """
+
+    # imported with the first CAPTCHA module, "import unicaps" doesn't need it
+    import enforce_typing  # type: ignore  # pylint: disable=import-outside-toplevel
+
+    unchecked_init = cls.__init__
+    checked_init = enforce_typing.enforce_types(cls).__init__
+
+    @wraps(unchecked_init)
+    def __init__(self, *args, **kwargs):
+        if is_trusted_mode():
+            unchecked_init(self, *args, **kwargs)
+        else:
+            checked_init(self, *args, **kwargs)
+
+    cls.__init__ = __init__
+    return cls
+
+
 @dataclass
 class BaseCaptcha(ABC):
     """ Base class for any CAPTCHA """
 
+    # the solution of the same CAPTCHA can be reused (it isn't a single-use token)
+    SOLUTION_REUSABLE = False
+
     @classmethod
     def get_type(cls) -> CaptchaType:
         """ Return CaptchaType """
 
-        return CaptchaType(cls.__name__)
+        return CAPTCHA_REGISTRY.get_captcha_info(cls)[0]
 
     @classmethod
-    def get_solution_class(cls) -> 'BaseCaptchaSolution':
+    def get_solution_class(cls) -> Type['BaseCaptchaSolution']:
         """ Return appropriate solution class """
 
-        return getattr(importlib.import_module(cls.__module__), cls.__name__ + "Solution")
+        return CAPTCHA_REGISTRY.get_captcha_info(cls)[1]
+
+    def release_payload(self) -> None:
+        """ Release the payload (e.g. the image) once the CAPTCHA is solved """
+
+    def hold_payload(self) -> ContextManager:
+        """ Keep the payload read from a file in memory while the CAPTCHA is being solved """
+        return contextlib.nullcontext()
+
+    def get_fingerprint(self) -> str:
+        """ Content hash of the CAPTCHA: SHA-256 of its type and fields (equal for equal ones) """
+
+        digest = hashlib.sha256(self.get_type().value.encode())
+        for name, value in self._get_fingerprint_data():
+            data = value if isinstance(value, (bytes, memoryview)) else repr(value).encode()
+            digest.update(b'\0%s\0%d\0' % (name.encode(), len(data)))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def _get_fingerprint_data(self) -> Iterator[Tuple[str, Any]]:
+        """ (name, value) of the fields making the fingerprint """
+
+        for field in fields(self):
+            yield field.name, getattr(self, field.name)
 
     def get_optional_data(self, **kwargs) -> Dict:
         """
@@ -78,16 +162,13 @@ class BaseCaptchaSolution(ABC):
     def get_type(cls) -> CaptchaType:
         """ Returns CaptchaType """
 
-        return CaptchaType(cls.__name__.split("Solution", maxsplit=1)[0])
+        return CAPTCHA_REGISTRY.get_solution_info(cls)[0]
 
     @classmethod
-    def get_captcha_class(cls) -> BaseCaptcha:
-        """ Returns appropriate solution class """
+    def get_captcha_class(cls) -> Type[BaseCaptcha]:
+        """ Returns appropriate captcha class """
 
-        return getattr(
-            importlib.import_module(cls.__module__),
-            cls.__name__.split("Solution", maxsplit=1)[0]
-        )
+        return CAPTCHA_REGISTRY.get_solution_info(cls)[1]
 
     def __str__(self):
         return '\n'.join(str(getattr(self, field.name)) for field in fields(self))
@@ -95,3 +176,103 @@ class BaseCaptchaSolution(ABC):
     def as_dict(self):
         """ Get solution data as Python dictionary """
         return asdict(self)
+
+
+# modules of the built-in CAPTCHAs (imported on the first use of the CAPTCHA type)
+BUILTIN_CAPTCHA_MODULES = {
+    CaptchaType.IMAGE: 'image',
+    CaptchaType.TEXT: 'text',
+    CaptchaType.RECAPTCHAV2: 'recaptcha_v2',
+    CaptchaType.RECAPTCHAV3: 'recaptcha_v3',
+    CaptchaType.HCAPTCHA: 'hcaptcha',
+    CaptchaType.FUNCAPTCHA: 'funcaptcha',
+    CaptchaType.KEYCAPTCHA: 'keycaptcha',
+    CaptchaType.GEETEST: 'geetest',
+    CaptchaType.GEETESTV4: 'geetest_v4',
+    CaptchaType.CAPY: 'capy',
+    CaptchaType.TIKTOK: 'tiktok',
+}
+
+
+class CaptchaRegistry:
+    """
+    Registry of CAPTCHA classes: maps CaptchaType to the captcha and solution classes and back.
+    The built-in CAPTCHAs are registered on import of their modules (a module is imported
+    on the first lookup of its CAPTCHA type), a custom pair of classes (e.g. subclasses
+    of the built-in ones) can be registered for any CaptchaType.
+
+    :param modules: (optional) CaptchaType -> name of the module registering its classes.
+    """
+
+    def __init__(self, modules: Optional[Dict[CaptchaType, str]] = None):
+        self._modules = dict(modules or {})
+        self._types: Dict[CaptchaType, Tuple[Type[BaseCaptcha], Type[BaseCaptchaSolution]]] = {}
+        self._captchas: Dict[type, Tuple[CaptchaType, Type[BaseCaptchaSolution]]] = {}
+        self._solutions: Dict[type, Tuple[CaptchaType, Type[BaseCaptcha]]] = {}
+
+    def register(self, captcha_type: CaptchaType, captcha_class: Type[BaseCaptcha],
+                 solution_class: Type[BaseCaptchaSolution], replace: bool = True) -> None:
+        """
+        Register the captcha and solution classes of the CAPTCHA type
+        (the last registered pair is returned by get_classes() unless replace is False).
+        """
+
+        if not isinstance(captcha_type, CaptchaType):
+            raise TypeError('"captcha_type" must be CaptchaType!')
+        if not issubclass(captcha_class, BaseCaptcha):
+            raise TypeError('"captcha_class" must be a subclass of BaseCaptcha!')
+        if not issubclass(solution_class, BaseCaptchaSolution):
+            raise TypeError('"solution_class" must be a subclass of BaseCaptchaSolution!')
+
+        if replace or captcha_type not in self._types:
+            self._types[captcha_type] = (captcha_class, solution_class)
+        self._captchas[captcha_class] = (captcha_type, solution_class)
+        self._solutions[solution_class] = (captcha_type, captcha_class)
+
+    def get_classes(self, captcha_type: CaptchaType) -> Tuple[Type[BaseCaptcha],
+                                                              Type[BaseCaptchaSolution]]:
+        """ Return the captcha and solution classes of the CAPTCHA type """
+
+        try:
+            return self._types[captcha_type]
+        except KeyError:
+            pass
+
+        if captcha_type in self._modules:
+            importlib.import_module(f'{__package__}.{self._modules[captcha_type]}')
+            if captcha_type in self._types:
+                return self._types[captcha_type]
+        raise ValueError(f"{captcha_type} is not registered!")
+
+    def get_captcha_info(self, captcha_class: type) -> Tuple[CaptchaType,
+                                                             Type[BaseCaptchaSolution]]:
+        """ Return the CAPTCHA type and the solution class of the captcha class """
+
+        try:
+            return self._captchas[captcha_class]
+        except KeyError:
+            return self._lookup_parent(self._captchas, captcha_class)
+
+    def get_solution_info(self, solution_class: type) -> Tuple[CaptchaType, Type[BaseCaptcha]]:
+        """ Return the CAPTCHA type and the captcha class of the solution class """
+
+        try:
+            return self._solutions[solution_class]
+        except KeyError:
+            return self._lookup_parent(self._solutions, solution_class)
+
+    @staticmethod
+    def _lookup_parent(classes: Dict, cls: type):
+        """ Look up the closest registered parent class and remember the result """
+
+        for parent in cls.__mro__[1:]:
+            if parent in classes:
+                classes[cls] = classes[parent]
+                return classes[cls]
+        raise ValueError(f"{cls.__name__} is not registered!")
+
+    def __contains__(self, captcha_type: CaptchaType) -> bool:
+        return captcha_type in self._types or captcha_type in self._modules
+
+
+CAPTCHA_REGISTRY = CaptchaRegistry(BUILTIN_CAPTCHA_MODULES)
@@ -6,9 +6,8 @@ Capy Puzzle
 from dataclasses import dataclass
 from typing import Optional
 
-from enforce_typing import enforce_types  # type: ignore
-
-from .base import BaseCaptcha, BaseCaptchaSolution
+from .base import (BaseCaptcha, BaseCaptchaSolution, CAPTCHA_REGISTRY, CaptchaType,
+                   enforce_types)
 
 
 @enforce_types
@@ -29,3 +28,6 @@ class CapyPuzzleSolution(BaseCaptchaSolution):
     captchakey: str
     challengekey: str
     answer: str
+
+
+CAPTCHA_REGISTRY.register(CaptchaType.CAPY, CapyPuzzle, CapyPuzzleSolution, replace=False)
@@ -6,9 +6,8 @@ GeeTest CAPTCHA
 from dataclasses import dataclass
 from typing import Optional
 
-from enforce_typing import enforce_types  # type: ignore
-
-from .base import BaseCaptcha, BaseCaptchaSolution
+from .base import (BaseCaptcha, BaseCaptchaSolution, CAPTCHA_REGISTRY, CaptchaType,
+                   enforce_types)
 
 
 @enforce_types
@@ -30,3 +29,6 @@ class GeeTestSolution(BaseCaptchaSolution):
     challenge: str
     validate: str
     seccode: str
+
+
+CAPTCHA_REGISTRY.register(CaptchaType.GEETEST, GeeTest, GeeTestSolution, replace=False)
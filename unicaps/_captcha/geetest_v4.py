@@ -6,9 +6,8 @@ GeeTest v4 CAPTCHA
 from dataclasses import dataclass
 from typing import Optional
 
-from enforce_typing import enforce_types  # type: ignore
-
-from .base import BaseCaptcha, BaseCaptchaSolution
+from .base import (BaseCaptcha, BaseCaptchaSolution, CAPTCHA_REGISTRY, CaptchaType,
+                   enforce_types)
 
 
 @enforce_types
@@ -30,3 +29,6 @@ class GeeTestV4Solution(BaseCaptchaSolution):
     pass_token: str
     gen_time: str
     captcha_output: str
+
+
+CAPTCHA_REGISTRY.register(CaptchaType.GEETESTV4, GeeTestV4, GeeTestV4Solution, replace=False)
@@ -6,9 +6,8 @@ hCaptcha
 from dataclasses import dataclass
 from typing import Optional
 
-from enforce_typing import enforce_types  # type: ignore
-
-from .base import BaseCaptcha, BaseCaptchaSolution
+from .base import (BaseCaptcha, BaseCaptchaSolution, CAPTCHA_REGISTRY, CaptchaType,
+                   enforce_types)
 
 
 @enforce_types
@@ -28,3 +27,6 @@ class HCaptchaSolution(BaseCaptchaSolution):
     """ hCaptcha solution """
 
     token: str
+
+
+CAPTCHA_REGISTRY.register(CaptchaType.HCAPTCHA, HCaptcha, HCaptchaSolution, replace=False)
@@ -4,25 +4,97 @@ Image CAPTCHA
 """
 
 import base64
-import imghdr
+import contextlib
 import io
+import os
 import pathlib
 from dataclasses import dataclass
-from typing import Union, Optional
+from typing import Any, Iterator, Optional, Tuple, Union
 
-from enforce_typing import enforce_types  # type: ignore
-
-from .base import BaseCaptcha, BaseCaptchaSolution
+from .base import (BaseCaptcha, BaseCaptchaSolution, CAPTCHA_REGISTRY, CaptchaType,
+                   enforce_types)
+from .._misc.image import (IMAGE_HEADER_SIZE, IMAGE_SIZE_HEADER_SIZE, get_image_size,
+                           get_image_type)
 from ..common import CaptchaAlphabet, CaptchaCharType, WorkerLanguage
 from ..exceptions import BadInputDataError
 
 
+class _MemoryReader:
+    """ Read-only file-like view of the image in memory (no copy of the whole image) """
+
+    def __init__(self, data: memoryview, name: str):
+        self._data = data
+        self._position = 0
+        self.name = name
+
+    def read(self, size: int = -1) -> bytes:
+        """ Read up to size bytes """
+        end = len(self._data) if size < 0 else self._position + size
+        chunk = self._data[self._position:end].tobytes()
+        self._position += len(chunk)
+        return chunk
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        """ Change the position """
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self._position, os.SEEK_END: len(self._data)}
+        self._position = base[whence] + offset
+        return self._position
+
+    def tell(self) -> int:
+        """ Current position """
+        return self._position
+
+
+class _FileReader:
+    """ Read-only file-like object opening the image file on the first read """
+
+    def __init__(self, path: pathlib.Path, name: str):
+        self._path = path
+        self._file: Optional[io.BufferedReader] = None
+        self.name = name
+
+    def read(self, size: int = -1) -> bytes:
+        """ Read up to size bytes (the file is closed at the end) """
+        if self._file is None:
+            self._file = self._path.open('rb')
+        chunk = self._file.read(size)
+        if not chunk or size < 0:
+            self.close()
+        return chunk
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        """ Change the position """
+        if whence == os.SEEK_END:
+            return self._path.stat().st_size + offset
+        if self._file is None:
+            if offset == 0 and whence == os.SEEK_SET:
+                return 0
+            self._file = self._path.open('rb')
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        """ Current position """
+        return 0 if self._file is None else self._file.tell()
+
+    def close(self) -> None:
+        """ Close the file """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
 @enforce_types
 @dataclass
 class ImageCaptcha(BaseCaptcha):
-    """ Image CAPTCHA """
+    """
+    Image CAPTCHA.
+    The image file (pathlib.Path) is read when the CAPTCHA is sent (once per solving, as it may
+    change between them), streams are read on creation.
+    """
 
-    image: Union[bytes, io.RawIOBase, io.BufferedIOBase, pathlib.Path]
+    SOLUTION_REUSABLE = True
+
+    image: Union[bytes, io.RawIOBase, io.BufferedIOBase, pathlib.Path, memoryview]
     char_type: Optional[CaptchaCharType] = None
     is_phrase: Optional[bool] = None
     is_case_sensitive: Optional[bool] = None
@@ -35,37 +107,127 @@ class ImageCaptcha(BaseCaptcha):
 
     def __post_init__(self):
         self._image_bytes = None
-        self.get_image_bytes()
+        self._image_base64 = None
+        self._image_type = None
+        self._image_size = None
+        self._holding = False
+
+        if isinstance(self.image, (io.RawIOBase, io.BufferedIOBase)):
+            # a stream can be read once only
+            self._image_bytes = self.image.read()
+
+        # check image type
+        self.get_image_type()
+
+    def _reads_file(self) -> bool:
+        """ The image is read from the file on every use (it isn't held in memory) """
+        return isinstance(self.image, pathlib.Path) and self._image_bytes is None
+
+    def _get_image_memory(self) -> Union[bytes, memoryview]:
+        """ Image data without a copy (if it's in memory already) """
+
+        if self._image_bytes is not None:
+            return self._image_bytes
+        if isinstance(self.image, pathlib.Path):
+            image_bytes = self.image.read_bytes()
+            if self._holding:
+                self._image_bytes = image_bytes
+            return image_bytes
+        return self.image  # type: ignore
+
+    @contextlib.contextmanager
+    def hold_payload(self) -> Iterator[None]:
+        """
+        Keep the image file in memory once it's read while the CAPTCHA is being solved:
+        the fingerprint, the image pipeline and the upload share a single read (the upload
+        streams the file if nothing has read it before). The next solving reads the file
+        again, so a changed file is never sent with a stale encoding.
+        """
+
+        if self._holding or not isinstance(self.image, pathlib.Path):
+            yield
+            return
+
+        self._holding = True
+        try:
+            yield
+        finally:
+            self._holding = False
+            if isinstance(self.image, pathlib.Path):
+                self._image_bytes = None
+                self._image_base64 = None
+
+    def _get_image_header(self, size: int = IMAGE_HEADER_SIZE) -> Union[bytes, memoryview]:
+        if self._reads_file():
+            with self.image.open('rb') as file:
+                return file.read(size)
+        return memoryview(self._get_image_memory())[:size]
 
     def get_image_bytes(self) -> bytes:
         """ Bytes image """
 
-        if self._image_bytes is None:
-            if isinstance(self.image, bytes):
-                self._image_bytes = self.image  # type: ignore
-            elif isinstance(self.image, (io.RawIOBase, io.BufferedIOBase)):
-                self._image_bytes = self.image.read()
-            elif isinstance(self.image, pathlib.Path):
-                self._image_bytes = self.image.read_bytes()
+        image = self._get_image_memory()
+        return image if isinstance(image, bytes) else image.tobytes()
+
+    def get_image_file(self) -> Union[_MemoryReader, _FileReader]:
+        """ File-like object to upload the image from (reads it lazily) """
+
+        name = 'captcha.' + self.get_image_type()
+        if self._reads_file():
+            return _FileReader(self.image, name)
+        return _MemoryReader(memoryview(self._get_image_memory()), name)
 
-            # check image type
-            self.get_image_type()
+    def release_payload(self) -> None:
+        self.image = b''
+        self._image_bytes = b''
+        self._image_base64 = None
 
-        return self._image_bytes
+    def _get_fingerprint_data(self) -> Iterator[Tuple[str, Any]]:
+        # the image content instead of the file path or stream
+        yield 'image', self._get_image_memory()
+        for name, value in super()._get_fingerprint_data():
+            if name != 'image':
+                yield name, value
 
     def get_image_base64(self) -> bytes:
-        """ BASE64 image """
+        """ BASE64 image (it's encoded once unless it's read from the file every time) """
 
-        return base64.b64encode(self.get_image_bytes())
+        if self._image_base64 is not None:
+            return self._image_base64
+        image_base64 = base64.b64encode(self._get_image_memory())
+        if not self._reads_file():
+            self._image_base64 = image_base64
+        return image_base64
 
     def get_image_type(self) -> str:
         """ Get type of image file/data """
 
-        image_type = imghdr.what(None, h=self._image_bytes)
+        if self._image_type is None:
+            image_type = get_image_type(self._get_image_header())
 
-        if not image_type:
-            raise BadInputDataError("Unable to recognize image type!")
-        return image_type
+            if not image_type:
+                raise BadInputDataError("Unable to recognize image type!")
+            self._image_type = image_type
+        return self._image_type
+
+    def get_image_size(self) -> Tuple[int, int]:
+        """ Get (width, height) of the image from its header """
+
+        if self._image_size is None:
+            image_type = self.get_image_type()
+            if self._reads_file():
+                image_size = get_image_size(self._get_image_header(IMAGE_SIZE_HEADER_SIZE),
+                                            image_type)
+                if image_size is None:
+                    # the size is far from the beginning of the file
+                    image_size = get_image_size(self.image.read_bytes(), image_type)
+            else:
+                image_size = get_image_size(memoryview(self._get_image_memory()), image_type)
+
+            if not image_size:
+                raise BadInputDataError("Unable to get image size!")
+            self._image_size = image_size
+        return self._image_size
 
 
 @enforce_types
@@ -74,3 +236,6 @@ class ImageCaptchaSolution(BaseCaptchaSolution):
     """ Image CAPTCHA solution """
 
     text: str
+
+
+CAPTCHA_REGISTRY.register(CaptchaType.IMAGE, ImageCaptcha, ImageCaptchaSolution, replace=False)
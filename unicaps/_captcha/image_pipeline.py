@@ -0,0 +1,196 @@
+# -*- coding: UTF-8 -*-
+"""
+Image pre-processing pipeline shrinking the images before upload
+"""
+
+import asyncio
+import dataclasses
+import importlib.util
+import io
+import threading
+import time
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from ..exceptions import BadInputDataError, UnicapsException
+
+# factor of the image size reduction to fit the max file size of the service
+DOWNSCALE_FACTOR = 0.75
+# images aren't downscaled below it to fit the max file size of the service
+DOWNSCALE_MIN_DIMENSION = 32
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+    from .image import ImageCaptcha
+
+
+@dataclasses.dataclass
+class ImagePipelineStats:
+    """ Statistics of the image pipeline """
+
+    images: int = 0  # images processed
+    bytes_in: int = 0  # size of the source images
+    bytes_out: int = 0  # size of the uploaded images
+    seconds: float = 0.0  # time spent on processing
+
+    @property
+    def bytes_saved(self) -> int:
+        """ Bytes not uploaded thanks to the pipeline """
+        return self.bytes_in - self.bytes_out
+
+
+def _encode(image, image_format: str, keep_quality: bool) -> bytes:
+    output = io.BytesIO()
+    if image_format == 'JPEG':
+        image.save(output, 'JPEG', optimize=True, quality='keep' if keep_quality else 90)
+    elif image_format == 'GIF':
+        image.save(output, 'GIF', optimize=True)
+    else:
+        # PNG and the formats without lossless optimization
+        image.save(output, 'PNG', optimize=True)
+    return output.getvalue()
+
+
+def _process_image(data: bytes, grayscale: bool, max_dimension: Optional[int],
+                   max_filesize: Optional[int]) -> Tuple[Optional[bytes], float]:
+    """
+    Re-encode the image without metadata (runs in a worker process).
+
+    :return: new image data (None if the image is kept) and seconds spent.
+    """
+
+    from PIL import Image  # type: ignore  # pylint: disable=import-outside-toplevel
+
+    start_time = time.perf_counter()
+    image = Image.open(io.BytesIO(data))
+    image_format = image.format if image.format in ('JPEG', 'GIF') else 'PNG'
+
+    changed = False
+    if grayscale and image.mode not in ('1', 'L'):
+        image = image.convert('L')
+        changed = True
+    if max_dimension and max(image.size) > max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        changed = True
+
+    result: Optional[bytes] = _encode(image, image_format, keep_quality=not changed)
+    if not changed and len(result) >= len(data):  # type: ignore
+        result = None
+
+    while max_filesize and len(result or data) > max_filesize:
+        width, height = image.size
+        if min(width, height) * DOWNSCALE_FACTOR < DOWNSCALE_MIN_DIMENSION:
+            break
+        image = image.resize((int(width * DOWNSCALE_FACTOR), int(height * DOWNSCALE_FACTOR)),
+                             Image.LANCZOS)
+        result = _encode(image, image_format, keep_quality=False)
+
+    return result, time.perf_counter() - start_time
+
+
+class ImagePipeline:
+    """
+    Pre-processing of the images before upload: lossless re-encoding without metadata,
+    optional grayscale conversion and downscaling, the max file size of the service is enforced
+    (the image is downscaled to fit it, if re-encoding is enabled).
+    The images are processed in a process pool, so the event loop isn't blocked.
+    Re-encoding requires Pillow: pip install unicaps[images]
+
+    :param reencode: (optional) Re-encode the images.
+    :param grayscale: (optional) Convert the images to grayscale.
+    :param max_dimension: (optional) Max width and height of the images.
+    :param max_workers: (optional) Number of worker processes.
+    """
+
+    def __init__(self, reencode: bool = True, grayscale: bool = False,
+                 max_dimension: Optional[int] = None, max_workers: Optional[int] = None):
+        if (grayscale or max_dimension) and not reencode:
+            raise ValueError('"grayscale" and "max_dimension" require "reencode"!')
+        if reencode and importlib.util.find_spec('PIL') is None:
+            raise UnicapsException(
+                "Pillow is required to re-encode the images: pip install unicaps[images]"
+            )
+
+        self.reencode = reencode
+        self.grayscale = grayscale
+        self.max_dimension = max_dimension
+        self._max_workers = max_workers
+        self._executor: Optional['ProcessPoolExecutor'] = None
+        self._stats = ImagePipelineStats()
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> ImagePipelineStats:
+        """ Statistics (a snapshot) """
+        with self._lock:
+            return dataclasses.replace(self._stats)
+
+    def _get_executor(self) -> 'ProcessPoolExecutor':
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import ProcessPoolExecutor  # imports multiprocessing
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self._max_workers)
+            return self._executor
+
+    def _get_args(self, data: bytes, max_filesize: Optional[int]) -> tuple:
+        return data, self.grayscale, self.max_dimension, max_filesize
+
+    def _get_result(self, captcha: 'ImageCaptcha', data: bytes, result: Optional[bytes],
+                    seconds: float, max_filesize: Optional[int]) -> 'ImageCaptcha':
+        captcha_changed = result is not None
+        result = data if result is None else result
+        with self._lock:
+            self._stats.images += 1
+            self._stats.bytes_in += len(data)
+            self._stats.bytes_out += len(result)
+            self._stats.seconds += seconds
+
+        if max_filesize and len(result) > max_filesize:
+            raise BadInputDataError(
+                f"The image is too big: {len(result)} bytes (max {max_filesize} bytes)!"
+            )
+        if not captcha_changed:
+            return captcha
+        return dataclasses.replace(captcha, image=result)
+
+    def process(self, captcha: 'ImageCaptcha',
+                max_filesize: Optional[int] = None) -> 'ImageCaptcha':
+        """ Process the image of the CAPTCHA (a new CAPTCHA is returned if it's changed) """
+
+        data = captcha.get_image_bytes()
+        if not self.reencode:
+            return self._get_result(captcha, data, None, 0.0, max_filesize)
+
+        result, seconds = self._get_executor().submit(
+            _process_image, *self._get_args(data, max_filesize)
+        ).result()
+        return self._get_result(captcha, data, result, seconds, max_filesize)
+
+    async def process_async(self, captcha: 'ImageCaptcha',
+                            max_filesize: Optional[int] = None) -> 'ImageCaptcha':
+        """ Process the image of the CAPTCHA (async) """
+
+        data = captcha.get_image_bytes()
+        if not self.reencode:
+            return self._get_result(captcha, data, None, 0.0, max_filesize)
+
+        result, seconds = await asyncio.get_running_loop().run_in_executor(
+            self._get_executor(), _process_image, *self._get_args(data, max_filesize)
+        )
+        return self._get_result(captcha, data, result, seconds, max_filesize)
+
+    def close(self) -> None:
+        """ Stop the worker processes """
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -5,9 +5,8 @@ KeyCaptcha
 
 from dataclasses import dataclass
 
-from enforce_typing import enforce_types  # type: ignore
-
-from .base import BaseCaptcha, BaseCaptchaSolution
+from .base import (BaseCaptcha, BaseCaptchaSolution, CAPTCHA_REGISTRY, CaptchaType,
+                   enforce_types)
 
 
 @enforce_types
@@ -28,3 +27,6 @@ class KeyCaptchaSolution(BaseCaptchaSolution):
     """ KeyCaptcha solution """
 
     token: str
+
+
+CAPTCHA_REGISTRY.register(CaptchaType.KEYCAPTCHA, KeyCaptcha, KeyCaptchaSolution, replace=False)
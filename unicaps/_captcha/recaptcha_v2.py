@@ -6,9 +6,8 @@ Google reCAPTCHA v2
 from dataclasses import dataclass
 from typing import Optional
 
-from enforce_typing import enforce_types  # type: ignore
-
-from .base import BaseCaptcha, BaseCaptchaSolution
+from .base import (BaseCaptcha, BaseCaptchaSolution, CAPTCHA_REGISTRY, CaptchaType,
+                   enforce_types)
 
 
 @enforce_types
@@ -30,3 +29,6 @@ class RecaptchaV2Solution(BaseCaptchaSolution):
     """ Google reCAPTCHA v2 solution """
 
     token: str
+
+
+CAPTCHA_REGISTRY.register(CaptchaType.RECAPTCHAV2, RecaptchaV2, RecaptchaV2Solution, replace=False)
@@ -6,9 +6,8 @@ Google reCAPTCHA v3
 from dataclasses import dataclass
 from typing import Optional
 
-from enforce_typing import enforce_types  # type: ignore
-
-from .base import BaseCaptcha, BaseCaptchaSolution
+from .base import (BaseCaptcha, BaseCaptchaSolution, CAPTCHA_REGISTRY, CaptchaType,
+                   enforce_types)
 
 
 @enforce_types
@@ -30,3 +29,6 @@ class RecaptchaV3Solution(BaseCaptchaSolution):
     """ Google reCAPTCHA v3 solution """
 
     token: str
+
+
+CAPTCHA_REGISTRY.register(CaptchaType.RECAPTCHAV3, RecaptchaV3, RecaptchaV3Solution, replace=False)
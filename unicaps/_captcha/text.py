@@ -6,9 +6,8 @@ Text CAPTCHA
 from dataclasses import dataclass
 from typing import Optional
 
-from enforce_typing import enforce_types  # type: ignore
-
-from .base import BaseCaptcha, BaseCaptchaSolution
+from .base import (BaseCaptcha, BaseCaptchaSolution, CAPTCHA_REGISTRY, CaptchaType,
+                   enforce_types)
 from ..common import CaptchaAlphabet, WorkerLanguage
 
 
@@ -21,6 +20,8 @@ class TextCaptcha(BaseCaptcha):
     alphabet: Optional[CaptchaAlphabet] = None
     language: Optional[WorkerLanguage] = None
 
+    SOLUTION_REUSABLE = True
+
 
 @enforce_types
 @dataclass
@@ -28,3 +29,6 @@ class TextCaptchaSolution(BaseCaptchaSolution):
     """ Text CAPTCHA solution """
 
     text: str
+
+
+CAPTCHA_REGISTRY.register(CaptchaType.TEXT, TextCaptcha, TextCaptchaSolution, replace=False)
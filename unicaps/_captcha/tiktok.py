@@ -6,9 +6,8 @@ TikTokCaptcha
 from dataclasses import dataclass
 from typing import Optional
 
-from enforce_typing import enforce_types  # type: ignore
-
-from .base import BaseCaptcha, BaseCaptchaSolution
+from .base import (BaseCaptcha, BaseCaptchaSolution, CAPTCHA_REGISTRY, CaptchaType,
+                   enforce_types)
 
 
 @enforce_types
@@ -27,3 +26,6 @@ class TikTokCaptchaSolution(BaseCaptchaSolution):
     """ TikTokCaptcha solution """
 
     cookies: dict
+
+
+CAPTCHA_REGISTRY.register(CaptchaType.TIKTOK, TikTokCaptcha, TikTokCaptchaSolution, replace=False)
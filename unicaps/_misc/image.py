@@ -0,0 +1,140 @@
+# -*- coding: UTF-8 -*-
+"""
+Image type and size detection by the file header
+"""
+
+import struct
+from typing import Optional, Tuple, Union
+
+# bytes enough to recognize the image type (and the size of most images)
+IMAGE_HEADER_SIZE = 32
+# bytes to look for the size of JPEG, TIFF and AVIF images (the whole image is used if not found)
+IMAGE_SIZE_HEADER_SIZE = 64 * 1024
+
+# image type -> ((offset, magic bytes variants), ...), all the conditions must match
+IMAGE_SIGNATURES = (
+    ('png', ((0, (b'\x89PNG\r\n\x1a\n',)),)),
+    ('jpeg', ((0, (b'\xff\xd8\xff',)),)),
+    ('jpeg', ((6, (b'JFIF', b'Exif')),)),
+    ('gif', ((0, (b'GIF87a', b'GIF89a')),)),
+    ('webp', ((0, (b'RIFF',)), (8, (b'WEBP',)))),
+    ('avif', ((4, (b'ftyp',)), (8, (b'avif', b'avis')))),
+    ('tiff', ((0, (b'MM\x00*', b'II*\x00')),)),
+    ('bmp', ((0, (b'BM',)),)),
+)
+
+# JPEG "start of frame" markers containing the image size
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+def get_image_type(header: BytesLike) -> Optional[str]:
+    """ Recognize the image type (png, jpeg, gif, webp, avif, tiff or bmp) by the header """
+
+    header = bytes(header[:IMAGE_HEADER_SIZE])
+    for image_type, conditions in IMAGE_SIGNATURES:
+        if all(header.startswith(magic, offset) for offset, magic in conditions):
+            return image_type
+    return None
+
+
+def get_image_size(data: BytesLike, image_type: str) -> Optional[Tuple[int, int]]:
+    """
+    Get (width, height) of the image from its data (the header is enough for most types).
+
+    :return: None if the size isn't found in the data.
+    """
+
+    try:
+        return _SIZE_PARSERS[image_type](data)
+    except (KeyError, struct.error, IndexError):
+        return None
+
+
+def _get_png_size(data: BytesLike) -> Tuple[int, int]:
+    return struct.unpack_from('>II', data, 16)
+
+
+def _get_gif_size(data: BytesLike) -> Tuple[int, int]:
+    return struct.unpack_from('<HH', data, 6)
+
+
+def _get_bmp_size(data: BytesLike) -> Tuple[int, int]:
+    header_size, = struct.unpack_from('<I', data, 14)
+    if header_size == 12:  # OS/2 BITMAPCOREHEADER
+        return struct.unpack_from('<HH', data, 18)
+    width, height = struct.unpack_from('<ii', data, 18)
+    return width, abs(height)  # the height is negative for top-down images
+
+
+def _get_webp_size(data: BytesLike) -> Optional[Tuple[int, int]]:
+    chunk = bytes(data[12:16])
+    if chunk == b'VP8 ':
+        width, height = struct.unpack_from('<HH', data, 26)
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L':
+        bits, = struct.unpack_from('<I', data, 21)
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X':
+        size = bytes(data[24:30])
+        if len(size) < 6:
+            return None
+        return int.from_bytes(size[:3], 'little') + 1, int.from_bytes(size[3:], 'little') + 1
+    return None
+
+
+def _get_jpeg_size(data: BytesLike) -> Optional[Tuple[int, int]]:
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+
+        marker = data[offset + 1]
+        if marker == 0xFF:  # fill byte
+            offset += 1
+        elif marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:  # markers without data
+            offset += 2
+        elif marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack_from('>HH', data, offset + 5)
+            return width, height
+        else:
+            length, = struct.unpack_from('>H', data, offset + 2)
+            offset += 2 + length
+    return None
+
+
+def _get_tiff_size(data: BytesLike) -> Optional[Tuple[int, int]]:
+    byte_order = '<' if bytes(data[:2]) == b'II' else '>'
+    ifd_offset, = struct.unpack_from(byte_order + 'I', data, 4)
+    entry_count, = struct.unpack_from(byte_order + 'H', data, ifd_offset)
+
+    size = {}
+    for entry_offset in range(ifd_offset + 2, ifd_offset + 2 + entry_count * 12, 12):
+        tag, value_type = struct.unpack_from(byte_order + 'HH', data, entry_offset)
+        if tag in (256, 257):  # ImageWidth, ImageLength
+            value_format = 'H' if value_type == 3 else 'I'
+            size[tag], = struct.unpack_from(byte_order + value_format, data, entry_offset + 8)
+
+    if len(size) < 2:
+        return None
+    return size[256], size[257]
+
+
+def _get_avif_size(data: BytesLike) -> Optional[Tuple[int, int]]:
+    # "ispe" (image spatial extents) box: version and flags, width, height
+    index = bytes(data[:IMAGE_SIZE_HEADER_SIZE]).find(b'ispe')
+    if index < 0:
+        return None
+    return struct.unpack_from('>II', data, index + 8)
+
+
+_SIZE_PARSERS = {
+    'png': _get_png_size,
+    'gif': _get_gif_size,
+    'bmp': _get_bmp_size,
+    'webp': _get_webp_size,
+    'jpeg': _get_jpeg_size,
+    'tiff': _get_tiff_size,
+    'avif': _get_avif_size,
+}
@@ -0,0 +1,193 @@
+# -*- coding: UTF-8 -*-
+"""
+Metrics of the requests and the tasks
+"""
+
+import bisect
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SOLVE_TIME_BUCKETS = (5.0, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0, 90.0, 120.0, 180.0, 300.0)
+POLLS_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+# name -> (type, help, buckets of a histogram)
+METRICS: Dict[str, Tuple[str, str, Optional[Sequence[float]]]] = {
+    'unicaps_http_requests_total': (
+        'counter', 'HTTP requests to the services by status code or error', None
+    ),
+    'unicaps_http_request_duration_seconds': (
+        'histogram', 'Duration of the HTTP requests to the services', LATENCY_BUCKETS
+    ),
+    'unicaps_tasks_created_total': ('counter', 'Tasks created', None),
+    'unicaps_tasks_in_flight': ('gauge', 'Tasks waiting for the solutions', None),
+    'unicaps_solve_duration_seconds': (
+        'histogram', 'Seconds from creating a task to receiving its solution', SOLVE_TIME_BUCKETS
+    ),
+    'unicaps_polls_per_solution': (
+        'histogram', 'Number of requests checking a task for its solution', POLLS_BUCKETS
+    ),
+    'unicaps_errors_total': ('counter', 'Failed tasks by exception class', None),
+    'unicaps_spend_total': ('counter', 'Cost of the solved CAPTCHAs', None),
+}
+
+# (name, value) pairs sorted by name
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class MetricsSink(ABC):
+    """
+    Receiver of the metrics (see METRICS for their names and types).
+    Subclass it to send the metrics to a monitoring system.
+    """
+
+    @abstractmethod
+    def inc(self, name: str, labels: Labels, value: float = 1.0) -> None:
+        """ Increase a counter or change a gauge (the value may be negative then) """
+
+    @abstractmethod
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        """ Add a value to a histogram """
+
+
+class _Histogram:
+    """ Histogram of a metric with certain labels """
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+def _format_value(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        (key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+class PrometheusMetrics(MetricsSink):
+    """
+    Metrics kept in memory and exported in the Prometheus text format
+    (e.g. returned by the /metrics endpoint of the application).
+
+    :param buckets: (optional) Buckets of the histograms to override (name -> upper bounds).
+    """
+
+    def __init__(self, buckets: Optional[Dict[str, Sequence[float]]] = None):
+        buckets = {**{name: buckets_ for name, (_, _, buckets_) in METRICS.items() if buckets_},
+                   **(buckets or {})}
+        self._buckets = {name: tuple(sorted(value)) for name, value in buckets.items()}
+        self._values: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, labels: Labels, value: float = 1.0) -> None:
+        with self._lock:
+            values = self._values.setdefault(name, {})
+            values[labels] = values.get(labels, 0) + value
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        buckets = self._buckets[name]
+        with self._lock:
+            histograms = self._histograms.setdefault(name, {})
+            histogram = histograms.get(labels)
+            if histogram is None:
+                histogram = histograms[labels] = _Histogram(len(buckets))
+            index = bisect.bisect_left(buckets, value)
+            if index < len(buckets):
+                histogram.counts[index] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def get_value(self, name: str, **labels: str) -> float:
+        """ Value of a counter or a gauge (0 if it's missing) """
+
+        with self._lock:
+            return self._values.get(name, {}).get(tuple(sorted(labels.items())), 0)
+
+    def get_histogram(self, name: str, **labels: str) -> Tuple[int, float]:
+        """ Number and sum of the values of a histogram """
+
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(tuple(sorted(labels.items())))
+            return (0, 0.0) if histogram is None else (histogram.count, histogram.sum)
+
+    def render(self) -> str:
+        """ Metrics in the Prometheus text format """
+
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(set(self._values) | set(self._histograms)):
+                metric_type, help_text, _ = METRICS.get(name, ('untyped', name, None))
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                for labels, value in sorted(self._values.get(name, {}).items()):
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                for labels, histogram in sorted(self._histograms.get(name, {}).items()):
+                    cumulative = 0
+                    for bound, count in zip(self._buckets[name], histogram.counts):
+                        cumulative += count
+                        bucket_labels = labels + (('le', _format_value(bound)),)
+                        lines.append(f'{name}_bucket{_format_labels(bucket_labels)} {cumulative}')
+                    bucket_labels = labels + (('le', '+Inf'),)
+                    lines.append(
+                        f'{name}_bucket{_format_labels(bucket_labels)} {histogram.count}'
+                    )
+                    lines.append(f'{name}_sum{_format_labels(labels)} '
+                                 f'{_format_value(histogram.sum)}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+class ServiceMetrics:
+    """ Metrics of the tasks of a service """
+
+    def __init__(self, sink: MetricsSink, service: str):
+        self.sink = sink
+        self.service = service
+
+    def _get_labels(self, captcha_type, **labels: str) -> Labels:
+        return tuple(sorted(dict(labels, captcha_type=captcha_type.value,
+                                 service=self.service).items()))
+
+    def task_created(self, captcha_type) -> None:
+        """ A task is created """
+        self.sink.inc('unicaps_tasks_created_total', self._get_labels(captcha_type))
+
+    def task_failed(self, captcha_type, exception: BaseException) -> None:
+        """ Creating or solving a task failed """
+        self.sink.inc('unicaps_errors_total',
+                      self._get_labels(captcha_type, error=type(exception).__name__))
+
+    def wait_started(self, captcha_type) -> None:
+        """ Waiting for the solution of a task started """
+        self.sink.inc('unicaps_tasks_in_flight', self._get_labels(captcha_type))
+
+    def wait_finished(self, captcha_type, seconds: float, polls: int, cost: Optional[float],
+                      exception: Optional[BaseException] = None) -> None:
+        """ The solution of a task is received (or waiting for it failed) """
+
+        labels = self._get_labels(captcha_type)
+        self.sink.inc('unicaps_tasks_in_flight', labels, -1)
+        if exception is not None:
+            self.task_failed(captcha_type, exception)
+            return
+
+        self.sink.observe('unicaps_solve_duration_seconds', labels, seconds)
+        self.sink.observe('unicaps_polls_per_solution', labels, polls)
+        if cost:
+            self.sink.inc('unicaps_spend_total', labels, cost)
@@ -0,0 +1,186 @@
+# -*- coding: UTF-8 -*-
+"""
+Tracing of the phases of solving
+"""
+
+import importlib.util
+import time
+from typing import Any, Callable, Dict, Optional
+
+from ..exceptions import SolutionNotReadyYet, UnicapsException
+
+# phases (names of the spans)
+SPAN_SOLVE = 'unicaps.solve'  # solving a CAPTCHA from the start to the solution
+SPAN_CREATE_TASK = 'unicaps.create_task'  # creating a task (incl. the image pre-processing)
+SPAN_WAIT = 'unicaps.wait'  # waiting for the solution of a task
+SPAN_POLL = 'unicaps.poll'  # checking a task (or a group of tasks) for the solution
+SPAN_REQUEST = 'unicaps.request'  # request to the service: prepare + HTTP + parse
+SPAN_PREPARE = 'unicaps.request.prepare'  # preparing the request data (e.g. image to base64)
+SPAN_HTTP = 'unicaps.request.http'  # HTTP round-trip (incl. the retries)
+SPAN_PARSE = 'unicaps.request.parse'  # parsing the response
+
+
+class Span:
+    """
+    Phase of solving. The start and end times are monotonic nanoseconds (time.monotonic_ns()).
+    The spans of a task share its ID (the "task_id" attribute), the "poll" attribute of
+    the "unicaps.poll" spans is the number of the poll (1 for the first one).
+    """
+
+    __slots__ = ('tracer', 'name', 'attributes', 'start_time', 'end_time', 'exception')
+
+    def __init__(self, tracer: 'HookTracer', name: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.start_time: Optional[int] = None
+        self.end_time: Optional[int] = None
+        self.exception: Optional[BaseException] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """ Set an attribute known after the start (e.g. the ID of a created task) """
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> Optional[float]:
+        """ Seconds from the start to the end (None if the span isn't ended) """
+        if self.start_time is None or self.end_time is None:
+            return None
+        return (self.end_time - self.start_time) / 1e9
+
+    def __enter__(self) -> 'Span':
+        self.start_time = time.monotonic_ns()
+        self.tracer.on_start(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.end_time = time.monotonic_ns()
+        self.exception = exc_value
+        self.tracer.on_end(self)
+
+    def __repr__(self) -> str:
+        return f'<Span {self.name} {self.attributes!r}>'
+
+
+class _NoSpan:
+    """ Span of the no-op tracer """
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """ Ignore the attribute """
+
+    def __enter__(self) -> '_NoSpan':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+
+NO_SPAN = _NoSpan()
+
+
+class Tracer:
+    """ Receiver of the phases of solving (the base class doesn't trace anything) """
+
+    def span(self, name: str, **attributes: Any) -> Any:  # pylint: disable=unused-argument
+        """ Context manager of a phase with the attributes (None values are skipped) """
+        return NO_SPAN
+
+
+NO_TRACER = Tracer()
+
+
+class ServiceTracer(Tracer):
+    """ Tracer of the phases of a service (adds the name of the service to the spans) """
+
+    def __init__(self, tracer: Tracer, service: str):
+        self.tracer = tracer
+        self.service = service
+
+    def span(self, name: str, **attributes: Any) -> Any:
+        return self.tracer.span(name, service=self.service, **attributes)
+
+
+class HookTracer(Tracer):
+    """
+    Tracer calling the hooks on the start and on the end of every phase.
+    Subclass it and override on_start() and on_end() or pass the callables.
+
+    :param on_start: (optional) Callable receiving :class:`Span <Span>` when a phase starts.
+    :param on_end: (optional) Callable receiving :class:`Span <Span>` when a phase ends
+                   (its exception is set if the phase failed).
+    """
+
+    def __init__(self, on_start: Optional[Callable[[Span], None]] = None,
+                 on_end: Optional[Callable[[Span], None]] = None):
+        self._on_start = on_start
+        self._on_end = on_end
+
+    def span(self, name: str, **attributes: Any) -> Span:
+        return Span(self, name, {key: value for key, value in attributes.items()
+                                 if value is not None})
+
+    def on_start(self, span: Span) -> None:
+        """ A phase started """
+        if self._on_start is not None:
+            self._on_start(span)
+
+    def on_end(self, span: Span) -> None:
+        """ A phase ended """
+        if self._on_end is not None:
+            self._on_end(span)
+
+
+class _OpenTelemetrySpan:
+    """ OpenTelemetry span (current while the phase lasts) """
+
+    __slots__ = ('_tracer', '_name', '_attributes', '_context', '_span')
+
+    def __init__(self, tracer, name: str, attributes: Dict[str, Any]):
+        self._tracer = tracer
+        self._name = name
+        self._attributes = attributes
+        self._context = None
+        self._span = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """ Set an attribute known after the start """
+        if value is not None:
+            self._span.set_attribute(key, value)  # type: ignore
+
+    def __enter__(self) -> '_OpenTelemetrySpan':
+        self._context = self._tracer.start_as_current_span(self._name,
+                                                           attributes=self._attributes)
+        self._span = self._context.__enter__()  # type: ignore
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if isinstance(exc_value, SolutionNotReadyYet):
+            # not an error: the task is checked again later
+            self._span.set_attribute('ready', False)  # type: ignore
+            exc_type = exc_value = traceback = None
+        self._context.__exit__(exc_type, exc_value, traceback)  # type: ignore
+
+
+class OpenTelemetryTracer(Tracer):
+    """
+    Tracer creating OpenTelemetry spans (pip install unicaps[tracing]).
+
+    :param tracer_provider: (optional) OpenTelemetry TracerProvider (the global one by default).
+    """
+
+    def __init__(self, tracer_provider=None):
+        if importlib.util.find_spec('opentelemetry') is None:
+            raise UnicapsException(
+                "OpenTelemetry API is required for tracing: pip install unicaps[tracing]"
+            )
+
+        # pylint: disable=import-outside-toplevel
+        from opentelemetry import trace  # type: ignore
+
+        self._tracer = trace.get_tracer('unicaps', tracer_provider=tracer_provider)
+
+    def span(self, name: str, **attributes: Any) -> _OpenTelemetrySpan:
+        return _OpenTelemetrySpan(self._tracer, name, {key: value for key, value
+                                                       in attributes.items() if value is not None})
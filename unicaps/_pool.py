@@ -0,0 +1,271 @@
+# -*- coding: UTF-8 -*-
+"""
+TokenPool class
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Set
+
+from ._captcha.base import BaseCaptcha  # type: ignore
+from ._misc.proxy import ProxyServer
+from ._service.base import AsyncSolvedCaptcha
+from .exceptions import UnicapsException
+
+# seconds a token is valid since it's solved (reCAPTCHA and hCaptcha tokens)
+TOKEN_TTL = 120.0
+# a token isn't handed out if it expires in less than this number of seconds
+TOKEN_SAFETY_MARGIN = 10.0
+# solving time assumed before the first token is solved
+DEFAULT_SOLVE_TIME = 30.0
+# seconds the demand is measured over
+DEMAND_WINDOW = 60.0
+# weight of the last solving time in its moving average
+SOLVE_TIME_ALPHA = 0.3
+
+
+@dataclass
+class TokenPoolStats:
+    """ Token pool stats """
+
+    hits: int = 0  # tokens handed out right away
+    misses: int = 0  # requests waiting for a token to be solved
+    solved: int = 0  # tokens solved
+    expired: int = 0  # tokens expired unused
+    errors: int = 0  # failed solving attempts
+
+
+class _PoolEntry:
+    """ Tokens of the same CAPTCHA """
+
+    def __init__(self, captcha: BaseCaptcha, kwargs: Dict, min_size: int):
+        self.captcha = captcha
+        self.kwargs = kwargs
+        self.min_size = min_size
+        # solved tokens, the freshest one is the last
+        self.tokens: Deque[AsyncSolvedCaptcha] = deque()
+        self.in_flight: Set[asyncio.Future] = set()
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.requests: Deque[float] = deque()
+        self.solve_time = DEFAULT_SOLVE_TIME
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class TokenPool:
+    """Pool of pre-solved tokens :class:`TokenPool <TokenPool>` object.
+
+    Tokens of reCAPTCHA, hCaptcha and other token CAPTCHAs are valid for a short time only
+    (about 2 minutes), while solving takes tens of seconds. The pool solves the CAPTCHAs
+    in the background and hands out the freshest token right away.
+    The number of tokens kept follows the demand: the rate of requests of the CAPTCHA
+    multiplied by its solving time (but not less than the size the CAPTCHA is warmed up with).
+    No tokens are kept if they would expire before they are requested.
+
+    :param service: solving service instance.
+    :param max_size: (optional) Max number of tokens (solved and being solved) of a CAPTCHA.
+    :param token_ttl: (optional) Seconds a token is valid since it's solved.
+    :param safety_margin: (optional) A token expiring in less seconds isn't handed out.
+    :param demand_window: (optional) Seconds the demand is measured over.
+    """
+
+    def __init__(self, service, max_size: int = 10, token_ttl: float = TOKEN_TTL,
+                 safety_margin: float = TOKEN_SAFETY_MARGIN,
+                 demand_window: float = DEMAND_WINDOW):
+        if max_size < 1:
+            raise ValueError('"max_size" must be positive!')
+        if token_ttl <= safety_margin:
+            raise ValueError('"token_ttl" must be greater than "safety_margin"!')
+
+        self._service = service
+        self.max_size = max_size
+        self.token_ttl = token_ttl
+        self.safety_margin = safety_margin
+        self.demand_window = demand_window
+        self.stats = TokenPoolStats()
+        self._entries: Dict[str, _PoolEntry] = {}
+        self._closed = False
+
+    def _get_entry(self, captcha: BaseCaptcha, proxy: Optional[ProxyServer],
+                   user_agent: Optional[str], cookies: Optional[Dict[str, str]]) -> _PoolEntry:
+        if self._closed:
+            raise UnicapsException("The token pool is closed!")
+
+        # the tokens are bound to the CAPTCHA params (site key, page URL and options)
+        # and to the client solving them
+        key = repr((captcha, proxy, user_agent, sorted((cookies or {}).items())))
+        entry = self._entries.get(key)
+        if entry is None:
+            kwargs = dict(proxy=proxy, user_agent=user_agent, cookies=cookies)
+            entry = self._entries[key] = _PoolEntry(captcha, kwargs, min_size=0)
+        return entry
+
+    async def warm_up(self, captcha: BaseCaptcha, size: int = 1,
+                      proxy: Optional[ProxyServer] = None, user_agent: Optional[str] = None,
+                      cookies: Optional[Dict[str, str]] = None) -> None:
+        r"""Starts solving the CAPTCHA in the background and keeps the number of tokens
+        not less than size.
+
+        :param captcha: Captcha to solve.
+        :param size: (optional) Min number of tokens (solved and being solved), 0 to keep them
+                     on demand only.
+        :param proxy: (optional) Proxy to use while solving the CAPTCHA.
+        :param user_agent: (optional) User-Agent to use while solving the CAPTCHA.
+        :param cookies: (optional) Cookies to use while solving the CAPTCHA.
+        """
+
+        entry = self._get_entry(captcha, proxy, user_agent, cookies)
+        entry.min_size = min(size, self.max_size)
+        self._refill(entry)
+
+    async def get(self, captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
+                  user_agent: Optional[str] = None,
+                  cookies: Optional[Dict[str, str]] = None) -> AsyncSolvedCaptcha:
+        r"""Gets the freshest token of the CAPTCHA (waits for the next one if there are none).
+
+        :param captcha: Captcha to solve.
+        :param proxy: (optional) Proxy to use while solving the CAPTCHA.
+        :param user_agent: (optional) User-Agent to use while solving the CAPTCHA.
+        :param cookies: (optional) Cookies to use while solving the CAPTCHA.
+        :return: :class:`AsyncSolvedCaptcha <AsyncSolvedCaptcha>` object
+        :rtype: unicaps.AsyncSolvedCaptcha
+        """
+
+        entry = self._get_entry(captcha, proxy, user_agent, cookies)
+        entry.requests.append(time.monotonic())
+        self._purge(entry)
+
+        if entry.tokens:
+            self.stats.hits += 1
+            token = entry.tokens.pop()
+            self._refill(entry)
+            return token
+
+        self.stats.misses += 1
+        waiter = asyncio.get_running_loop().create_future()
+        entry.waiters.append(waiter)
+        self._refill(entry)
+        try:
+            return await waiter
+        finally:
+            if waiter in entry.waiters:
+                entry.waiters.remove(waiter)
+
+    def get_size(self, captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
+                 user_agent: Optional[str] = None,
+                 cookies: Optional[Dict[str, str]] = None) -> int:
+        """Number of tokens of the CAPTCHA ready to be handed out"""
+
+        entry = self._get_entry(captcha, proxy, user_agent, cookies)
+        self._purge(entry)
+        return len(entry.tokens)
+
+    def _expires_at(self, token: AsyncSolvedCaptcha) -> float:
+        """ time.monotonic() value the token can be handed out till """
+        return token.end_time_ns / 1e9 + self.token_ttl - self.safety_margin
+
+    def _purge(self, entry: _PoolEntry) -> None:
+        now = time.monotonic()
+        while entry.tokens and self._expires_at(entry.tokens[0]) <= now:
+            entry.tokens.popleft()
+            self.stats.expired += 1
+        while entry.requests and entry.requests[0] <= now - self.demand_window:
+            entry.requests.popleft()
+
+    def _get_target_size(self, entry: _PoolEntry) -> int:
+        """ Number of tokens (solved and being solved) to keep """
+
+        rate = len(entry.requests) / self.demand_window
+        if rate * (self.token_ttl - self.safety_margin) < 1:
+            # the tokens would expire before they are requested
+            return entry.min_size
+        return min(self.max_size, max(entry.min_size, math.ceil(rate * entry.solve_time)))
+
+    def _refill(self, entry: _PoolEntry) -> None:
+        if self._closed:
+            return
+
+        self._purge(entry)
+        # the tokens expiring before the new ones are solved are replaced already
+        renew_at = time.monotonic() + entry.solve_time
+        valid_count = sum(self._expires_at(token) > renew_at for token in entry.tokens)
+        target = max(self._get_target_size(entry), len(entry.waiters))
+
+        for _ in range(min(target, self.max_size) - valid_count - len(entry.in_flight)):
+            future = asyncio.ensure_future(
+                self._service.solve_captcha_async(entry.captcha, **entry.kwargs)
+            )
+            entry.in_flight.add(future)
+            future.add_done_callback(lambda f, entry=entry: self._on_solved(entry, f))
+
+        self._schedule_refill(entry)
+
+    def _schedule_refill(self, entry: _PoolEntry) -> None:
+        """ Refill the pool before the tokens expire (if they are still needed then) """
+
+        if entry.timer is not None:
+            entry.timer.cancel()
+            entry.timer = None
+        if entry.tokens:
+            delay = self._expires_at(entry.tokens[0]) - entry.solve_time - time.monotonic()
+            entry.timer = asyncio.get_running_loop().call_later(
+                max(delay, 0.0) + 0.001, self._refill, entry
+            )
+
+    def _on_solved(self, entry: _PoolEntry, future: asyncio.Future) -> None:
+        entry.in_flight.discard(future)
+        if future.cancelled():
+            return
+
+        exception = future.exception()
+        if exception is not None:
+            self.stats.errors += 1
+            # the error is passed to a waiting request (no retries without requests)
+            waiter = next((w for w in entry.waiters if not w.done()), None)
+            if waiter is not None:
+                entry.waiters.remove(waiter)
+                waiter.set_exception(exception)
+            return
+
+        token = future.result()
+        self.stats.solved += 1
+        entry.solve_time += SOLVE_TIME_ALPHA * (token.solving_time - entry.solve_time)
+
+        while entry.waiters:
+            waiter = entry.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(token)
+                break
+        else:
+            entry.tokens.append(token)
+        self._refill(entry)
+
+    @property
+    def pending_count(self) -> int:
+        """Number of tokens being solved"""
+        return sum(len(entry.in_flight) for entry in self._entries.values())
+
+    async def close(self) -> None:
+        """Stops solving the tokens (the solved ones are dropped)"""
+
+        self._closed = True
+        futures: List[asyncio.Future] = []
+        for entry in self._entries.values():
+            if entry.timer is not None:
+                entry.timer.cancel()
+            for waiter in entry.waiters:
+                if not waiter.done():
+                    waiter.set_exception(UnicapsException("The token pool is closed!"))
+            futures.extend(entry.in_flight)
+        for future in futures:
+            future.cancel()
+        await asyncio.gather(*futures, return_exceptions=True)
+        self._entries.clear()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
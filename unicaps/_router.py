@@ -0,0 +1,696 @@
+# -*- coding: UTF-8 -*-
+"""
+RoutedCaptchaSolver and AsyncRoutedCaptchaSolver classes
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from timeit import default_timer as timer
+from typing import Dict, List, Mapping, Optional, Set, Tuple, Type, Union
+
+from ._captcha import CaptchaType
+from ._captcha.base import BaseCaptcha  # type: ignore
+from ._misc.tracing import NO_TRACER
+from ._misc.proxy import ProxyServer
+from ._service import CaptchaSolvingService, SOLVING_SERVICE
+from ._service.base import (AsyncCaptchaTask, AsyncSolvedCaptcha, BaseService,
+                            CaptchaSolvingMixin, CaptchaTask)
+from ._solver import CaptchaSolver, _parse_service_name
+from ._solver_async import AsyncCaptchaSolver
+from ._transport.http_transport import StandardHTTPTransport
+from .exceptions import (CircuitOpenError, LowBalanceError, NetworkError, ServiceTooBusy,
+                         UnicapsException)
+
+# exceptions of a service making the router try the next one
+FAILOVER_EXCEPTIONS: Tuple[Type[Exception], ...] = (ServiceTooBusy, LowBalanceError, NetworkError,
+                                                    CircuitOpenError)
+# seconds after which the weight of a result is halved
+SCOREBOARD_HALF_LIFE = 300.0
+# max number of the last solving times kept per service and CAPTCHA type
+SCOREBOARD_WINDOW = 100
+
+
+class _ServiceStats:
+    """ Exponentially decayed stats of a service solving CAPTCHAs of a certain type """
+
+    # prior error rate and its weight (the error rate of an unused service returns to the prior)
+    PRIOR_ERROR_RATE = 0.05
+    PRIOR_WEIGHT = 1.0
+
+    def __init__(self, half_life: float):
+        self._half_life = half_life
+        self._solve_times: deque = deque(maxlen=SCOREBOARD_WINDOW)  # (timestamp, solve time)
+        self._successes = 0.0
+        self._errors = 0.0
+        self._cost: Optional[float] = None
+        # decayed cost of the paid tasks whose solutions weren't used (e.g. hedging losers)
+        self._wasted_cost = 0.0
+        self._updated = timer()
+
+    def _get_weight(self, age: float) -> float:
+        return 0.5 ** (age / self._half_life)
+
+    def _decay(self, now: float):
+        factor = self._get_weight(now - self._updated)
+        self._successes *= factor
+        self._errors *= factor
+        self._wasted_cost *= factor
+        self._updated = now
+
+    @property
+    def samples_count(self) -> int:
+        """ Number of solving times """
+        return len(self._solve_times)
+
+    def add_success(self, solve_time: float, cost: Optional[float]):
+        """ Record a solved CAPTCHA """
+
+        now = timer()
+        self._decay(now)
+        self._successes += 1
+        self._solve_times.append((now, solve_time))
+        if cost is not None:
+            self._cost = cost if self._cost is None else 0.8 * self._cost + 0.2 * cost
+
+    def add_error(self):
+        """ Record a failure """
+
+        self._decay(timer())
+        self._errors += 1
+
+    def add_wasted_cost(self, cost: float):
+        """ Record the cost of a paid task whose solution wasn't used """
+
+        self._decay(timer())
+        self._wasted_cost += cost
+
+    def get_percentile(self, percentile: float) -> Optional[float]:
+        """ Weighted percentile of solving time (the recent results weigh more) """
+
+        if not self._solve_times:
+            return None
+
+        now = timer()
+        samples = sorted(
+            (solve_time, self._get_weight(now - timestamp))
+            for timestamp, solve_time in self._solve_times
+        )
+        threshold = percentile * sum(weight for _, weight in samples)
+        cumulative_weight = 0.0
+        for solve_time, weight in samples:
+            cumulative_weight += weight
+            if cumulative_weight >= threshold:
+                return solve_time
+        return samples[-1][0]
+
+    @property
+    def error_rate(self) -> float:
+        """ Decayed error rate """
+
+        self._decay(timer())
+        return ((self._errors + self.PRIOR_ERROR_RATE * self.PRIOR_WEIGHT) /
+                (self._errors + self._successes + self.PRIOR_WEIGHT))
+
+    @property
+    def price(self) -> Optional[float]:
+        """ Average price of a task """
+        return self._cost
+
+    @property
+    def cost(self) -> Optional[float]:
+        """ Average cost of a used solution (incl. the share of the wasted tasks) """
+
+        if self._cost is None and not self._wasted_cost:
+            return None
+        self._decay(timer())
+        return (self._cost or 0.0) + self._wasted_cost / max(self._successes, 1.0)
+
+
+class Scoreboard:
+    """
+    Scores of the services per CAPTCHA type: the expected time to get a solution (p50 + the
+    tail weighted p95 excess), penalized by the cost and the error rate. The lower the better.
+
+    :param half_life: (optional) Seconds after which the weight of a result is halved.
+    :param tail_weight: (optional) Weight of (p95 - p50) in the score.
+    :param cost_weight: (optional) Seconds of solving time equal to a unit of cost.
+    """
+
+    def __init__(self, half_life: float = SCOREBOARD_HALF_LIFE, tail_weight: float = 0.5,
+                 cost_weight: float = 0.0):
+        self._half_life = half_life
+        self._tail_weight = tail_weight
+        self._cost_weight = cost_weight
+        self._stats: Dict[Tuple[CaptchaSolvingService, CaptchaType], _ServiceStats] = {}
+        self._lock = threading.Lock()
+
+    def _get_stats(self, service_name: CaptchaSolvingService,
+                   captcha_type: CaptchaType) -> _ServiceStats:
+        key = (service_name, captcha_type)
+        if key not in self._stats:
+            self._stats[key] = _ServiceStats(self._half_life)
+        return self._stats[key]
+
+    def record_success(self, service_name: CaptchaSolvingService, captcha_type: CaptchaType,
+                       solve_time: float, cost: Optional[float] = None) -> None:
+        """ Record a CAPTCHA solved by the service """
+
+        with self._lock:
+            self._get_stats(service_name, captcha_type).add_success(solve_time, cost)
+
+    def record_error(self, service_name: CaptchaSolvingService,
+                     captcha_type: CaptchaType) -> None:
+        """ Record a failure of the service """
+
+        with self._lock:
+            self._get_stats(service_name, captcha_type).add_error()
+
+    def record_wasted_cost(self, service_name: CaptchaSolvingService, captcha_type: CaptchaType,
+                           cost: float) -> None:
+        """ Record the cost of a paid task of the service whose solution wasn't used """
+
+        with self._lock:
+            self._get_stats(service_name, captcha_type).add_wasted_cost(cost)
+
+    def get_price(self, service_name: CaptchaSolvingService,
+                  captcha_type: CaptchaType) -> Optional[float]:
+        """ Average price of a task of the service (None if there is no data yet) """
+
+        with self._lock:
+            return self._get_stats(service_name, captcha_type).price
+
+    def get_percentile(self, service_name: CaptchaSolvingService, captcha_type: CaptchaType,
+                       percentile: float) -> Optional[float]:
+        """ Percentile of the solving time (None if there is no data yet) """
+
+        with self._lock:
+            return self._get_stats(service_name, captcha_type).get_percentile(percentile)
+
+    def _get_score(self, stats: _ServiceStats, unexplored_score: float = 0.0) -> float:
+        if stats.samples_count:
+            p50 = stats.get_percentile(0.5)
+            p95 = stats.get_percentile(0.95)
+            score = p50 + self._tail_weight * (p95 - p50)  # type: ignore
+            if stats.cost is not None:
+                score += self._cost_weight * stats.cost
+        else:
+            score = unexplored_score
+        return score / (1 - min(stats.error_rate, 0.95))
+
+    def get_score(self, service_name: CaptchaSolvingService, captcha_type: CaptchaType) -> float:
+        """ Score of the service for the CAPTCHA type """
+
+        with self._lock:
+            return self._get_score(self._get_stats(service_name, captcha_type))
+
+    def get_stats(self, service_name: CaptchaSolvingService, captcha_type: CaptchaType) -> Dict:
+        """
+        Stats of the service for the CAPTCHA type: p50, p95, error_rate, cost (per used
+        solution, incl. the wasted tasks) and score
+        """
+
+        with self._lock:
+            stats = self._get_stats(service_name, captcha_type)
+            return dict(
+                p50=stats.get_percentile(0.5),
+                p95=stats.get_percentile(0.95),
+                error_rate=stats.error_rate,
+                cost=stats.cost,
+                score=self._get_score(stats)
+            )
+
+    def rank(self, service_names: List[CaptchaSolvingService],
+             captcha_type: CaptchaType) -> List[CaptchaSolvingService]:
+        """ Sort the services from the best to the worst one """
+
+        with self._lock:
+            stats = {name: self._get_stats(name, captcha_type) for name in service_names}
+            # the unexplored services are as good as the best one (unless they fail)
+            unexplored_score = min(
+                (self._get_score(s) for s in stats.values() if s.samples_count), default=0.0
+            )
+            scores = {name: self._get_score(s, unexplored_score) for name, s in stats.items()}
+        return sorted(service_names, key=scores.__getitem__)
+
+
+@dataclass
+class HedgingPolicy:
+    """
+    Hedging policy: if a task isn't solved after the `percentile` of the historical solving time
+    of its service, the same CAPTCHA is sent to the next best service. The first solution wins,
+    waiting for the other one is cancelled (or it's reported as bad if `report_loser` is set).
+
+    The services can't cancel a task, so the losing one is charged anyway: hedging roughly
+    doubles the spend on the CAPTCHAs solved slower than the percentile. The cost of the losing
+    task is added to the cost of its service in the Scoreboard, so the routing sees it.
+    """
+
+    percentile: float = 0.9
+    # seconds before hedging while there are no stats of the service (None - don't hedge)
+    default_delay: Optional[float] = None
+    # min seconds before hedging
+    min_delay: float = 0.0
+    # wait for the losing task to be solved and report it as bad
+    report_loser: bool = False
+
+
+@dataclass
+class HedgingStats:
+    """ Hedging stats """
+
+    hedges: int = 0  # number of CAPTCHAs sent to the second service
+    wins: int = 0  # number of CAPTCHAs solved by the second service first
+    cost: float = 0.0  # cost of the losing tasks (the average price if the task is cancelled)
+
+
+class _RoutedService(CaptchaSolvingMixin):
+    """ Service-like object dispatching the tasks to several services """
+
+    SUPPORTS_PINGBACK = False
+
+    def __init__(self, services: Dict[CaptchaSolvingService, object], scoreboard: Scoreboard,
+                 failover_exceptions: Tuple[Type[Exception], ...] = FAILOVER_EXCEPTIONS,
+                 hedging: Optional['HedgingPolicy'] = None):
+        self.services = services
+        self.scoreboard = scoreboard
+        self.failover_exceptions = failover_exceptions
+        self.hedging = hedging
+        self.hedging_stats = HedgingStats()
+        self._reporters: Set[asyncio.Future] = set()
+        self.pingback_url: Optional[str] = None
+        self._service_names = {id(service): name for name, service in services.items()}
+
+    @property
+    def trusted(self) -> bool:
+        """ Skip the type checks of the CAPTCHA params and the solutions """
+        return all(service.trusted for service in self.services.values())  # type: ignore
+
+    @trusted.setter
+    def trusted(self, value: bool):
+        for service in self.services.values():
+            service.trusted = value  # type: ignore
+
+    def get_service_name(self, service) -> CaptchaSolvingService:
+        """ Name of the service instance """
+        return self._service_names[id(service)]
+
+    def _get_candidates(self, captcha: BaseCaptcha) -> List[CaptchaSolvingService]:
+        captcha_type = captcha.get_type()
+        candidates = [name for name, service in self.services.items()
+                      if captcha_type in service.supported_captchas]  # type: ignore
+        if not candidates:
+            raise UnicapsException(f"{captcha_type} is not supported by any of the services!")
+        return self.scoreboard.rank(candidates, captcha_type)
+
+    def create_task(self, captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
+                    user_agent: Optional[str] = None, cookies: Optional[Dict[str, str]] = None):
+        """ Creates task using the best service (the next one is used on failure) """
+
+        error = None
+        for name in self._get_candidates(captcha):
+            try:
+                return self.services[name].create_task(  # type: ignore
+                    captcha, proxy, user_agent, cookies
+                )
+            except self.failover_exceptions as exc:
+                self.scoreboard.record_error(name, captcha.get_type())
+                error = exc
+        raise error  # type: ignore
+
+    async def create_task_async(self, captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
+                                user_agent: Optional[str] = None,
+                                cookies: Optional[Dict[str, str]] = None):
+        """ Creates task using the best service (the next one is used on failure) """
+
+        return await self._create_task_async(self._get_candidates(captcha), captcha, proxy,
+                                             user_agent, cookies)
+
+    async def _create_task_async(self, candidates: List[CaptchaSolvingService],
+                                 captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
+                                 user_agent: Optional[str] = None,
+                                 cookies: Optional[Dict[str, str]] = None):
+        error = None
+        for name in candidates:
+            try:
+                return await self.services[name].create_task_async(  # type: ignore
+                    captcha, proxy, user_agent, cookies
+                )
+            except self.failover_exceptions as exc:
+                self.scoreboard.record_error(name, captcha.get_type())
+                error = exc
+        raise error  # type: ignore
+
+    def _record_result(self, task, start_time: float, result=None, exception=None):
+        name = self.get_service_name(task.service)
+        if exception is None:
+            self.scoreboard.record_success(name, task.captcha.get_type(),
+                                           timer() - start_time, result[1])
+        else:
+            self.scoreboard.record_error(name, task.captcha.get_type())
+
+    def _create_and_wait(self, captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
+                         user_agent: Optional[str] = None,
+                         cookies: Optional[Dict[str, str]] = None) -> Tuple[CaptchaTask, Tuple]:
+        """
+        Creates a task using the best service and waits for its solution. If the service fails
+        with a failover exception while creating the task or waiting for the solution, the
+        CAPTCHA is sent to the next service (the abandoned task may still be charged).
+        """
+
+        error = None
+        for name in self._get_candidates(captcha):
+            try:
+                task = self.services[name].create_task(  # type: ignore
+                    captcha, proxy, user_agent, cookies
+                )
+            except self.failover_exceptions as exc:
+                self.scoreboard.record_error(name, captcha.get_type())
+                error = exc
+                continue
+
+            try:
+                return task, self._wait_for_solution(task)
+            except self.failover_exceptions as exc:
+                error = exc
+        raise error  # type: ignore
+
+    async def _create_and_wait_async(self, captcha: BaseCaptcha,
+                                     proxy: Optional[ProxyServer] = None,
+                                     user_agent: Optional[str] = None,
+                                     cookies: Optional[Dict[str, str]] = None
+                                     ) -> Tuple[AsyncCaptchaTask, Tuple]:
+        """
+        Creates a task using the best service and waits for its solution (hedged if the policy
+        is set). The next service is used on a failover exception as in _create_and_wait().
+        """
+
+        error = None
+        for name in self._get_candidates(captcha):
+            try:
+                task = await self.services[name].create_task_async(  # type: ignore
+                    captcha, proxy, user_agent, cookies
+                )
+            except self.failover_exceptions as exc:
+                self.scoreboard.record_error(name, captcha.get_type())
+                error = exc
+                continue
+
+            try:
+                if self.hedging is None:
+                    return task, await self._wait_for_solution_async(task)
+                return await self._wait_for_solution_hedged(task, proxy, user_agent, cookies)
+            except self.failover_exceptions as exc:
+                error = exc
+        raise error  # type: ignore
+
+    def _get_provider(self, task) -> CaptchaSolvingService:
+        return self.get_service_name(task.service)
+
+    def _wait_for_solution(self, task):
+        start_time = timer()
+        try:
+            result = task.service.wait_for_solution(task)
+        except UnicapsException as exc:
+            self._record_result(task, start_time, exception=exc)
+            raise
+        self._record_result(task, start_time, result)
+        return result
+
+    async def _wait_for_solution_async(self, task):
+        start_time = timer()
+        try:
+            result = await task.service.wait_for_solution_async(task)
+        except UnicapsException as exc:
+            self._record_result(task, start_time, exception=exc)
+            raise
+        self._record_result(task, start_time, result)
+        return result
+
+    def _get_hedge_delay(self, task) -> Optional[float]:
+        solve_time = self.scoreboard.get_percentile(
+            self.get_service_name(task.service), task.captcha.get_type(),
+            self.hedging.percentile  # type: ignore
+        )
+        if solve_time is None:
+            return self.hedging.default_delay  # type: ignore
+        return max(solve_time, self.hedging.min_delay)  # type: ignore
+
+    async def _wait_for_solution_hedged(self, task, proxy, user_agent, cookies):
+        """
+        Wait for the solution, the same CAPTCHA is sent to the next service if the task isn't
+        solved in time. The first solution wins.
+        """
+
+        waiters = {asyncio.ensure_future(self._wait_for_solution_async(task)): task}
+        try:
+            delay = self._get_hedge_delay(task)
+            if delay is not None:
+                await asyncio.wait(list(waiters), timeout=delay)
+
+            primary_name = self.get_service_name(task.service)
+            candidates = [name for name in self._get_candidates(task.captcha)
+                          if name != primary_name]
+            if delay is not None and not any(waiter.done() for waiter in waiters) and candidates:
+                try:
+                    hedge_task = await self._create_task_async(candidates, task.captcha, proxy,
+                                                               user_agent, cookies)
+                except UnicapsException:  # hedging is the best effort
+                    pass
+                else:
+                    self.hedging_stats.hedges += 1
+                    waiters[asyncio.ensure_future(
+                        self._wait_for_solution_async(hedge_task)
+                    )] = hedge_task
+
+            pending = set(waiters)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [waiter for waiter in done if waiter.exception() is None]
+                if winners or not pending:
+                    break
+
+            if not winners:
+                # all of them failed, raise the error of the primary task
+                return task, next(iter(waiters)).result()
+
+            winner = winners[0]
+            if waiters[winner] is not task:
+                self.hedging_stats.wins += 1
+            for waiter, waiter_task in list(waiters.items()):
+                if waiter is not winner and self._handle_loser(waiter, waiter_task):
+                    del waiters[waiter]
+            return waiters[winner], winner.result()
+        finally:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.cancel()
+
+    def _handle_loser(self, waiter: asyncio.Future, task) -> bool:
+        """
+        Account the cost of the losing task. If report_loser is set, its solution is awaited
+        in the background and reported as bad (the services can't cancel a task).
+
+        :return: True if the waiter is kept running
+        """
+
+        if not waiter.done() and self.hedging.report_loser:  # type: ignore
+            reporter = asyncio.ensure_future(self._report_loser(waiter, task))
+            self._reporters.add(reporter)
+            reporter.add_done_callback(self._reporters.discard)
+            return True
+
+        if not waiter.done():
+            # the task is charged anyway, count the average price of the service
+            self._record_loser_cost(task, self.scoreboard.get_price(
+                self.get_service_name(task.service), task.captcha.get_type()
+            ))
+        elif waiter.exception() is None:
+            self._record_loser_cost(task, waiter.result()[1])
+            if self.hedging.report_loser:  # type: ignore
+                reporter = asyncio.ensure_future(self._report_bad_async(task, waiter.result()))
+                self._reporters.add(reporter)
+                reporter.add_done_callback(self._reporters.discard)
+        return False
+
+    async def _report_loser(self, waiter: asyncio.Future, task):
+        try:
+            result = await waiter
+        except UnicapsException:
+            return
+        self._record_loser_cost(task, result[1])
+        await self._report_bad_async(task, result)
+
+    def _record_loser_cost(self, task, cost: Optional[float]):
+        if not cost:
+            return
+        self.hedging_stats.cost += cost
+        self.scoreboard.record_wasted_cost(self.get_service_name(task.service),
+                                           task.captcha.get_type(), cost)
+
+    async def _report_bad_async(self, task, result):
+        solution, cost, extra = result
+        now = time.monotonic_ns()
+        solved_captcha = AsyncSolvedCaptcha(task, solution, now, now, cost=cost, extra=extra)
+        await task.service.report_bad_async(solved_captcha)
+
+    def wait_for_solution_future(self, task):
+        """ Wait for CAPTCHA solution in the background """
+
+        start_time = timer()
+        future = task.service.wait_for_solution_future(task)
+
+        def on_done(future):
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                self._record_result(task, start_time, exception=future.exception())
+            else:
+                self._record_result(task, start_time, future.result())
+
+        future.add_done_callback(on_done)
+        return future
+
+    def get_balance(self) -> Dict[CaptchaSolvingService, float]:
+        """ Get account balance of every service """
+        return {name: service.get_balance()  # type: ignore
+                for name, service in self.services.items()}
+
+    async def get_balance_async(self) -> Dict[CaptchaSolvingService, float]:
+        """ Get account balance of every service """
+        balances = await asyncio.gather(*(service.get_balance_async()  # type: ignore
+                                          for service in self.services.values()))
+        return dict(zip(self.services, balances))
+
+    def get_status(self) -> bool:
+        """ Get status (True if any of the services is available) """
+        return any(service.get_status() for service in self.services.values())  # type: ignore
+
+    async def get_status_async(self) -> bool:
+        """ Get status (True if any of the services is available) """
+        return any(await asyncio.gather(*(service.get_status_async()  # type: ignore
+                                          for service in self.services.values())))
+
+    def close(self):
+        """ Close connections """
+        for service in self.services.values():
+            service.close()  # type: ignore
+
+    async def close_async(self):
+        """ Close connections (async) """
+        for reporter in list(self._reporters):
+            reporter.cancel()
+        for service in self.services.values():
+            await service.close_async()  # type: ignore
+
+
+class RoutedCaptchaSolver(CaptchaSolver):
+    """Captcha solver :class:`RoutedCaptchaSolver <RoutedCaptchaSolver>` object dispatching
+    the CAPTCHAs to several services.
+
+    For every CAPTCHA type the service with the best recent score (solving time, error rate and
+    cost) is used, the next one is tried if the service is busy, out of funds or unreachable.
+
+    :param services: mapping of captcha solving service (enum CaptchaSolvingService or str)
+                     to API key.
+    :param half_life: (optional) Seconds after which the weight of a result is halved.
+    :param tail_weight: (optional) Weight of (p95 - p50) solving time in the score.
+    :param cost_weight: (optional) Seconds of solving time equal to a unit of cost.
+    :param failover_exceptions: (optional) Exceptions making the solver try the next service.
+    :param hedging: (optional) Hedging policy (used by AsyncRoutedCaptchaSolver only).
+    :param transport_settings: (optional) HTTP transport settings of every service.
+    :param transport: (optional) Transport shared by the services (it isn't closed
+                      by the solver).
+    :param trusted: (optional) Skip the type checks of the CAPTCHA params and the solutions.
+    """
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, services: Mapping[Union[CaptchaSolvingService, str], str],
+                 half_life: float = SCOREBOARD_HALF_LIFE, tail_weight: float = 0.5,
+                 cost_weight: float = 0.0,
+                 failover_exceptions: Tuple[Type[Exception], ...] = FAILOVER_EXCEPTIONS,
+                 hedging: Optional[HedgingPolicy] = None,
+                 transport_settings: Optional[Dict] = None,
+                 transport: Optional[StandardHTTPTransport] = None, trusted: bool = False):
+        if not services:
+            raise ValueError('"services" param must contain at least one service!')
+
+        self.api_keys = {_parse_service_name(name): api_key
+                         for name, api_key in services.items()}
+        self._service = _RoutedService(
+            {name: SOLVING_SERVICE[name].Service(  # type: ignore
+                api_key, transport_settings, transport
+            ) for name, api_key in self.api_keys.items()},
+            Scoreboard(half_life=half_life, tail_weight=tail_weight, cost_weight=cost_weight),
+            failover_exceptions=failover_exceptions,
+            hedging=hedging
+        )
+        self._service.trusted = trusted
+        self._pingback_receiver = None
+
+    @property
+    def scoreboard(self) -> Scoreboard:
+        """Scoreboard of the services
+
+        :rtype: unicaps.Scoreboard
+        """
+        return self._service.scoreboard  # type: ignore
+
+    @property
+    def hedging_stats(self) -> HedgingStats:
+        """Hedging stats: number of hedges, wins of the second service and cost of the losers
+
+        :rtype: unicaps.HedgingStats
+        """
+        return self._service.hedging_stats  # type: ignore
+
+    def _get_services(self) -> Dict[CaptchaSolvingService, BaseService]:
+        return self._service.services  # type: ignore
+
+    def set_tracer(self, tracer) -> None:
+        """Sets the receiver of the phases of solving (of the router and of every service)"""
+        super().set_tracer(tracer)
+        # the routed solving is traced as well, the phases of the services are nested in it
+        self._service.tracer = tracer or NO_TRACER  # type: ignore
+
+    def enable_pingback(self, url: str, host: str = '127.0.0.1',
+                        port: Optional[int] = None, token: Optional[str] = None) -> None:
+        """Pingback mode is not supported by the router"""
+        raise UnicapsException("Pingback is not supported by RoutedCaptchaSolver!")
+
+    def get_balance(self) -> Dict[CaptchaSolvingService, float]:  # type: ignore
+        """Get account balance of every service
+
+        :return: dict of service -> balance amount
+        :rtype: dict
+        """
+        return self._service.get_balance()  # type: ignore
+
+
+class AsyncRoutedCaptchaSolver(RoutedCaptchaSolver, AsyncCaptchaSolver):
+    """Async captcha solver :class:`AsyncRoutedCaptchaSolver <AsyncRoutedCaptchaSolver>`
+    object dispatching the CAPTCHAs to several services.
+
+    :param services: mapping of captcha solving service (enum CaptchaSolvingService or str)
+                     to API key.
+    :param half_life: (optional) Seconds after which the weight of a result is halved.
+    :param tail_weight: (optional) Weight of (p95 - p50) solving time in the score.
+    :param cost_weight: (optional) Seconds of solving time equal to a unit of cost.
+    :param failover_exceptions: (optional) Exceptions making the solver try the next service.
+    :param hedging: (optional) Hedging policy: the same CAPTCHA is sent to the second service
+                    if it isn't solved in time, the first solution wins.
+    :param transport_settings: (optional) HTTP transport settings of every service.
+    :param transport: (optional) Transport shared by the services (it isn't closed
+                      by the solver).
+    :param trusted: (optional) Skip the type checks of the CAPTCHA params and the solutions.
+    """
+
+    async def get_balance(self) -> Dict[CaptchaSolvingService, float]:  # type: ignore
+        """Get account balance of every service
+
+        :return: dict of service -> balance amount
+        :rtype: dict
+        """
+        return await self._service.get_balance_async()  # type: ignore
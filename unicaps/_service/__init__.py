@@ -4,10 +4,9 @@ Certain services related stuff
 """
 
 import enum
-# pylint: disable=import-self
-from . import (
-    anti_captcha, azcaptcha, captcha_guru, cptch_net, deathbycaptcha, rucaptcha, twocaptcha
-)
+import importlib
+from types import ModuleType
+from typing import Dict, Iterator, Mapping
 
 
 class CaptchaSolvingService(enum.Enum):
@@ -22,13 +21,29 @@ class CaptchaSolvingService(enum.Enum):
     TWOCAPTCHA = "2captcha.com"
 
 
+class _LazyServiceMapping(Mapping):
+    """ CaptchaSolvingService -> service module, the module is imported on the first use """
+
+    def __init__(self, modules: Dict[CaptchaSolvingService, str]):
+        self._modules = modules
+
+    def __getitem__(self, service_name: CaptchaSolvingService) -> ModuleType:
+        return importlib.import_module(f'{__name__}.{self._modules[service_name]}')
+
+    def __iter__(self) -> Iterator[CaptchaSolvingService]:
+        return iter(self._modules)
+
+    def __len__(self) -> int:
+        return len(self._modules)
+
+
 # supported CAPTCHA solving services
-SOLVING_SERVICE = {
-    CaptchaSolvingService.ANTI_CAPTCHA: anti_captcha,
-    CaptchaSolvingService.AZCAPTCHA: azcaptcha,
-    CaptchaSolvingService.CAPTCHA_GURU: captcha_guru,
-    CaptchaSolvingService.CPTCH_NET: cptch_net,
-    CaptchaSolvingService.DEATHBYCAPTCHA: deathbycaptcha,
-    CaptchaSolvingService.RUCAPTCHA: rucaptcha,
-    CaptchaSolvingService.TWOCAPTCHA: twocaptcha
-}
+SOLVING_SERVICE = _LazyServiceMapping({
+    CaptchaSolvingService.ANTI_CAPTCHA: 'anti_captcha',
+    CaptchaSolvingService.AZCAPTCHA: 'azcaptcha',
+    CaptchaSolvingService.CAPTCHA_GURU: 'captcha_guru',
+    CaptchaSolvingService.CPTCH_NET: 'cptch_net',
+    CaptchaSolvingService.DEATHBYCAPTCHA: 'deathbycaptcha',
+    CaptchaSolvingService.RUCAPTCHA: 'rucaptcha',
+    CaptchaSolvingService.TWOCAPTCHA: 'twocaptcha'
+})
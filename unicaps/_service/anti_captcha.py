@@ -175,6 +175,9 @@ class ReportBadRequest(Request):
 class TaskRequest(Request):
     """ Request class for requests to /createTask """
 
+    # the request creates a paid task
+    idempotent = False
+
     # pylint: disable=arguments-differ,unused-argument
     def prepare(self, captcha, proxy, user_agent, cookies) -> dict:  # type: ignore
         """ Prepare a request """
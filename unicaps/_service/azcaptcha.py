@@ -3,14 +3,14 @@
 azcaptcha.com service
 """
 from .base import HTTPService
-from .._transport.http_transport import HTTPRequestJSON  # type: ignore
 from .. import exceptions
 from .._captcha import CaptchaType
 from ..common import CaptchaAlphabet
+from .twocaptcha import MultiSolutionMixin, Request
 
 __all__ = [
     'Service', 'GetBalanceRequest', 'GetStatusRequest',
-    'ReportGoodRequest', 'ReportBadRequest',
+    'ReportGoodRequest', 'ReportBadRequest', 'MultiSolutionRequest',
     'ImageCaptchaTaskRequest', 'ImageCaptchaSolutionRequest',
     'RecaptchaV2TaskRequest', 'RecaptchaV2SolutionRequest',
     'RecaptchaV3TaskRequest', 'RecaptchaV3SolutionRequest',
@@ -23,6 +23,7 @@ class Service(HTTPService):
     """ Main service class for 2captcha """
 
     BASE_URL = 'http://azcaptcha.com'
+    SUPPORTS_MULTIPART_UPLOAD = True
 
     def _post_init(self):
         """ Init settings """
@@ -39,55 +40,6 @@ class Service(HTTPService):
                 self.settings[captcha_type].polling_delay = 5
 
 
-class Request(HTTPRequestJSON):
-    """ Common Request class for 2captcha """
-
-    def parse_response(self, response) -> dict:
-        """ Parse response and checks for errors """
-
-        response_data = super().parse_response(response)
-
-        if response_data.pop("status") == 1:
-            return response_data
-
-        ###############
-        # handle errors
-        ###############
-        error_code = response_data["request"]
-        error_text = response_data.get("error_text", "")
-        error_msg = f"{error_code}: {error_text}"
-
-        if error_code == 'CAPCHA_NOT_READY':  # pylint: disable=no-else-raise
-            raise exceptions.SolutionNotReadyYet()
-        elif error_code in ('ERROR_WRONG_USER_KEY', 'ERROR_KEY_DOES_NOT_EXIST',
-                            'ERROR_IP_NOT_ALLOWED', 'IP_BANNED'):
-            raise exceptions.AccessDeniedError(error_msg)
-        elif error_code in ('ERROR_ZERO_BALANCE',):
-            raise exceptions.LowBalanceError(error_msg)
-        elif error_code in ('ERROR_NO_SLOT_AVAILABLE',):
-            # If server returns ERROR_NO_SLOT_AVAILABLE make a 5 seconds timeout before sending
-            # next request.
-            # time.sleep(5)
-            raise exceptions.ServiceTooBusy(error_msg)
-        elif error_code in ('MAX_USER_TURN',) or error_code.startswith('ERROR:'):
-            raise exceptions.TooManyRequestsError(error_msg)
-        elif error_code in ('ERROR_WRONG_ID_FORMAT', 'ERROR_WRONG_CAPTCHA_ID'):
-            raise exceptions.MalformedRequestError(error_msg)
-        elif error_code in ('ERROR_ZERO_CAPTCHA_FILESIZE', 'ERROR_TOO_BIG_CAPTCHA_FILESIZE',
-                            'ERROR_WRONG_FILE_EXTENSION', 'ERROR_IMAGE_TYPE_NOT_SUPPORTED',
-                            'ERROR_UPLOAD', 'ERROR_PAGEURL', 'ERROR_BAD_TOKEN_OR_PAGEURL',
-                            'ERROR_GOOGLEKEY', 'ERROR_BAD_PARAMETERS', 'ERROR_TOKEN_EXPIRED',
-                            'ERROR_EMPTY_ACTION'):
-            raise exceptions.BadInputDataError(error_msg)
-        elif error_code in ('ERROR_CAPTCHAIMAGE_BLOCKED', 'ERROR_CAPTCHA_UNSOLVABLE',
-                            'ERROR_BAD_DUPLICATES'):
-            raise exceptions.UnableToSolveError(error_msg)
-        elif error_code in ('ERROR_BAD_PROXY', 'ERROR_PROXY_CONNECTION_FAILED'):
-            raise exceptions.ProxyError(error_msg)
-
-        raise exceptions.ServiceError(error_msg)
-
-
 class InRequest(Request):
     """ Request class for requests to /in.php """
 
@@ -204,6 +156,9 @@ class ReportBadRequest(ResRequest):
 class TaskRequest(InRequest):
     """ Common Task Request class """
 
+    # the request creates a paid task
+    idempotent = False
+
     # pylint: disable=arguments-differ,unused-argument
     def prepare(self, captcha, proxy, user_agent, cookies):
         request = super().prepare(
@@ -268,6 +223,13 @@ class SolutionRequest(ResRequest):
         )
 
 
+class MultiSolutionRequest(MultiSolutionMixin, ResRequest):
+    """ Solution request for several tasks at once """
+
+    CAPTCHA_TYPES = frozenset((CaptchaType.IMAGE, CaptchaType.RECAPTCHAV2, CaptchaType.RECAPTCHAV3,
+                               CaptchaType.HCAPTCHA))
+
+
 class ImageCaptchaTaskRequest(TaskRequest):
     """ ImageCaptchaTask Request class """
 
@@ -283,12 +245,16 @@ class ImageCaptchaTaskRequest(TaskRequest):
         )
 
         # add required params
-        request['data'].update(
-            dict(
-                method="base64",
-                body=captcha.get_image_base64().decode('ascii')
+        if self._service.multipart_upload:
+            request['data']['method'] = 'post'
+            request['files'] = dict(file=captcha.get_image_file())
+        else:
+            request['data'].update(
+                dict(
+                    method="base64",
+                    body=captcha.get_image_base64().decode('ascii')
+                )
             )
-        )
 
         # add optional params
         request['data'].update(
@@ -4,63 +4,381 @@ Base service stuff
 """
 
 import asyncio
+import concurrent.futures
+import contextvars
 import time
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from contextlib import nullcontext
+from dataclasses import dataclass, field
 from datetime import datetime
-from inspect import getmodule
+from inspect import getmodule, isclass
 from timeit import default_timer as timer
-from typing import Dict, Optional, Tuple
-
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple, Type, Union
+
+from .cache import SolutionCache
+from .circuit import CircuitBreaker
+from .poller import TaskPoller, ThreadTaskPoller
+from .ratelimit import ENDPOINT_CREATE, ENDPOINT_POLL, NO_RATE_LIMIT, RateLimiter
+from .singleflight import SingleFlight, copy_future_state
+from .polling import PollingStrategy, get_solve_time
+from .._transport.base import BaseRequest, BaseTransport  # type: ignore
 from .._transport.http_transport import StandardHTTPTransport  # type: ignore
 from .._captcha import CaptchaType
-from .._captcha.base import BaseCaptcha, BaseCaptchaSolution
+from .._captcha.image_pipeline import ImagePipeline
+from .._captcha.base import BaseCaptcha, BaseCaptchaSolution, trusted_mode
+from .._misc.metrics import MetricsSink, ServiceMetrics
+from .._misc.tracing import (NO_TRACER, SPAN_CREATE_TASK, SPAN_POLL, SPAN_SOLVE, SPAN_WAIT,
+                             ServiceTracer, Tracer)
 from .._misc.proxy import ProxyServer
 from ..exceptions import UnicapsException, SolutionWaitTimeout, SolutionNotReadyYet
 
 
-class BaseService(ABC):
+# time.monotonic_ns() + _MONOTONIC_TO_WALL_NS = time.time_ns()
+_MONOTONIC_TO_WALL_NS = time.time_ns() - time.monotonic_ns()
+
+
+class _DispatchTable:
+    """ Request classes of a service module, looked up once per service class """
+
+    def __init__(self, module):
+        self.requests: Dict[str, Type[BaseRequest]] = {
+            name[:-len('Request')]: obj for name, obj in vars(module).items()
+            # cap.guru wraps the requests into non-BaseRequest classes
+            if name.endswith('Request') and isclass(obj) and hasattr(obj, 'prepare')
+        }
+        self.task_requests: Dict[CaptchaType, Type[BaseRequest]] = {}
+        self.solution_requests: Dict[CaptchaType, Type[BaseRequest]] = {}
+        for captcha_type in CaptchaType:
+            if captcha_type.value + 'Task' in self.requests:
+                self.task_requests[captcha_type] = self.requests[captcha_type.value + 'Task']
+            if captcha_type.value + 'Solution' in self.requests:
+                self.solution_requests[captcha_type] = self.requests[
+                    captcha_type.value + 'Solution'
+                ]
+        self.supported_captchas: FrozenSet[CaptchaType] = frozenset(self.task_requests)
+        self.endpoints: Dict[Type[BaseRequest], str] = {
+            request_class: ENDPOINT_CREATE for request_class in self.task_requests.values()
+        }
+        self.multi_solution_request = self.requests.get('MultiSolution')
+
+
+class CaptchaSolvingMixin:
+    """
+    Solving of a CAPTCHA around creating a task and waiting for its solution: the solution
+    cache, the coalescing of identical CAPTCHAs and the tracing. The services create a task and
+    wait for it, the router overrides _create_and_wait() to choose the service.
+    """
+
+    # cache of the solutions of deterministic CAPTCHAs
+    solution_cache: Optional[SolutionCache] = None
+    # coalescing of concurrent solving of identical CAPTCHAs
+    single_flight: Optional[SingleFlight] = None
+    # receiver of the phases of solving
+    tracer: Tracer = NO_TRACER
+
+    def solve_captcha(self, captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
+                      user_agent: Optional[str] = None,
+                      cookies: Optional[Dict[str, str]] = None) -> 'SolvedCaptcha':
+        """ Solves captcha and returns SolvedCaptcha object """
+
+        key = get_single_flight_key(self, captcha, proxy, user_agent, cookies)
+        if key is not None:
+            return self.single_flight.call(  # type: ignore
+                key, lambda: self._solve_captcha(captcha, proxy, user_agent, cookies)
+            )
+        return self._solve_captcha(captcha, proxy, user_agent, cookies)
+
+    def _solve_captcha(self, captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
+                       user_agent: Optional[str] = None,
+                       cookies: Optional[Dict[str, str]] = None) -> 'SolvedCaptcha':
+        with captcha.hold_payload(), \
+                self.tracer.span(SPAN_SOLVE, captcha_type=captcha.get_type().value) as span:
+            start_time = time.monotonic_ns()
+            fingerprint = get_fingerprint(self, captcha)
+            if fingerprint is not None:
+                solved = get_cached_solution(self, captcha, fingerprint, start_time)
+                if solved is not None:
+                    span.set_attribute('cached', True)
+                    return solved
+
+            task, result = self._create_and_wait(captcha, proxy, user_agent, cookies)
+            span.set_attribute('task_id', task.task_id)
+            return self._get_solved_captcha(task, result, start_time, fingerprint)
+
+    def solve_captcha_future(self, captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
+                             user_agent: Optional[str] = None,
+                             cookies: Optional[Dict[str, str]] = None
+                             ) -> concurrent.futures.Future:
+        """
+        Solves captcha in the background: the task is created in the calling thread, then
+        the shared poller waits for its solution. The solution cache and the coalescing are
+        the same as in solve_captcha().
+
+        :return: future of SolvedCaptcha object
+        """
+
+        key = get_single_flight_key(self, captcha, proxy, user_agent, cookies)
+        if key is not None:
+            return self.single_flight.call_future(  # type: ignore
+                key, lambda: self._solve_captcha_future(captcha, proxy, user_agent, cookies)
+            )
+        return self._solve_captcha_future(captcha, proxy, user_agent, cookies)
+
+    def _solve_captcha_future(self, captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
+                              user_agent: Optional[str] = None,
+                              cookies: Optional[Dict[str, str]] = None
+                              ) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        span = self.tracer.span(SPAN_SOLVE, captcha_type=captcha.get_type().value)
+        # the span ends in the poller thread, so it's current in a context of its own
+        context = contextvars.copy_context()
+        try:
+            start_time, fingerprint, waiting = context.run(
+                self._start_solving_future, span, captcha, proxy, user_agent, cookies
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            future.set_exception(exc)
+            return future
+
+        if isinstance(waiting, SolvedCaptcha):
+            future.set_result(waiting)
+            return future
+
+        task, result_future = waiting
+        span.set_attribute('task_id', task.task_id)
+
+        def on_result(result_future: concurrent.futures.Future):
+            exception = (concurrent.futures.CancelledError() if result_future.cancelled()
+                         else result_future.exception())
+            context.run(span.__exit__, type(exception) if exception else None, exception, None)
+            if exception is None and not future.done():
+                future.set_result(self._get_solved_captcha(task, result_future.result(),
+                                                           start_time, fingerprint))
+            else:
+                copy_future_state(result_future, future)
+
+        result_future.add_done_callback(on_result)
+        future.add_done_callback(lambda future: future.cancelled() and result_future.cancel())
+        return future
+
+    def _start_solving_future(self, span, captcha: BaseCaptcha, proxy: Optional[ProxyServer],
+                              user_agent: Optional[str], cookies: Optional[Dict[str, str]]
+                              ) -> Tuple[int, Optional[str], Union['SolvedCaptcha', Tuple]]:
+        """
+        Enters the span, looks the solution up in the cache and creates the task if it isn't
+        there. The span is left open while the task is being solved.
+        """
+
+        span.__enter__()
+        try:
+            with captcha.hold_payload():
+                start_time = time.monotonic_ns()
+                fingerprint = get_fingerprint(self, captcha)
+                if fingerprint is not None:
+                    solved = get_cached_solution(self, captcha, fingerprint, start_time)
+                    if solved is not None:
+                        span.set_attribute('cached', True)
+                        span.__exit__(None, None, None)
+                        return start_time, fingerprint, solved
+
+                return start_time, fingerprint, self._create_and_wait_future(
+                    captcha, proxy, user_agent, cookies
+                )
+        except BaseException as exc:
+            span.__exit__(type(exc), exc, exc.__traceback__)
+            raise
+
+    async def solve_captcha_async(self, captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
+                                  user_agent: Optional[str] = None,
+                                  cookies: Optional[Dict[str, str]] = None) -> 'AsyncSolvedCaptcha':
+        """ Solves captcha and returns SolvedCaptcha object (async) """
+
+        key = get_single_flight_key(self, captcha, proxy, user_agent, cookies)
+        if key is not None:
+            return await self.single_flight.call_async(  # type: ignore
+                key, lambda: self._solve_captcha_async(captcha, proxy, user_agent, cookies)
+            )
+        return await self._solve_captcha_async(captcha, proxy, user_agent, cookies)
+
+    async def _solve_captcha_async(self, captcha: BaseCaptcha,
+                                   proxy: Optional[ProxyServer] = None,
+                                   user_agent: Optional[str] = None,
+                                   cookies: Optional[Dict[str, str]] = None
+                                   ) -> 'AsyncSolvedCaptcha':
+        with captcha.hold_payload(), \
+                self.tracer.span(SPAN_SOLVE, captcha_type=captcha.get_type().value) as span:
+            start_time = time.monotonic_ns()
+            fingerprint = get_fingerprint(self, captcha)
+            if fingerprint is not None:
+                solved = get_cached_solution(self, captcha, fingerprint, start_time,
+                                             AsyncCaptchaTask, AsyncSolvedCaptcha)
+                if solved is not None:
+                    span.set_attribute('cached', True)
+                    return solved  # type: ignore
+
+            task, result = await self._create_and_wait_async(captcha, proxy, user_agent,
+                                                             cookies)
+            span.set_attribute('task_id', task.task_id)
+            return self._get_solved_captcha(task, result, start_time,  # type: ignore
+                                            fingerprint, AsyncSolvedCaptcha)
+
+    def _get_solved_captcha(self, task: 'CaptchaTask', result: Tuple, start_time: int,
+                            fingerprint: Optional[str],
+                            solved_class: Optional[Type['SolvedCaptcha']] = None
+                            ) -> 'SolvedCaptcha':
+        """ SolvedCaptcha of the task result (the solution is cached if it has a fingerprint) """
+
+        solution, cost, extra = result
+        if fingerprint is not None:
+            self.solution_cache.set(fingerprint, solution)  # type: ignore
+
+        return (solved_class or SolvedCaptcha)(task, solution, start_time, time.monotonic_ns(),
+                                               cost=cost, extra=extra,
+                                               provider=self._get_provider(task),
+                                               fingerprint=fingerprint)
+
+    def _create_and_wait(self, captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
+                         user_agent: Optional[str] = None,
+                         cookies: Optional[Dict[str, str]] = None) -> Tuple['CaptchaTask', Tuple]:
+        """ Creates a task and waits for its solution, returns the task and the result """
+
+        task = self.create_task(captcha, proxy, user_agent, cookies)  # type: ignore
+        return task, self.wait_for_solution(task)  # type: ignore
+
+    async def _create_and_wait_async(self, captcha: BaseCaptcha,
+                                     proxy: Optional[ProxyServer] = None,
+                                     user_agent: Optional[str] = None,
+                                     cookies: Optional[Dict[str, str]] = None
+                                     ) -> Tuple['AsyncCaptchaTask', Tuple]:
+        """ Creates a task and waits for its solution, returns the task and the result (async) """
+
+        task = await self.create_task_async(captcha, proxy, user_agent, cookies)  # type: ignore
+        return task, await self.wait_for_solution_async(task)  # type: ignore
+
+    def _create_and_wait_future(self, captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
+                                user_agent: Optional[str] = None,
+                                cookies: Optional[Dict[str, str]] = None
+                                ) -> Tuple['CaptchaTask', concurrent.futures.Future]:
+        """ Creates a task, returns it and the future of its result (see solve_captcha_future) """
+
+        task = self.create_task(captcha, proxy, user_agent, cookies)  # type: ignore
+        return task, self.wait_for_solution_future(task)  # type: ignore
+
+    def _get_provider(self, task: 'CaptchaTask'):  # pylint: disable=unused-argument
+        """ Service which solved the task (set if the solver has several services) """
+        return None
+
+
+class BaseService(CaptchaSolvingMixin, ABC):
     """ Base class for all services """
 
-    def __init__(self, api_key: str):
+    # the service is able to send solutions to a pingback URL
+    SUPPORTS_PINGBACK = False
+    # the service accepts images as multipart file uploads
+    SUPPORTS_MULTIPART_UPLOAD = False
+    # max file size of image CAPTCHA (bytes), enforced by the image pipeline
+    MAX_IMAGE_FILESIZE: Optional[int] = None
+    # skip the type checks of the solutions parsed from the responses
+    trusted = False
+    # release the CAPTCHA payload of the solved CAPTCHAs (and drop the reference to the service)
+    release_results = False
+    detach_results = False
+    # upload images as files instead of base64 (if supported)
+    multipart_upload = False
+    # pre-processing of image CAPTCHAs
+    image_pipeline: Optional[ImagePipeline] = None
+    # client-side rate limiting of the requests
+    rate_limiter: Optional[RateLimiter] = None
+    # failing fast on the CAPTCHA types the service keeps failing on
+    circuit_breaker: Optional[CircuitBreaker] = None
+    # metrics of the tasks
+    metrics: Optional[ServiceMetrics] = None
+
+    def __init__(self, api_key: str, transport_settings: Optional[Dict] = None,
+                 transport: Optional[BaseTransport] = None):
+        if transport is not None and transport_settings is not None:
+            raise ValueError('"transport" and "transport_settings" are mutually exclusive!')
+
         self.api_key = api_key
-        self._transport = self._init_transport()
-        self._module = getmodule(self)
+        self.pingback_url: Optional[str] = None
+        # a shared transport is closed by its owner
+        self._owns_transport = transport is None
+        self._transport = transport or self._init_transport(transport_settings)
+        self._dispatch = self._get_dispatch_table()
         self._settings = {captcha_type: Settings() for captcha_type in self.supported_captchas}
+        self._poller = TaskPoller(self)
+        self._thread_poller = ThreadTaskPoller(self)
         self._post_init()
 
     @abstractmethod
-    def _init_transport(self):
+    def _init_transport(self, settings: Optional[Dict] = None):
         pass
 
     def _post_init(self):
         pass
 
-    def _make_request(self, request_class, *args):
-        request_class = request_class + "Request"
-        if not hasattr(self._module, request_class):
-            raise UnicapsException(f"{request_class} is not supported by the current service!")
+    @classmethod
+    def _get_dispatch_table(cls) -> _DispatchTable:
+        # built on the first use: the request classes follow the Service class in its module
+        dispatch = cls.__dict__.get('_dispatch_table')
+        if dispatch is None:
+            dispatch = _DispatchTable(getmodule(cls))
+            cls._dispatch_table = dispatch
+        return dispatch
 
-        request = getattr(self._module, request_class)(self)
-        return self._transport.make_request(request, *args)
+    def _get_request_class(self, request_class: Union[str, Type[BaseRequest]]):
+        if not isinstance(request_class, str):
+            return request_class
 
-    async def _make_request_async(self, request_class, *args):
-        request_class = request_class + "Request"
-        if not hasattr(self._module, request_class):
-            raise UnicapsException(f"{request_class} is not supported by the current service!")
+        try:
+            return self._dispatch.requests[request_class]
+        except KeyError:
+            raise UnicapsException(
+                f"{request_class}Request is not supported by the current service!"
+            ) from None
+
+    def _get_rate_limit(self, request_class: Type[BaseRequest]):
+        if self.rate_limiter is None:
+            return NO_RATE_LIMIT
+        return self.rate_limiter.get_limit(
+            self, self._dispatch.endpoints.get(request_class, ENDPOINT_POLL)
+        )
+
+    def _make_request(self, request_class: Union[str, Type[BaseRequest]], *args):
+        request_class = self._get_request_class(request_class)
+        request = request_class(self)
+        with self._get_rate_limit(request_class), \
+                trusted_mode() if self.trusted else nullcontext():
+            return self._transport.make_request(request, *args)
+
+    async def _make_request_async(self, request_class: Union[str, Type[BaseRequest]], *args):
+        request_class = self._get_request_class(request_class)
+        request = request_class(self)
+        async with self._get_rate_limit(request_class):
+            with trusted_mode() if self.trusted else nullcontext():
+                return await self._transport.make_request_async(request, *args)
+
+    def _get_task_request_class(self, captcha_type: CaptchaType) -> Type[BaseRequest]:
+        try:
+            return self._dispatch.task_requests[captcha_type]
+        except KeyError:
+            raise UnicapsException(
+                f"{captcha_type} is not supported by the current service!"
+            ) from None
 
-        request = getattr(self._module, request_class)(self)
-        return await self._transport.make_request_async(request, *args)
+    def _get_solution_request_class(self, captcha_type: CaptchaType) -> Type[BaseRequest]:
+        try:
+            return self._dispatch.solution_requests[captcha_type]
+        except KeyError:
+            raise UnicapsException(
+                f"{captcha_type.value}SolutionRequest is not supported by the current service!"
+            ) from None
 
     @property
-    def supported_captchas(self) -> Tuple[CaptchaType, ...]:
-        """ List of supported captchas """
+    def supported_captchas(self) -> FrozenSet[CaptchaType]:
+        """ Set of supported captchas """
 
-        captchas = []
-        for captcha_type in CaptchaType:
-            if hasattr(self._module, captcha_type.value + "TaskRequest"):
-                captchas.append(captcha_type)
-        return tuple(captchas)
+        return self._dispatch.supported_captchas
 
     @property
     def settings(self) -> Dict[CaptchaType, 'Settings']:
@@ -68,46 +386,30 @@ class BaseService(ABC):
 
         return self._settings
 
-    def solve_captcha(self, captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
-                      user_agent: Optional[str] = None,
-                      cookies: Optional[Dict[str, str]] = None) -> 'SolvedCaptcha':
-        """ Solves captcha and returns SolvedCaptcha object """
-
-        start_time = datetime.now()
-        task = self.create_task(captcha, proxy, user_agent, cookies)
-        solution, cost, extra = self.wait_for_solution(task)
-        end_time = datetime.now()
-
-        return SolvedCaptcha(task, solution, start_time, end_time,
-                             cost=cost, extra=extra)
-
-    async def solve_captcha_async(self, captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
-                                  user_agent: Optional[str] = None,
-                                  cookies: Optional[Dict[str, str]] = None) -> 'AsyncSolvedCaptcha':
-        """ Solves captcha and returns SolvedCaptcha object (async) """
-
-        start_time = datetime.now()
-        task = await self.create_task_async(captcha, proxy, user_agent, cookies)
-        solution, cost, extra = await self.wait_for_solution_async(task)
-        end_time = datetime.now()
-
-        return AsyncSolvedCaptcha(task, solution, start_time, end_time,
-                                  cost=cost, extra=extra)
-
     def create_task(self, captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
                     user_agent: Optional[str] = None,
                     cookies: Optional[Dict[str, str]] = None) -> 'CaptchaTask':
         """ Creates task for solving a CAPTCHA """
 
-        captcha_type = captcha.get_type()
-
-        if captcha_type not in self.supported_captchas:
-            raise UnicapsException(f"{captcha_type} is not supported by the current service!")
+        with captcha.hold_payload(), \
+                self.tracer.span(SPAN_CREATE_TASK, captcha_type=captcha.get_type().value) as span:
+            if self.circuit_breaker is not None:
+                self._check_circuit(captcha.get_type())
+            if self.image_pipeline is not None and captcha.get_type() is CaptchaType.IMAGE:
+                captcha = self.image_pipeline.process(captcha, self.MAX_IMAGE_FILESIZE)
 
-        result = self._make_request(
-            f"{captcha_type.value}Task", captcha, proxy, user_agent, cookies
-        )
-        task_id = str(result["task_id"])
+            try:
+                result = self._make_request(
+                    self._get_task_request_class(captcha.get_type()), captcha, proxy,
+                    user_agent, cookies
+                )
+            except Exception as exc:
+                self._record_outcome(captcha.get_type(), exc)
+                raise
+            task_id = str(result["task_id"])
+            span.set_attribute('task_id', task_id)
+        if self.metrics is not None:
+            self.metrics.task_created(captcha.get_type())
 
         return CaptchaTask(self, captcha, task_id, result.get("extra"))
 
@@ -116,78 +418,353 @@ class BaseService(ABC):
                                 cookies: Optional[Dict[str, str]] = None) -> 'AsyncCaptchaTask':
         """ Creates CAPTCHA solving task (async) """
 
-        captcha_type = captcha.get_type()
+        with captcha.hold_payload(), \
+                self.tracer.span(SPAN_CREATE_TASK, captcha_type=captcha.get_type().value) as span:
+            if self.circuit_breaker is not None:
+                await self._check_circuit_async(captcha.get_type())
+            if self.image_pipeline is not None and captcha.get_type() is CaptchaType.IMAGE:
+                captcha = await self.image_pipeline.process_async(captcha,
+                                                                  self.MAX_IMAGE_FILESIZE)
 
-        if captcha_type not in self.supported_captchas:
-            raise UnicapsException(f"{captcha_type} is not supported by the current service!")
-
-        result = await self._make_request_async(
-            f"{captcha_type.value}Task", captcha, proxy, user_agent, cookies
-        )
-        task_id = str(result["task_id"])
+            try:
+                result = await self._make_request_async(
+                    self._get_task_request_class(captcha.get_type()), captcha, proxy,
+                    user_agent, cookies
+                )
+            except Exception as exc:
+                self._record_outcome(captcha.get_type(), exc)
+                raise
+            task_id = str(result["task_id"])
+            span.set_attribute('task_id', task_id)
+        if self.metrics is not None:
+            self.metrics.task_created(captcha.get_type())
 
         return AsyncCaptchaTask(self, captcha, task_id, result.get("extra"))
 
-    def get_task_result(self, task: 'CaptchaTask') -> Tuple[BaseCaptchaSolution,
-                                                            Optional[float], Dict]:
-        """ Returns CAPTCHA solution """
+    def _check_circuit(self, captcha_type: CaptchaType) -> None:
+        """ Fail fast if the circuit of the CAPTCHA type is open (probe the service if needed) """
 
-        result = self._make_request(f"{task.captcha.get_type().value}Solution", task)
+        settings = self._settings[captcha_type]
+        if self.circuit_breaker.allow(captcha_type, settings.solution_timeout):  # type: ignore
+            try:
+                status = 'GetStatus' not in self._dispatch.requests or self.get_status()
+            except UnicapsException:
+                status = False
+            self.circuit_breaker.record_probe(captcha_type, status)  # type: ignore
 
+    async def _check_circuit_async(self, captcha_type: CaptchaType) -> None:
+        """ Fail fast if the circuit of the CAPTCHA type is open (probe the service if needed) """
+
+        settings = self._settings[captcha_type]
+        if self.circuit_breaker.allow(captcha_type, settings.solution_timeout):  # type: ignore
+            try:
+                status = ('GetStatus' not in self._dispatch.requests or
+                          await self.get_status_async())
+            except UnicapsException:
+                status = False
+            self.circuit_breaker.record_probe(captcha_type, status)  # type: ignore
+
+    def _record_outcome(self, captcha_type: CaptchaType,
+                        exception: Optional[BaseException] = None) -> None:
+        """ Record the result of creating or solving a task """
+
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(captcha_type, exception)
+        if self.metrics is not None and exception is not None:
+            self.metrics.task_failed(captcha_type, exception)
+
+    def _start_waiting(self, task: 'CaptchaTask') -> float:
+        if self.metrics is not None:
+            self.metrics.wait_started(task.captcha.get_type())
+        return timer()
+
+    def _finish_waiting(self, task: 'CaptchaTask', start_time: float,
+                        result: Optional[Tuple[BaseCaptchaSolution, Optional[float], Dict]] = None,
+                        exception: Optional[BaseException] = None) -> None:
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(task.captcha.get_type(), exception)
+        if self.metrics is not None:
+            self.metrics.wait_finished(task.captcha.get_type(), timer() - start_time,
+                                       task.polls,
+                                       None if result is None else result[1], exception)
+
+    @staticmethod
+    def _get_task_result_tuple(result: Dict) -> Tuple[BaseCaptchaSolution, Optional[float], Dict]:
         return (
             result['solution'],  # type: ignore
             float(result['cost']) if result.get('cost') else None,
             result.get("extra") or {}
         )
 
+    def get_task_result(self, task: 'CaptchaTask') -> Tuple[BaseCaptchaSolution,
+                                                            Optional[float], Dict]:
+        """ Returns CAPTCHA solution """
+
+        task._polls += 1  # pylint: disable=protected-access
+        with self.tracer.span(SPAN_POLL, task_id=task.task_id, poll=task.polls):
+            result = self._make_request(
+                self._get_solution_request_class(task.captcha.get_type()), task
+            )
+            return self._get_task_result_tuple(result)
+
     async def get_task_result_async(self, task: 'CaptchaTask') -> Tuple[BaseCaptchaSolution,
                                                                         Optional[float], Dict]:
         """ Returns CAPTCHA solution """
 
-        result = await self._make_request_async(f"{task.captcha.get_type().value}Solution", task)
+        task._polls += 1  # pylint: disable=protected-access
+        with self.tracer.span(SPAN_POLL, task_id=task.task_id, poll=task.polls):
+            result = await self._make_request_async(
+                self._get_solution_request_class(task.captcha.get_type()), task
+            )
+            return self._get_task_result_tuple(result)
+
+    def get_task_results(self, tasks: Iterable['CaptchaTask']) -> Dict[
+            str, Union[Tuple[BaseCaptchaSolution, Optional[float], Dict], Exception]]:
+        """
+        Returns results of several tasks at once.
+        The tasks are checked using a single request if the service supports it.
+
+        :return: dict of task ID -> solution tuple or exception (e.g. SolutionNotReadyYet)
+        """
+
+        results: Dict = {}
+        for group in self._group_tasks(tasks):
+            results.update(self._get_task_group_results(group))
+        return results
+
+    async def get_task_results_async(self, tasks: Iterable['AsyncCaptchaTask']) -> Dict[
+            str, Union[Tuple[BaseCaptchaSolution, Optional[float], Dict], Exception]]:
+        """
+        Returns results of several tasks at once (async).
+        The tasks are checked using a single request if the service supports it.
+
+        :return: dict of task ID -> solution tuple or exception (e.g. SolutionNotReadyYet)
+        """
+
+        results: Dict = {}
+        for partial_results in await asyncio.gather(
+                *(self._get_task_group_results_async(group) for group in self._group_tasks(tasks))
+        ):
+            results.update(partial_results)
+        return results
+
+    def _group_tasks(self, tasks: Iterable['CaptchaTask']) -> List[List['CaptchaTask']]:
+        """ Split tasks into groups to be checked by a single request each """
+
+        multi_request_class = self._dispatch.multi_solution_request
+        groups = []
+        multi_tasks = []
+        for task in tasks:
+            if multi_request_class and multi_request_class.is_batched(task.captcha.get_type()):
+                multi_tasks.append(task)
+            else:
+                groups.append([task])
+
+        if multi_tasks:
+            max_tasks = multi_request_class.MAX_TASKS
+            groups.extend(
+                multi_tasks[i:i + max_tasks] for i in range(0, len(multi_tasks), max_tasks)
+            )
+        return groups
+
+    def _get_task_group_results(self, tasks: List['CaptchaTask']) -> Dict:
+        # single task request returns the cost of CAPTCHA as well
+        try:
+            if len(tasks) == 1:
+                return {tasks[0].task_id: tasks[0].get_result()}
+            for task in tasks:
+                task._polls += 1  # pylint: disable=protected-access
+            with self.tracer.span(SPAN_POLL, task_id=[task.task_id for task in tasks]):
+                response = self._make_request(self._dispatch.multi_solution_request, tasks)
+        except UnicapsException as exc:
+            return {task.task_id: exc for task in tasks}
+
+        results = self._get_multi_task_results(tasks, response)
+        # the batch lacks the cost and the extra data, the solved tasks are fetched one by one
+        for task in tasks:
+            if not isinstance(results[task.task_id], Exception):
+                results[task.task_id] = self._fetch_solved_task(task)
+        return results
+
+    async def _get_task_group_results_async(self, tasks: List['AsyncCaptchaTask']) -> Dict:
+        # single task request returns the cost of CAPTCHA as well
+        try:
+            if len(tasks) == 1:
+                return {tasks[0].task_id: await tasks[0].get_result()}
+            for task in tasks:
+                task._polls += 1  # pylint: disable=protected-access
+            with self.tracer.span(SPAN_POLL, task_id=[task.task_id for task in tasks]):
+                response = await self._make_request_async(
+                    self._dispatch.multi_solution_request, tasks
+                )
+        except UnicapsException as exc:
+            return {task.task_id: exc for task in tasks}
+
+        results = self._get_multi_task_results(tasks, response)
+        solved = [task for task in tasks if not isinstance(results[task.task_id], Exception)]
+        for task, result in zip(solved, await asyncio.gather(
+                *(self._fetch_solved_task_async(task) for task in solved)
+        )):
+            results[task.task_id] = result
+        return results
+
+    @staticmethod
+    def _fetch_solved_task(task: 'CaptchaTask') -> Tuple[BaseCaptchaSolution,
+                                                         Optional[float], Dict]:
+        """ Fetch the result of a task solved according to a batch (with its cost) """
+
+        batch_result, task._result = task._result, None  # pylint: disable=protected-access
+        try:
+            return task.get_result()  # type: ignore
+        except UnicapsException:
+            # the solution is known anyway, only its cost and extra data are missing
+            task._result = batch_result  # pylint: disable=protected-access
+            return batch_result  # type: ignore
+
+    @staticmethod
+    async def _fetch_solved_task_async(task: 'AsyncCaptchaTask') -> Tuple[
+            BaseCaptchaSolution, Optional[float], Dict]:
+        """ Fetch the result of a task solved according to a batch (with its cost, async) """
 
-        return (
-            result['solution'],  # type: ignore
-            float(result['cost']) if result.get('cost') else None,
-            result.get("extra") or {}
-        )
+        batch_result, task._result = task._result, None  # pylint: disable=protected-access
+        try:
+            return await task.get_result()  # type: ignore
+        except UnicapsException:
+            # the solution is known anyway, only its cost and extra data are missing
+            task._result = batch_result  # pylint: disable=protected-access
+            return batch_result  # type: ignore
+
+    def handle_pingback(self, task_id: str, code: str) -> None:
+        """ Handle the code (solution or error) of a task received via pingback """
+
+        self._poller.handle_pingback(task_id, code)
+        self._thread_poller.handle_pingback(task_id, code)
+
+    def _get_pingback_result(self, task: 'CaptchaTask', code: str) -> Optional[
+            Union[Tuple[BaseCaptchaSolution, Optional[float], Dict], Exception]]:
+        """ Get the task result from the pingback code (None if the task should be checked) """
+
+        multi_request_class = self._dispatch.multi_solution_request
+        if (not multi_request_class or
+                task.captcha.get_type() not in multi_request_class.CAPTCHA_TYPES):
+            return None
+
+        response = dict(results={task.task_id: multi_request_class.parse_answer(task, code)})
+        return self._get_multi_task_results([task], response)[task.task_id]
+
+    def _get_multi_task_results(self, tasks: List['CaptchaTask'], response: Dict) -> Dict:
+        results: Dict = {}
+        for task in tasks:
+            result = response['results'][task.task_id]
+            if not isinstance(result, Exception):
+                result = self._get_task_result_tuple(result)
+                task._result = result  # pylint: disable=protected-access
+            results[task.task_id] = result
+        return results
 
     def wait_for_solution(self, task) -> Tuple[BaseCaptchaSolution, Optional[float], Dict]:
         """ Wait for CAPTCHA solution """
 
+        with self.tracer.span(SPAN_WAIT, task_id=task.task_id):
+            return self._wait_for_solution(task)
+
+    def _wait_for_solution(self, task) -> Tuple[BaseCaptchaSolution, Optional[float], Dict]:
+        if self.pingback_url:
+            return self._wait_for_pingback(task)
+
         settings = self._settings[task.captcha.get_type()]
+        strategy = settings.polling_strategy
 
-        start_time = timer()
-        time.sleep(settings.polling_delay)
+        start_time = self._start_waiting(task)
+        last_poll_time = None
         while True:
-            if timer() - start_time > settings.solution_timeout:
-                raise SolutionWaitTimeout(
-                    f"Couldn't receive a solution in {settings.solution_timeout} seconds!"
-                )
-
             try:
-                return task.get_result()
+                if last_poll_time is None:
+                    time.sleep(strategy.get_first_delay(settings))
+                if timer() - start_time > settings.solution_timeout:
+                    raise SolutionWaitTimeout(
+                        f"Couldn't receive a solution in {settings.solution_timeout} seconds!"
+                    )
+
+                result = task.get_result()
             except SolutionNotReadyYet:
-                time.sleep(settings.polling_interval)
+                last_poll_time = timer()
+                time.sleep(strategy.get_next_interval(settings, last_poll_time - start_time))
+            except BaseException as exc:
+                self._finish_waiting(task, start_time, exception=exc)
+                raise
+            else:
+                strategy.record(get_solve_time(start_time, last_poll_time, timer()))
+                self._finish_waiting(task, start_time, result)
+                return result
 
-    async def wait_for_solution_async(self, task) -> Tuple[BaseCaptchaSolution,
-                                                           Optional[float], Dict]:
-        """ Wait for CAPTCHA solution """
+    def _wait_for_pingback(self, task) -> Tuple[BaseCaptchaSolution, Optional[float], Dict]:
+        """ Wait for the solution sent via pingback (the shared poller checks the task rarely) """
 
-        settings = self._settings[task.captcha.get_type()]
+        start_time = self._start_waiting(task)
+        future = self._thread_poller.submit(task)
+        try:
+            result = future.result()
+        except BaseException as exc:
+            future.cancel()
+            self._finish_waiting(task, start_time, exception=exc)
+            raise
+        self._finish_waiting(task, start_time, result)
+        return result
+
+    def wait_for_solution_future(self, task: 'CaptchaTask') -> concurrent.futures.Future:
+        """
+        Wait for CAPTCHA solution in the background (the task is checked by the shared poller
+        running in a background thread).
+
+        :return: future of the solution tuple (solution, cost, extra)
+        """
+
+        start_time = self._start_waiting(task)
+        future = self._thread_poller.submit(task)
+        if self.circuit_breaker is not None or self.metrics is not None:
+            future.add_done_callback(lambda future: self._finish_waiting(
+                task, start_time,
+                None if future.cancelled() or future.exception() else future.result(),
+                concurrent.futures.CancelledError() if future.cancelled() else future.exception()
+            ))
+        return future
 
-        start_time = timer()
-        await asyncio.sleep(settings.polling_delay)
-        while True:
-            if timer() - start_time > settings.solution_timeout:
-                raise SolutionWaitTimeout(
-                    f"Couldn't receive a solution in {settings.solution_timeout} seconds!"
-                )
+    async def wait_for_solution_async(self, task) -> Tuple[BaseCaptchaSolution,
+                                                           Optional[float], Dict]:
+        """ Wait for CAPTCHA solution (the task is checked by the shared poller) """
 
-            try:
-                return await task.get_result()
-            except SolutionNotReadyYet:
-                await asyncio.sleep(settings.polling_interval)
+        start_time = self._start_waiting(task)
+        try:
+            with self.tracer.span(SPAN_WAIT, task_id=task.task_id):
+                result = await self._poller.wait(task)
+        except BaseException as exc:
+            self._finish_waiting(task, start_time, exception=exc)
+            raise
+        self._finish_waiting(task, start_time, result)
+        return result
+
+    def set_metrics(self, sink: Optional[MetricsSink], service_name: str) -> None:
+        """
+        Sets the receiver of the metrics of the tasks and of the requests. The transport is
+        configured only if the service owns it, a shared transport is configured by its owner
+        (its metrics attribute).
+        """
+
+        self.metrics = None if sink is None else ServiceMetrics(sink, service_name)
+        if self._owns_transport:
+            self._transport.metrics = sink
+
+    def set_tracer(self, tracer: Optional[Tracer], service_name: str) -> None:
+        """
+        Sets the receiver of the phases of solving and of the requests. The transport is
+        configured only if the service owns it, a shared transport is configured by its owner
+        (its tracer attribute).
+        """
+
+        self.tracer = NO_TRACER if tracer is None else ServiceTracer(tracer, service_name)
+        if self._owns_transport:
+            self._transport.tracer = tracer or NO_TRACER
 
     def get_balance(self):
         """ Get account balance """
@@ -274,16 +851,20 @@ class BaseService(ABC):
 class HTTPService(BaseService):
     """ Standard HTTP Service """
 
-    def _init_transport(self):
-        return StandardHTTPTransport()
+    def _init_transport(self, settings: Optional[Dict] = None):
+        return StandardHTTPTransport(settings)
 
     def close(self):
         """ Close connections """
-        self._transport.close()
+        self._thread_poller.close()
+        if self._owns_transport:
+            self._transport.close()
 
     async def close_async(self):
         """ Close connections (async) """
-        await self._transport.close_async()
+        await self._poller.close()
+        if self._owns_transport:
+            await self._transport.close_async()
 
 
 @dataclass
@@ -293,23 +874,40 @@ class Settings:
     polling_delay: int = 5  # seconds before starting to check for sollution
     polling_interval: int = 2  # seconds between checks
     solution_timeout: int = 300  # seconds is solution timeout
+    pingback_polling_interval: int = 30  # seconds between fallback checks in pingback mode
+    # schedules the checks (the fixed polling_delay and polling_interval by default)
+    polling_strategy: PollingStrategy = field(default_factory=PollingStrategy)
 
 
 class CaptchaTask:
     """ Task for CAPTCHA solving """
 
+    __slots__ = ('_service', '_captcha', '_task_id', '_extra', '_result', '_polls')
+
     def __init__(self, service, captcha: BaseCaptcha, task_id: str, extra: Dict = None):
         self._service = service
         self._captcha = captcha
         self._task_id = task_id
-        self._extra = extra or {}
+        self._extra = extra or None
         self._result = None
+        # number of the requests checking the task
+        self._polls = 0
+
+    @property
+    def polls(self) -> int:
+        """ Number of the requests checking the task """
+        return self._polls
 
     @property
     def task_id(self) -> str:
         """ Task ID """
         return self._task_id
 
+    @property
+    def service(self):
+        """ Service solving the task (None if the task is detached from the service) """
+        return self._service
+
     @property
     def captcha(self) -> BaseCaptcha:
         """ Source CAPTCHA """
@@ -318,12 +916,14 @@ class CaptchaTask:
     @property
     def extra(self) -> Dict:
         """ Task extra data """
+        if self._extra is None:
+            self._extra = {}
         return self._extra
 
     def get_result(self) -> Optional[BaseCaptchaSolution]:
         """ Gets solution """
         if self._result is None:
-            self._result = self._service.get_task_result(self)
+            self._result = self._get_service().get_task_result(self)
         return self._result
 
     def is_done(self) -> bool:
@@ -332,39 +932,72 @@ class CaptchaTask:
 
     def wait(self) -> BaseCaptchaSolution:
         """ Waits for solution """
-        return self._service.wait_for_solution(self)
+        return self._get_service().wait_for_solution(self)
+
+    def _get_service(self):
+        if self._service is None:
+            raise UnicapsException("The task is detached from the service!")
+        return self._service
+
+    def detach(self) -> None:
+        """ Drop the reference to the service (the task can't be checked or reported then) """
+        self._service = None
 
 
 class AsyncCaptchaTask(CaptchaTask):
     """ Task for CAPTCHA solving """
 
+    __slots__ = ()
+
     async def get_result(self) -> Optional[BaseCaptchaSolution]:  # type: ignore
         """ Gets solution """
         if self._result is None:
-            self._result = await self._service.get_task_result_async(self)
+            self._result = await self._get_service().get_task_result_async(self)
         return self._result
 
     async def wait(self) -> BaseCaptchaSolution:  # type: ignore
         """ Waits for solution """
-        return await self._service.wait_for_solution_async(self)
+        return await self._get_service().wait_for_solution_async(self)
 
 
-class SolvedCaptcha:
-    """ Solved CAPTCHA object """
+def _to_monotonic_ns(value: Union[datetime, int]) -> int:
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1e9) - _MONOTONIC_TO_WALL_NS
+    return value
+
 
-    def __init__(self, task: CaptchaTask, solution: BaseCaptchaSolution, start_time: datetime,
-                 end_time: datetime, cost: Optional[float] = None, cookies: Optional[dict] = None,
-                 extra: dict = None):
+class SolvedCaptcha:
+    """
+    Solved CAPTCHA object.
+    The times are kept as time.monotonic_ns() values, start_time and end_time convert them
+    to datetime.
+    """
+
+    __slots__ = ('_task', '_solution', '_start_time_ns', '_end_time_ns', '_cost', '_cookies',
+                 '_extra', '_provider', '_fingerprint', '_cached')
+
+    def __init__(self, task: CaptchaTask, solution: BaseCaptchaSolution,
+                 start_time: Union[datetime, int], end_time: Union[datetime, int],
+                 cost: Optional[float] = None, cookies: Optional[dict] = None,
+                 extra: dict = None, provider=None, fingerprint: Optional[str] = None,
+                 cached: bool = False):
         if not task.is_done():
             raise UnicapsException("CAPTCHA is not solved yet!")
 
         self._task = task
         self._solution = solution
-        self._start_time = start_time
-        self._end_time = end_time
+        self._start_time_ns = _to_monotonic_ns(start_time)
+        self._end_time_ns = _to_monotonic_ns(end_time)
         self._cost = cost
-        self._cookies = cookies or {}
-        self._extra = extra or {}
+        self._cookies = cookies or None
+        self._extra = extra or None
+        self._provider = provider
+        self._fingerprint = fingerprint
+        self._cached = cached
+
+        service = task.service
+        if getattr(service, 'release_results', False):
+            self.release(detach=service.detach_results)
 
     @property
     def captcha_id(self) -> str:
@@ -384,12 +1017,27 @@ class SolvedCaptcha:
     @property
     def start_time(self) -> datetime:
         """ Start solving at """
-        return self._start_time
+        return datetime.fromtimestamp((self._start_time_ns + _MONOTONIC_TO_WALL_NS) / 1e9)
 
     @property
     def end_time(self) -> datetime:
         """ End solving at """
-        return self._end_time
+        return datetime.fromtimestamp((self._end_time_ns + _MONOTONIC_TO_WALL_NS) / 1e9)
+
+    @property
+    def start_time_ns(self) -> int:
+        """ Start solving at (time.monotonic_ns() value) """
+        return self._start_time_ns
+
+    @property
+    def end_time_ns(self) -> int:
+        """ End solving at (time.monotonic_ns() value) """
+        return self._end_time_ns
+
+    @property
+    def solving_time(self) -> float:
+        """ Seconds spent on solving """
+        return (self._end_time_ns - self._start_time_ns) / 1e9
 
     @property
     def cost(self) -> Optional[float]:
@@ -399,33 +1047,116 @@ class SolvedCaptcha:
     @property
     def cookies(self) -> dict:
         """ Cookies """
+        if self._cookies is None:
+            self._cookies = {}
         return self._cookies
 
     @property
     def extra(self) -> dict:
         """ Extra data from the service """
+        if self._extra is None:
+            self._extra = {}
         return self._extra
 
+    @property
+    def provider(self):
+        """ Service which solved the CAPTCHA (set by RoutedCaptchaSolver) """
+        return self._provider
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        """ Key of the solution in the solution cache (None if it isn't cached) """
+        return self._fingerprint
+
+    @property
+    def cached(self) -> bool:
+        """ The solution is taken from the solution cache (no task is created) """
+        return self._cached
+
+    def _evict(self, service) -> None:
+        """ Evict the wrong solution from the solution cache """
+        if self._fingerprint is not None and service.solution_cache is not None:
+            service.solution_cache.delete(self._fingerprint)
+
+    def release(self, detach: bool = False) -> None:
+        """
+        Release the CAPTCHA payload (e.g. the image) to save memory.
+        If detach is set, the reference to the service is dropped as well
+        (the solution can't be reported then).
+        """
+
+        self._task.captcha.release_payload()
+        if detach:
+            self._task.detach()
+
     def report_good(self, raise_exc: bool = False) -> bool:
-        """ Report good CAPTCHA """
+        """ Report good CAPTCHA (the cached solutions aren't reported) """
+        if self._cached:
+            return True
         # pylint: disable=protected-access
-        return self._task._service.report_good(self, raise_exc=raise_exc)
+        return self._task._get_service().report_good(self, raise_exc=raise_exc)
 
     def report_bad(self, raise_exc: bool = False) -> bool:
-        """ Report bad CAPTCHA """
+        """ Report bad CAPTCHA (it's evicted from the solution cache as well) """
         # pylint: disable=protected-access
-        return self._task._service.report_bad(self, raise_exc=raise_exc)
+        service = self._task._get_service()
+        self._evict(service)
+        if self._cached:
+            return True
+        return service.report_bad(self, raise_exc=raise_exc)
 
 
 class AsyncSolvedCaptcha(SolvedCaptcha):
     """ Solved CAPTCHA object (async) """
 
+    __slots__ = ()
+
     async def report_good(self, raise_exc: bool = False) -> bool:  # type: ignore
-        """ Report good CAPTCHA """
+        """ Report good CAPTCHA (the cached solutions aren't reported) """
+        if self._cached:
+            return True
         # pylint: disable=protected-access
-        return await self._task._service.report_good_async(self, raise_exc=raise_exc)
+        return await self._task._get_service().report_good_async(self, raise_exc=raise_exc)
 
     async def report_bad(self, raise_exc: bool = False) -> bool:  # type: ignore
-        """ Report bad CAPTCHA """
+        """ Report bad CAPTCHA (it's evicted from the solution cache as well) """
         # pylint: disable=protected-access
-        return await self._task._service.report_bad_async(self, raise_exc=raise_exc)
+        service = self._task._get_service()
+        self._evict(service)
+        if self._cached:
+            return True
+        return await service.report_bad_async(self, raise_exc=raise_exc)
+
+
+def get_fingerprint(service, captcha: BaseCaptcha) -> Optional[str]:
+    """ Fingerprint of the CAPTCHA if the service caches its solutions """
+
+    if service.solution_cache is None or not captcha.SOLUTION_REUSABLE:
+        return None
+    return captcha.get_fingerprint()
+
+
+def get_single_flight_key(service, captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
+                          user_agent: Optional[str] = None,
+                          cookies: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """ Key of the request if the service coalesces identical requests """
+
+    if service.single_flight is None:
+        return None
+    return service.single_flight.get_key(captcha, proxy, user_agent, cookies)
+
+
+def get_cached_solution(service, captcha: BaseCaptcha, fingerprint: str, start_time: int,
+                        task_class: Type[CaptchaTask] = CaptchaTask,
+                        solved_class: Type[SolvedCaptcha] = SolvedCaptcha
+                        ) -> Optional[SolvedCaptcha]:
+    """ Solved CAPTCHA from the solution cache (zero cost, the fingerprint is the task ID) """
+
+    solution = service.solution_cache.get(fingerprint)
+    if solution is None:
+        return None
+
+    task = task_class(service, captcha, fingerprint)
+    task._result = (solution, 0.0, {})  # pylint: disable=protected-access
+    return solved_class(task, solution, start_time, time.monotonic_ns(), cost=0.0,
+                        fingerprint=fingerprint, cached=True)
@@ -0,0 +1,208 @@
+# -*- coding: UTF-8 -*-
+"""
+Solution cache of deterministic CAPTCHAs (image and text ones)
+"""
+
+import json
+import pathlib
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+
+from .._captcha import CAPTCHA_REGISTRY, CaptchaType
+from .._captcha.base import BaseCaptchaSolution, trusted_mode
+
+
+class SolutionCache(ABC):
+    """
+    Base class of the solution caches: CAPTCHA fingerprint -> solution.
+
+    :param max_size: (optional) Max number of the solutions, the least recently used ones
+                     are evicted (None - unlimited).
+    :param ttl: (optional) Seconds the solutions are valid (None - forever).
+    """
+
+    def __init__(self, max_size: Optional[int] = None, ttl: Optional[float] = None):
+        if max_size is not None and max_size < 1:
+            raise ValueError('"max_size" must be positive!')
+        if ttl is not None and ttl <= 0:
+            raise ValueError('"ttl" must be positive!')
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, fingerprint: str) -> Optional[BaseCaptchaSolution]:
+        """ Cached solution (None if it's missing or expired) """
+
+        solution = self._get(fingerprint)
+        if solution is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return solution
+
+    @abstractmethod
+    def _get(self, fingerprint: str) -> Optional[BaseCaptchaSolution]:
+        pass
+
+    @abstractmethod
+    def set(self, fingerprint: str, solution: BaseCaptchaSolution) -> None:
+        """ Cache the solution """
+
+    @abstractmethod
+    def delete(self, fingerprint: str) -> None:
+        """ Evict the solution (e.g. a wrong one) """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """ Evict all the solutions """
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def close(self) -> None:
+        """ Release the resources """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class MemorySolutionCache(SolutionCache):
+    """ In-memory LRU solution cache """
+
+    def __init__(self, max_size: Optional[int] = 1024, ttl: Optional[float] = None):
+        super().__init__(max_size, ttl)
+        # fingerprint -> (solution, expiration time.monotonic() value)
+        self._items: 'OrderedDict[str, Tuple[BaseCaptchaSolution, Optional[float]]]' = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def _get(self, fingerprint: str) -> Optional[BaseCaptchaSolution]:
+        with self._lock:
+            item = self._items.get(fingerprint)
+            if item is None:
+                return None
+
+            solution, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._items[fingerprint]
+                return None
+
+            self._items.move_to_end(fingerprint)
+            return solution
+
+    def set(self, fingerprint: str, solution: BaseCaptchaSolution) -> None:
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._items[fingerprint] = (solution, expires_at)
+            self._items.move_to_end(fingerprint)
+            if self.max_size is not None:
+                while len(self._items) > self.max_size:
+                    self._items.popitem(last=False)
+
+    def delete(self, fingerprint: str) -> None:
+        with self._lock:
+            self._items.pop(fingerprint, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class SQLiteSolutionCache(SolutionCache):
+    """
+    On-disk solution cache (SQLite database), it can be shared by several processes.
+    The solutions are stored as JSON of their fields.
+
+    :param path: Path to the database file.
+    :param max_size: (optional) Max number of the solutions (None - unlimited).
+    :param ttl: (optional) Seconds the solutions are valid (None - forever).
+    """
+
+    def __init__(self, path: Union[str, pathlib.Path], max_size: Optional[int] = None,
+                 ttl: Optional[float] = None):
+        import sqlite3  # pylint: disable=import-outside-toplevel
+
+        super().__init__(max_size, ttl)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(path), check_same_thread=False,
+                                           isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS solutions (fingerprint TEXT PRIMARY KEY, '
+            'captcha_type TEXT NOT NULL, solution TEXT NOT NULL, expires_at REAL, '
+            'accessed_at REAL NOT NULL)'
+        )
+        self._connection.execute(
+            'CREATE INDEX IF NOT EXISTS solutions_accessed_at ON solutions (accessed_at)'
+        )
+
+    def _get(self, fingerprint: str) -> Optional[BaseCaptchaSolution]:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT captcha_type, solution, expires_at FROM solutions WHERE fingerprint = ?',
+                (fingerprint,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            captcha_type, solution, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._connection.execute('DELETE FROM solutions WHERE fingerprint = ?',
+                                         (fingerprint,))
+                return None
+            if self.max_size is not None:
+                # the access time matters for the LRU eviction only
+                self._connection.execute(
+                    'UPDATE solutions SET accessed_at = ? WHERE fingerprint = ?',
+                    (now, fingerprint)
+                )
+
+        solution_class = CAPTCHA_REGISTRY.get_classes(CaptchaType(captcha_type))[1]
+        with trusted_mode():
+            return solution_class(**json.loads(solution))
+
+    def set(self, fingerprint: str, solution: BaseCaptchaSolution) -> None:
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?)',
+                (fingerprint, solution.get_type().value, json.dumps(solution.as_dict()),
+                 None if self.ttl is None else now + self.ttl, now)
+            )
+            if self.max_size is not None:
+                self._connection.execute(
+                    'DELETE FROM solutions WHERE fingerprint IN (SELECT fingerprint '
+                    'FROM solutions ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_size,)
+                )
+
+    def delete(self, fingerprint: str) -> None:
+        with self._lock:
+            self._connection.execute('DELETE FROM solutions WHERE fingerprint = ?',
+                                     (fingerprint,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute('DELETE FROM solutions')
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM solutions').fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -28,6 +28,8 @@ class Service(Service2Captcha):
     """ Main service class for cap.guru """
 
     BASE_URL = 'http://api.cap.guru'
+    # the requests are sent as GET ones
+    SUPPORTS_MULTIPART_UPLOAD = False
 
 
 def _decorator(cls):
@@ -38,6 +40,7 @@ def _decorator(cls):
         """ A wrapper for *TaskRequest class """
         def __init__(self, *args, **kwargs):
             self.decorated_obj = cls(*args, **kwargs)
+            self.idempotent = self.decorated_obj.idempotent
 
         def prepare(self, *args, **kwargs):
             result = self.decorated_obj.prepare(*args, **kwargs)
@@ -0,0 +1,198 @@
+# -*- coding: UTF-8 -*-
+"""
+Circuit breaker of the CAPTCHA types failing on a service
+"""
+
+import enum
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+from .._captcha import CaptchaType
+from ..exceptions import CircuitOpenError, NetworkError, ServiceError
+
+# exceptions counted as failures of the service (not of the CAPTCHA or the proxy)
+FAILURE_EXCEPTIONS: Tuple[Type[Exception], ...] = (NetworkError, ServiceError)
+
+
+class CircuitState(enum.Enum):
+    """ State of the circuit of a CAPTCHA type """
+
+    CLOSED = 'closed'  # the requests are sent
+    OPEN = 'open'  # the requests fail fast with CircuitOpenError
+    HALF_OPEN = 'half-open'  # a single trial request is sent
+
+
+@dataclass
+class CircuitEvent:
+    """ Transition of the circuit of a CAPTCHA type to another state """
+
+    service: str
+    captcha_type: CaptchaType
+    old_state: CircuitState
+    new_state: CircuitState
+    failures: int  # consecutive failures
+
+
+class _Circuit:
+    """ Circuit of a CAPTCHA type """
+
+    def __init__(self):
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        # time.monotonic() value the trial request is given up at (None - no trial request)
+        self.trial_deadline: Optional[float] = None
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of a service keyed by CAPTCHA type.
+    After failure_threshold consecutive failures (NetworkError or ServiceError) of a CAPTCHA
+    type its circuit opens: the tasks fail fast with CircuitOpenError. After reset_timeout
+    seconds the circuit is half-open: the status of the service is checked and a single trial
+    task is created, its success closes the circuit and its failure opens it again.
+
+    :param service: (optional) Name of the service (passed to the listeners).
+    :param failure_threshold: (optional) Number of consecutive failures opening the circuit.
+    :param reset_timeout: (optional) Seconds the circuit is open before a trial request.
+    :param listener: (optional) Callable receiving :class:`CircuitEvent <CircuitEvent>`
+                     of every state transition.
+    """
+
+    def __init__(self, service: str = '', failure_threshold: int = 5,
+                 reset_timeout: float = 30.0,
+                 listener: Optional[Callable[[CircuitEvent], None]] = None):
+        if failure_threshold < 1:
+            raise ValueError('"failure_threshold" must be positive!')
+        if reset_timeout <= 0:
+            raise ValueError('"reset_timeout" must be positive!')
+
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._listeners: List[Callable[[CircuitEvent], None]] = []
+        if listener is not None:
+            self._listeners.append(listener)
+        self._circuits: Dict[CaptchaType, _Circuit] = {}
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: Callable[[CircuitEvent], None]) -> None:
+        """ Add a callable receiving the state transitions """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[CircuitEvent], None]) -> None:
+        """ Remove the listener """
+        self._listeners.remove(listener)
+
+    def get_state(self, captcha_type: CaptchaType) -> CircuitState:
+        """ State of the circuit of the CAPTCHA type """
+
+        circuit = self._circuits.get(captcha_type)
+        return CircuitState.CLOSED if circuit is None else circuit.state
+
+    def _get_circuit(self, captcha_type: CaptchaType) -> _Circuit:
+        circuit = self._circuits.get(captcha_type)
+        if circuit is None:
+            circuit = self._circuits.setdefault(captcha_type, _Circuit())
+        return circuit
+
+    def _set_state(self, captcha_type: CaptchaType, circuit: _Circuit,
+                   state: CircuitState) -> CircuitEvent:
+        event = CircuitEvent(self.service, captcha_type, circuit.state, state, circuit.failures)
+        circuit.state = state
+        if state is CircuitState.OPEN:
+            circuit.opened_at = time.monotonic()
+        elif state is CircuitState.CLOSED:
+            circuit.failures = 0
+        circuit.trial_deadline = None
+        return event
+
+    def _emit(self, event: Optional[CircuitEvent]) -> None:
+        if event is not None:
+            for listener in list(self._listeners):
+                listener(event)
+
+    def _raise_open(self, captcha_type: CaptchaType, circuit: _Circuit) -> None:
+        retry_after = max(circuit.opened_at + self.reset_timeout - time.monotonic(), 0.0)
+        service = f" on {self.service}" if self.service else ''
+        raise CircuitOpenError(
+            f"{captcha_type.value} keeps failing{service}, retry in {retry_after:.0f} seconds",
+            retry_after=retry_after
+        )
+
+    def allow(self, captcha_type: CaptchaType, trial_timeout: float) -> bool:
+        """
+        Check if a task of the CAPTCHA type can be created.
+
+        :param trial_timeout: Seconds the trial request is given up after.
+        :return: True if it's a trial request (the status of the service must be probed)
+        :raises CircuitOpenError: The circuit is open.
+        """
+
+        circuit = self._circuits.get(captcha_type)
+        if circuit is None or circuit.state is CircuitState.CLOSED:
+            return False
+
+        event = None
+        with self._lock:
+            now = time.monotonic()
+            if circuit.state is CircuitState.CLOSED:
+                return False
+            if circuit.state is CircuitState.OPEN:
+                if now - circuit.opened_at < self.reset_timeout:
+                    self._raise_open(captcha_type, circuit)
+                event = self._set_state(captcha_type, circuit, CircuitState.HALF_OPEN)
+            elif circuit.trial_deadline is not None and now < circuit.trial_deadline:
+                # somebody else is trying
+                self._raise_open(captcha_type, circuit)
+            circuit.trial_deadline = now + trial_timeout
+
+        self._emit(event)
+        return True
+
+    def record_probe(self, captcha_type: CaptchaType, status: bool) -> None:
+        """
+        Record the status of the service checked before a trial request.
+
+        :raises CircuitOpenError: The service isn't OK (the circuit is open again).
+        """
+
+        if status:
+            return
+
+        circuit = self._get_circuit(captcha_type)
+        with self._lock:
+            event = self._set_state(captcha_type, circuit, CircuitState.OPEN)
+        self._emit(event)
+        self._raise_open(captcha_type, circuit)
+
+    def record(self, captcha_type: CaptchaType, exception: Optional[BaseException] = None):
+        """ Record the result of a task: success (no exception), failure or neither of them """
+
+        circuit = self._circuits.get(captcha_type)
+        if circuit is None:
+            if exception is None or not isinstance(exception, FAILURE_EXCEPTIONS):
+                return
+            circuit = self._get_circuit(captcha_type)
+
+        event = None
+        with self._lock:
+            if exception is None:
+                if circuit.state is CircuitState.HALF_OPEN:
+                    event = self._set_state(captcha_type, circuit, CircuitState.CLOSED)
+                elif circuit.state is CircuitState.CLOSED:
+                    circuit.failures = 0
+            elif isinstance(exception, FAILURE_EXCEPTIONS):
+                if circuit.state is not CircuitState.OPEN:
+                    circuit.failures += 1
+                if (circuit.state is CircuitState.HALF_OPEN or (
+                        circuit.state is CircuitState.CLOSED and
+                        circuit.failures >= self.failure_threshold)):
+                    event = self._set_state(captcha_type, circuit, CircuitState.OPEN)
+            elif circuit.state is CircuitState.HALF_OPEN:
+                # the trial request failed because of the CAPTCHA, the next one may try
+                circuit.trial_deadline = None
+
+        self._emit(event)
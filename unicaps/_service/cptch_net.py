@@ -3,14 +3,14 @@
 cptch.net service
 """
 from .base import HTTPService
-from .._transport.http_transport import HTTPRequestJSON  # type: ignore
 from .. import exceptions
 from .._captcha import CaptchaType
 from ..common import CaptchaAlphabet
+from .twocaptcha import MultiSolutionMixin, Request as Request2Captcha
 
 __all__ = [
     'Service', 'GetBalanceRequest', 'GetStatusRequest',
-    'ReportGoodRequest', 'ReportBadRequest',
+    'ReportGoodRequest', 'ReportBadRequest', 'MultiSolutionRequest',
     'ImageCaptchaTaskRequest', 'ImageCaptchaSolutionRequest',
     'RecaptchaV2TaskRequest', 'RecaptchaV2SolutionRequest',
     'RecaptchaV3TaskRequest', 'RecaptchaV3SolutionRequest'
@@ -37,51 +37,17 @@ class Service(HTTPService):
                 self.settings[captcha_type].polling_delay = 5
 
 
-class Request(HTTPRequestJSON):
-    """ Common Request class for 2captcha """
+class Request(Request2Captcha):
+    """ Common Request class for cptch.net """
 
-    def parse_response(self, response) -> dict:
-        """ Parse response and checks for errors """
-
-        response_data = super().parse_response(response)
+    @staticmethod
+    def raise_error(error_code: str, error_text: str = ""):
+        """ Raise an appropriate exception for the error code """
 
-        if response_data.pop("status") == 1:
-            return response_data
-
-        ###############
-        # handle errors
-        ###############
-        error_code = response_data["request"]
-        error_text = response_data.get("error_text", "")
-        error_msg = f"{error_code}: {error_text}"
-
-        if error_code == 'CAPCHA_NOT_READY':  # pylint: disable=no-else-raise
-            raise exceptions.SolutionNotReadyYet()
-        elif error_code in ('ERROR_WRONG_USER_KEY', 'ERROR_KEY_DOES_NOT_EXIST',
-                            'ERROR_IP_NOT_ALLOWED', 'IP_BANNED'):
-            raise exceptions.AccessDeniedError(error_msg)
-        elif error_code in ('ERROR_ZERO_BALANCE',):
-            raise exceptions.LowBalanceError(error_msg)
-        elif error_code in ('ERROR_NO_SLOT_AVAILABLE',):
-            # If server returns ERROR_NO_SLOT_AVAILABLE make a 5 seconds timeout before sending
-            # next request.
-            # time.sleep(5)
-            raise exceptions.ServiceTooBusy(error_msg)
-        elif error_code in ('MAX_USER_TURN',) or error_code.startswith('ERROR:'):
-            raise exceptions.TooManyRequestsError(error_msg)
-        elif error_code in ('ERROR_WRONG_ID_FORMAT', 'ERROR_WRONG_CAPTCHA_ID'):
-            raise exceptions.MalformedRequestError(error_msg)
-        elif error_code in ('ERROR_ZERO_CAPTCHA_FILESIZE', 'ERROR_TOO_BIG_CAPTCHA_FILESIZE',
-                            'ERROR_WRONG_FILE_EXTENSION', 'ERROR_IMAGE_TYPE_NOT_SUPPORTED',
-                            'ERROR_UPLOAD', 'ERROR_PAGEURL', 'ERROR_BAD_TOKEN_OR_PAGEURL',
-                            'ERROR_GOOGLEKEY', 'ERROR_BAD_PARAMETERS', 'ERROR_TOKEN_EXPIRED',
-                            'ERROR_EMPTY_ACTION', 'ERROR'):
-            raise exceptions.BadInputDataError(error_msg)
-        elif error_code in ('ERROR_CAPTCHAIMAGE_BLOCKED', 'ERROR_CAPTCHA_UNSOLVABLE',
-                            'ERROR_BAD_DUPLICATES'):
-            raise exceptions.UnableToSolveError(error_msg)
-
-        raise exceptions.ServiceError(error_msg)
+        # cptch.net reports some bad input with a bare ERROR code
+        if error_code == 'ERROR':
+            raise exceptions.BadInputDataError(f"{error_code}: {error_text}")
+        Request2Captcha.raise_error(error_code, error_text)
 
 
 class InRequest(Request):
@@ -200,6 +166,9 @@ class ReportBadRequest(ResRequest):
 class TaskRequest(InRequest):
     """ Common Task Request class """
 
+    # the request creates a paid task
+    idempotent = False
+
     def parse_response(self, response) -> dict:
         """ Parse response and return task_id """
 
@@ -242,6 +211,12 @@ class SolutionRequest(ResRequest):
         )
 
 
+class MultiSolutionRequest(MultiSolutionMixin, ResRequest):
+    """ Solution request for several tasks at once """
+
+    CAPTCHA_TYPES = frozenset((CaptchaType.IMAGE, CaptchaType.RECAPTCHAV2, CaptchaType.RECAPTCHAV3))
+
+
 class ImageCaptchaTaskRequest(TaskRequest):
     """ ImageCaptchaTask Request class """
 
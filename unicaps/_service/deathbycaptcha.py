@@ -24,11 +24,11 @@ class Service(HTTPService):
     """ Main service class for deathbycaptcha """
 
     BASE_URL = 'http://api.dbcapi.me/api'
+    SUPPORTS_MULTIPART_UPLOAD = True
+    MAX_IMAGE_FILESIZE = 180 * 1024
 
     def _post_init(self):
         """ Init settings """
-        self._transport.settings['handle_http_errors'] = False
-
         for captcha_type in self.settings:
             self.settings[captcha_type].polling_delay = 5
             self.settings[captcha_type].polling_interval = 2
@@ -44,6 +44,9 @@ class Service(HTTPService):
 class Request(HTTPRequestJSON):
     """ Common Request class for deathbycaptcha """
 
+    # error responses contain the error details
+    handle_http_errors = False
+
     def prepare(self, **kwargs) -> dict:
         """ Prepare the request """
 
@@ -176,6 +179,9 @@ class ReportBadRequest(PostRequest):
 class TaskRequest(PostRequest):
     """ Common Task Request class """
 
+    # the request creates a paid task
+    idempotent = False
+
     # pylint: disable=arguments-differ,unused-argument
     def prepare(self, captcha, proxy, user_agent, cookies):
         """ Prepare a request """
@@ -257,9 +263,12 @@ class ImageCaptchaTaskRequest(TaskRequest):
         )
 
         # add required params
-        request['data'].update(dict(
-            captchafile='base64:' + captcha.get_image_base64().decode('ascii')
-        ))
+        if self._service.multipart_upload:
+            request['files'] = dict(captchafile=captcha.get_image_file())
+        else:
+            request['data'].update(dict(
+                captchafile='base64:' + captcha.get_image_base64().decode('ascii')
+            ))
         return request
 
 
@@ -0,0 +1,347 @@
+# -*- coding: UTF-8 -*-
+"""
+Shared pollers for pending CAPTCHA tasks
+"""
+
+import asyncio
+import concurrent.futures
+import math
+import threading
+from dataclasses import dataclass, field
+from timeit import default_timer as timer
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from .polling import get_solve_time
+from ..exceptions import SolutionNotReadyYet, SolutionWaitTimeout, UnicapsException
+
+POLLER_TICK = 0.5  # seconds, all polls are aligned to this tick to be batched together
+POLLER_MAX_WORKERS = 8  # max number of threads making poll requests (ThreadTaskPoller)
+
+
+@dataclass(eq=False)
+class _PendingTask:
+    """ A task waiting for its solution """
+
+    task: object
+    future: Union[asyncio.Future, concurrent.futures.Future]
+    start_time: float
+    next_poll: float
+    last_poll: Optional[float] = field(default=None)
+    is_polling: bool = field(default=False)
+
+
+class BaseTaskPoller:
+    """ Base class for pollers: keeps the pending tasks and decides when to poll them """
+
+    def __init__(self, service, tick: float = POLLER_TICK):
+        self._service = service
+        self._tick = tick
+        self._pending: Dict[_PendingTask, None] = {}  # ordered set of pending tasks
+
+    @property
+    def pending_count(self) -> int:
+        """ Number of tasks waiting for solution """
+        return len(self._pending)
+
+    def _add_pending(self, task, future) -> _PendingTask:
+        settings = self._service.settings[task.captcha.get_type()]
+        now = timer()
+
+        pending = _PendingTask(
+            task=task,
+            future=future,
+            start_time=now,
+            next_poll=now + self._get_poll_delay(
+                settings, settings.polling_strategy.get_first_delay(settings)
+            )
+        )
+        self._pending[pending] = None
+        return pending
+
+    def _get_poll_delay(self, settings, delay: float) -> float:
+        # the solution is expected to be received via pingback, the checks are just a fallback
+        if self._service.pingback_url:
+            return max(delay, settings.pingback_polling_interval)
+        return delay
+
+    def _get_due_tasks(self) -> Tuple[List[_PendingTask], List[tuple], Optional[float]]:
+        """
+        Get tasks to poll right now, the list of (future, result, exception) for the timed out
+        tasks and the number of seconds till the next tick.
+        """
+
+        now = timer()
+        due = []
+        expired = []
+        next_poll = math.inf
+        for pending in list(self._pending):
+            if pending.future.done() or pending.is_polling:
+                continue
+
+            if pending.next_poll > now:
+                next_poll = min(next_poll, pending.next_poll)
+                continue
+
+            settings = self._service.settings[pending.task.captcha.get_type()]  # type: ignore
+            if now - pending.start_time > settings.solution_timeout:
+                expired.append((pending.future, None, SolutionWaitTimeout(
+                    f"Couldn't receive a solution in {settings.solution_timeout} seconds!"
+                )))
+                continue
+
+            pending.is_polling = True
+            due.append(pending)
+
+        # sleep till the next tick (never earlier than the nearest poll)
+        if next_poll is math.inf:
+            return due, expired, None
+        return due, expired, max(0, math.ceil(next_poll / self._tick) * self._tick - timer())
+
+    def _handle_results(self, due: List[_PendingTask], results: Dict) -> List[tuple]:
+        """
+        Update the polled tasks and return the list of (future, result, exception)
+        for the completed ones.
+        """
+
+        now = timer()
+        completed = []
+        for pending in due:
+            if pending.future.done() or pending.task.task_id not in results:  # type: ignore
+                pending.is_polling = False
+                continue
+
+            # the completed tasks stay "polling" till their futures are set (outside of the lock)
+            result = results[pending.task.task_id]  # type: ignore
+            settings = self._service.settings[pending.task.captcha.get_type()]  # type: ignore
+            if isinstance(result, SolutionNotReadyYet):
+                pending.is_polling = False
+                pending.last_poll = now
+                pending.next_poll = now + self._get_poll_delay(
+                    settings,
+                    settings.polling_strategy.get_next_interval(settings, now - pending.start_time)
+                )
+            elif isinstance(result, BaseException):
+                completed.append((pending.future, None, result))
+            else:
+                settings.polling_strategy.record(
+                    get_solve_time(pending.start_time, pending.last_poll, now)
+                )
+                completed.append((pending.future, result, None))
+        return completed
+
+    def _handle_pingback(self, task_id: str, code: str) -> List[tuple]:
+        """
+        Update the tasks with the code received via pingback and return the list of
+        (future, result, exception) for the completed ones.
+        """
+
+        now = timer()
+        completed = []
+        for pending in self._pending:
+            if pending.task.task_id != task_id or pending.future.done():  # type: ignore
+                continue
+
+            # pylint: disable=protected-access
+            result = self._service._get_pingback_result(pending.task, code)
+            if result is None or isinstance(result, SolutionNotReadyYet):
+                pending.next_poll = now  # check the task right away
+            elif isinstance(result, BaseException):
+                completed.append((pending.future, None, result))
+            else:
+                settings = self._service.settings[pending.task.captcha.get_type()]  # type: ignore
+                settings.polling_strategy.record(now - pending.start_time)
+                completed.append((pending.future, result, None))
+        return completed
+
+    @staticmethod
+    def _set_future_results(completed: List[tuple]):
+        for future, result, exception in completed:
+            if future.done():
+                continue
+            if exception is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exception)
+
+
+class TaskPoller(BaseTaskPoller):
+    """ Polls all pending tasks of a service on a shared tick (async) """
+
+    def __init__(self, service, tick: float = POLLER_TICK):
+        super().__init__(service, tick)
+        self._polls: Set[asyncio.Future] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._runner: Optional[asyncio.Future] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def wait(self, task):
+        """ Wait for the task solution """
+
+        loop = asyncio.get_running_loop()
+        pending = self._add_pending(task, loop.create_future())
+        self._ensure_runner(loop)
+
+        try:
+            return await pending.future
+        finally:
+            self._pending.pop(pending, None)
+            self._wakeup.set()  # type: ignore
+
+    def _ensure_runner(self, loop):
+        if self._runner is None or self._runner.done() or self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._runner = loop.create_task(self._run())
+        self._wakeup.set()  # type: ignore
+
+    async def _run(self):
+        while self._pending:
+            due, expired, timeout = self._get_due_tasks()
+            self._set_future_results(expired)
+            if due:
+                poll = asyncio.ensure_future(self._poll(due))
+                self._polls.add(poll)
+                poll.add_done_callback(self._polls.discard)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, due: List[_PendingTask]):
+        try:
+            results = await self._service.get_task_results_async([p.task for p in due])
+        except Exception as exc:  # pylint: disable=broad-except
+            results = {pending.task.task_id: exc for pending in due}  # type: ignore
+
+        self._set_future_results(self._handle_results(due, results))
+        self._wakeup.set()  # type: ignore
+
+    def handle_pingback(self, task_id: str, code: str):
+        """ Handle the code of a task received via pingback (thread-safe) """
+
+        if self._loop is None or self._loop.is_closed():
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._on_pingback, task_id, code)
+        except RuntimeError:  # the loop is closed
+            pass
+
+    def _on_pingback(self, task_id: str, code: str):
+        self._set_future_results(self._handle_pingback(task_id, code))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def close(self):
+        """ Stop polling and cancel all pending tasks """
+
+        for pending in self._pending:
+            pending.future.cancel()
+        for future in (self._runner, *self._polls):
+            if future is not None and not future.done():
+                future.cancel()
+        self._runner = None
+
+
+class ThreadTaskPoller(BaseTaskPoller):
+    """
+    Polls all pending tasks of a service on a shared tick.
+    The tick runs in a background thread, the poll requests are made by a pool of threads.
+    """
+
+    def __init__(self, service, tick: float = POLLER_TICK,
+                 max_workers: int = POLLER_MAX_WORKERS):
+        super().__init__(service, tick)
+        self._max_workers = max_workers
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._is_closed = False
+
+    def submit(self, task) -> concurrent.futures.Future:
+        """ Add the task to the poller and return a future for its solution """
+
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._condition:
+            if self._is_closed:
+                raise UnicapsException("The poller is closed!")
+
+            pending = self._add_pending(task, future)
+            future.add_done_callback(lambda _: self._discard(pending))
+
+            if self._thread is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self._max_workers,
+                    thread_name_prefix='unicaps-poller'
+                )
+                self._thread = threading.Thread(target=self._run, name='unicaps-poller',
+                                                daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return future
+
+    def _discard(self, pending: _PendingTask):
+        with self._condition:
+            self._pending.pop(pending, None)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._is_closed:
+                    return
+
+                due, expired, timeout = self._get_due_tasks()
+                if not due and not expired:
+                    self._condition.wait(timeout)
+                    continue
+
+            self._set_future_results(expired)
+
+            due_by_id: Dict[str, List[_PendingTask]] = {}
+            for pending in due:
+                due_by_id.setdefault(pending.task.task_id, []).append(pending)  # type: ignore
+
+            # pylint: disable=protected-access
+            for group in self._service._group_tasks(due_by_id[task_id][0].task
+                                                    for task_id in due_by_id):
+                try:
+                    self._executor.submit(  # type: ignore
+                        self._poll,
+                        group,
+                        [pending for task in group for pending in due_by_id[task.task_id]]
+                    )
+                except RuntimeError:  # the executor is shut down
+                    return
+
+    def _poll(self, tasks: list, due: List[_PendingTask]):
+        try:
+            results = self._service.get_task_results(tasks)
+        except Exception as exc:  # pylint: disable=broad-except
+            results = {task.task_id: exc for task in tasks}
+
+        with self._condition:
+            completed = self._handle_results(due, results)
+            self._condition.notify()
+        self._set_future_results(completed)
+
+    def handle_pingback(self, task_id: str, code: str):
+        """ Handle the code of a task received via pingback """
+
+        with self._condition:
+            completed = self._handle_pingback(task_id, code)
+            self._condition.notify()
+        self._set_future_results(completed)
+
+    def close(self):
+        """ Stop polling and cancel all pending tasks """
+
+        with self._condition:
+            self._is_closed = True
+            pending_futures = [pending.future for pending in self._pending]
+            self._condition.notify()
+
+        for future in pending_futures:
+            future.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
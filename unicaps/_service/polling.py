@@ -0,0 +1,102 @@
+# -*- coding: UTF-8 -*-
+"""
+Polling strategies
+"""
+
+import bisect
+import threading
+from collections import deque
+from typing import List, Optional
+
+
+def get_solve_time(start_time: float, last_poll_time: Optional[float],
+                   end_time: float) -> float:
+    """
+    Estimate the solving time of a task: the solution was ready somewhere between the last
+    unsuccessful poll and the successful one.
+    """
+
+    if last_poll_time is None:
+        return end_time - start_time
+    return (last_poll_time + end_time) / 2 - start_time
+
+
+class PollingStrategy:
+    """ Fixed polling: the first check after polling_delay, then every polling_interval """
+
+    def get_first_delay(self, settings) -> float:
+        """ Seconds before the first check of a task """
+        return settings.polling_delay
+
+    # pylint: disable=unused-argument
+    def get_next_interval(self, settings, elapsed: float) -> float:
+        """ Seconds till the next check of a task that isn't solved after `elapsed` seconds """
+        return settings.polling_interval
+
+    def record(self, solve_time: float) -> None:
+        """ Record the solving time of a task """
+
+
+class AdaptivePollingStrategy(PollingStrategy):
+    """
+    Learns the distribution of solving time from the completed tasks and schedules the checks
+    around it: the first check is made when `percentile` of tasks are usually solved,
+    each next one when another `step` of tasks are usually solved. The tasks slower than all
+    the learned ones are checked with a geometrically growing interval.
+    The settings' polling_delay and polling_interval are used until `min_samples` tasks are
+    solved, the polling_interval is also the max interval between checks.
+
+    :param percentile: (optional) Fraction of tasks solved by the first check.
+    :param step: (optional) Fraction of tasks solved between the checks.
+    :param min_samples: (optional) Min number of solved tasks to start adapting.
+    :param window: (optional) Number of the last solved tasks to learn from.
+    :param min_interval: (optional) Min number of seconds between checks.
+    """
+
+    def __init__(self, percentile: float = 0.5, step: float = 0.15, min_samples: int = 10,
+                 window: int = 200, min_interval: float = 1.0):
+        if not 0 < percentile <= 1 or not 0 < step <= 1:
+            raise ValueError('"percentile" and "step" must be in (0, 1] range!')
+
+        self.percentile = percentile
+        self.step = step
+        self.min_samples = min_samples
+        self.min_interval = min_interval
+        self._samples: deque = deque(maxlen=window)
+        self._sorted_samples: Optional[List[float]] = None
+        self._lock = threading.Lock()
+
+    def _get_sorted_samples(self) -> List[float]:
+        with self._lock:
+            if self._sorted_samples is None:
+                self._sorted_samples = sorted(self._samples)
+            return self._sorted_samples
+
+    @staticmethod
+    def _get_quantile(samples: List[float], fraction: float) -> float:
+        index = min(len(samples) - 1, max(0, round(fraction * len(samples)) - 1))
+        return samples[index]
+
+    def get_first_delay(self, settings) -> float:
+        samples = self._get_sorted_samples()
+        if len(samples) < self.min_samples:
+            return super().get_first_delay(settings)
+        return self._get_quantile(samples, self.percentile)
+
+    def get_next_interval(self, settings, elapsed: float) -> float:
+        samples = self._get_sorted_samples()
+        if len(samples) < self.min_samples:
+            return super().get_next_interval(settings, elapsed)
+
+        solved_fraction = bisect.bisect_right(samples, elapsed) / len(samples)
+        next_poll = self._get_quantile(samples, solved_fraction + self.step)
+        if next_poll <= elapsed:
+            # slower than all the learned tasks: back off geometrically (the interval is
+            # the time past the slowest one), so the tail isn't checked every min_interval
+            next_poll = elapsed + elapsed - samples[-1]
+        return min(max(next_poll - elapsed, self.min_interval), settings.polling_interval)
+
+    def record(self, solve_time: float) -> None:
+        with self._lock:
+            self._samples.append(solve_time)
+            self._sorted_samples = None
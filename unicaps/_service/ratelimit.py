@@ -0,0 +1,251 @@
+# -*- coding: UTF-8 -*-
+"""
+Client-side rate limiting of the requests to the services
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional, Tuple, Type
+
+from ..exceptions import ServiceTooBusy, TooManyRequestsError
+
+# endpoints of a service: creating tasks and the other requests (results, balance, reports)
+ENDPOINT_CREATE = 'create'
+ENDPOINT_POLL = 'poll'
+# exceptions meaning the service is overloaded by our requests
+OVERLOAD_EXCEPTIONS: Tuple[Type[Exception], ...] = (ServiceTooBusy, TooManyRequestsError)
+# share of the max rate added per second of successful requests (additive increase)
+RATE_INCREASE = 0.1
+# the limits are multiplied by this value on overload (multiplicative decrease)
+BACKOFF_FACTOR = 0.5
+# min seconds between two decreases (the responses to the concurrent requests come together)
+BACKOFF_COOLDOWN = 1.0
+
+
+@dataclass
+class RateLimitStats:
+    """ Rate limit stats """
+
+    requests: int = 0  # requests sent
+    delayed: int = 0  # requests waited for a token or a free slot
+    overloads: int = 0  # overload errors returned by the service
+    backoffs: int = 0  # decreases of the limits
+
+
+class RateLimit:
+    """
+    Token bucket limiting the rate of the requests and the number of requests in flight
+    (of a service, API key and endpoint). The limits are adjusted automatically (AIMD):
+    they are decreased multiplicatively when the service is overloaded and increased
+    additively back to the max values while the requests succeed.
+    It's shared by the threads and the coroutines.
+
+    :param rate: Max number of requests per second.
+    :param max_in_flight: Max number of requests waiting for the responses.
+    :param burst: (optional) Size of the bucket (the rate by default, at least 1).
+    :param min_rate: (optional) The rate isn't decreased below this value.
+    """
+
+    def __init__(self, rate: float, max_in_flight: int, burst: Optional[float] = None,
+                 min_rate: float = 0.1):
+        if rate <= 0 or min_rate <= 0:
+            raise ValueError('"rate" and "min_rate" must be positive!')
+        if max_in_flight < 1:
+            raise ValueError('"max_in_flight" must be positive!')
+
+        self.max_rate = rate
+        self.max_in_flight = max_in_flight
+        self.burst = max(burst or rate, 1.0)
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        # the current limit of the requests in flight (float to be increased by fractions)
+        self.in_flight_limit = float(max_in_flight)
+        self.in_flight = 0
+        self.stats = RateLimitStats()
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._backoff_at = float('-inf')
+        self._condition = threading.Condition(threading.Lock())
+        self._async_waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    def _take(self) -> Optional[float]:
+        """
+        Take a token and a slot: 0 if they are taken, seconds to wait for a token
+        or None to wait for a free slot (the lock is held)
+        """
+
+        if self.in_flight >= int(self.in_flight_limit):
+            return None
+
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+
+        self._tokens -= 1
+        self.in_flight += 1
+        self.stats.requests += 1
+        return 0
+
+    def acquire(self) -> None:
+        """ Wait for a token and a free slot """
+
+        with self._condition:
+            delay = self._take()
+            if delay == 0:
+                return
+
+            self.stats.delayed += 1
+            while delay != 0:
+                # woken up by a released slot (the token may be available then as well)
+                self._condition.wait(delay)
+                delay = self._take()
+
+    async def acquire_async(self) -> None:
+        """ Wait for a token and a free slot (async) """
+
+        loop = asyncio.get_running_loop()
+        delayed = False
+        while True:
+            waiter = None
+            with self._condition:
+                delay = self._take()
+                if delay == 0:
+                    return
+                if not delayed:
+                    delayed = True
+                    self.stats.delayed += 1
+                if delay is None:
+                    waiter = loop.create_future()
+                    self._async_waiters.append((loop, waiter))
+
+            if waiter is None:
+                await asyncio.sleep(delay)  # type: ignore
+                continue
+            try:
+                await waiter
+            finally:
+                with self._condition:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+
+    def release(self, exception: Optional[BaseException] = None) -> None:
+        """ Free the slot and adjust the limits by the result of the request """
+
+        with self._condition:
+            self.in_flight -= 1
+            if isinstance(exception, OVERLOAD_EXCEPTIONS):
+                self.stats.overloads += 1
+                self._decrease()
+            elif exception is None:
+                self._increase()
+            self._condition.notify_all()
+            waiters, self._async_waiters = self._async_waiters, deque()
+
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake_up, waiter)
+            except RuntimeError:  # the loop is closed
+                pass
+
+    def _increase(self) -> None:
+        if self.rate < self.max_rate:
+            # it's called "rate" times a second, so the rate grows linearly
+            self.rate = min(self.max_rate, self.rate + RATE_INCREASE * self.max_rate / self.rate)
+        if self.in_flight_limit < self.max_in_flight:
+            # +1 per "in_flight_limit" successful requests
+            self.in_flight_limit = min(float(self.max_in_flight),
+                                       self.in_flight_limit + 1 / self.in_flight_limit)
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._backoff_at < BACKOFF_COOLDOWN:
+            return
+
+        self._backoff_at = now
+        self.stats.backoffs += 1
+        self.rate = max(self.min_rate, self.rate * BACKOFF_FACTOR)
+        self.in_flight_limit = max(1.0, self.in_flight_limit * BACKOFF_FACTOR)
+        # a pause before the next request
+        self._tokens = min(self._tokens, 0.0)
+        self._updated_at = now
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release(exc_value)
+
+    async def __aenter__(self):
+        await self.acquire_async()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.release(exc_value)
+
+
+def _wake_up(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class _NoRateLimit:
+    """ Rate limit of the services without a rate limiter """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+NO_RATE_LIMIT = _NoRateLimit()
+
+
+class RateLimiter:
+    """
+    Client-side rate limiter and concurrency governor of the requests to the services.
+    Every service, API key and endpoint (creating tasks or polling) get their own
+    :class:`RateLimit <RateLimit>`, so a rate limiter can be shared by several solvers.
+
+    :param rate: (optional) Max number of requests creating tasks per second.
+    :param max_in_flight: (optional) Max number of requests creating tasks at the same time.
+    :param poll_rate: (optional) Max number of the other requests per second.
+    :param poll_max_in_flight: (optional) Max number of the other requests at the same time.
+    """
+
+    def __init__(self, rate: float = 10.0, max_in_flight: int = 50, poll_rate: float = 20.0,
+                 poll_max_in_flight: int = 50):
+        self._params = {
+            ENDPOINT_CREATE: (rate, max_in_flight),
+            ENDPOINT_POLL: (poll_rate, poll_max_in_flight),
+        }
+        # check the params
+        for params in self._params.values():
+            RateLimit(*params)
+        self._limits: Dict[Tuple[str, str, str], RateLimit] = {}
+        self._lock = threading.Lock()
+
+    def get_limit(self, service, endpoint: str = ENDPOINT_CREATE) -> RateLimit:
+        """ Rate limit of the service endpoint ('create' or 'poll') """
+
+        # the service classes are named "Service" in every module
+        key = (type(service).__module__, service.api_key, endpoint)
+        limit = self._limits.get(key)
+        if limit is None:
+            with self._lock:
+                limit = self._limits.get(key)
+                if limit is None:
+                    limit = self._limits[key] = RateLimit(*self._params[endpoint])
+        return limit
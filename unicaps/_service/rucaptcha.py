@@ -6,7 +6,7 @@ rucaptcha.com service
 # pylint: disable=unused-import
 from .twocaptcha import (
     Service as Service2Captcha, GetBalanceRequest, GetStatusRequest,
-    ReportGoodRequest, ReportBadRequest,
+    ReportGoodRequest, ReportBadRequest, MultiSolutionRequest,
     ImageCaptchaTaskRequest, ImageCaptchaSolutionRequest,
     RecaptchaV2TaskRequest, RecaptchaV2SolutionRequest,
     RecaptchaV3TaskRequest, RecaptchaV3SolutionRequest,
@@ -22,7 +22,7 @@ from .twocaptcha import (
 
 __all__ = [
     'Service', 'GetBalanceRequest', 'GetStatusRequest',
-    'ReportGoodRequest', 'ReportBadRequest',
+    'ReportGoodRequest', 'ReportBadRequest', 'MultiSolutionRequest',
     'ImageCaptchaTaskRequest', 'ImageCaptchaSolutionRequest',
     'RecaptchaV2TaskRequest', 'RecaptchaV2SolutionRequest',
     'RecaptchaV3TaskRequest', 'RecaptchaV3SolutionRequest',
@@ -0,0 +1,174 @@
+# -*- coding: UTF-8 -*-
+"""
+Coalescing of concurrent solving of identical CAPTCHAs
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from .._captcha.base import BaseCaptcha
+from .._misc.proxy import ProxyServer
+
+T = TypeVar('T')
+
+
+class _AsyncCall:
+    """ Call shared by the coroutines awaiting it """
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.waiters = 0
+
+
+class _FutureCall:
+    """ Call shared by the futures of the threads """
+
+    def __init__(self, future: concurrent.futures.Future):
+        self.future = future
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Concurrent requests to solve identical CAPTCHAs share a single task and get the same
+    SolvedCaptcha. The CAPTCHAs are identified by their fingerprint and the solving params
+    (proxy, user agent and cookies).
+
+    :param tokens: (optional) Coalesce the CAPTCHAs with single-use solutions as well
+                   (e.g. reCAPTCHA tokens), only one of the requests can use the token then.
+    """
+
+    def __init__(self, tokens: bool = False):
+        self.tokens = tokens
+        # number of requests which got the solution of another request
+        self.shared_count = 0
+        self._calls: Dict[str, _AsyncCall] = {}
+        self._sync_calls: Dict[str, concurrent.futures.Future] = {}
+        self._future_calls: Dict[str, _FutureCall] = {}
+        self._lock = threading.Lock()
+
+    def get_key(self, captcha: BaseCaptcha, proxy: Optional[ProxyServer] = None,
+                user_agent: Optional[str] = None,
+                cookies: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """ Key of the request (None if it mustn't be coalesced) """
+
+        if not (self.tokens or captcha.SOLUTION_REUSABLE):
+            return None
+        return repr((captcha.get_fingerprint(), proxy, user_agent,
+                     sorted((cookies or {}).items())))
+
+    def call(self, key: str, func: Callable[[], T]) -> T:
+        """ Call func or wait for the result of the same call in another thread """
+
+        with self._lock:
+            future = self._sync_calls.get(key)
+            owner = future is None
+            if owner:
+                future = self._sync_calls[key] = concurrent.futures.Future()
+            else:
+                self.shared_count += 1
+
+        if not owner:
+            return future.result()  # type: ignore
+
+        try:
+            result = func()
+        except BaseException as exc:
+            future.set_exception(exc)  # type: ignore
+            raise
+        else:
+            future.set_result(result)  # type: ignore
+            return result
+        finally:
+            with self._lock:
+                del self._sync_calls[key]
+
+    def call_future(self, key: str,
+                    func: Callable[[], concurrent.futures.Future]) -> concurrent.futures.Future:
+        """
+        Future of func() (called in the calling thread, it returns a future) or of the same
+        call made by another thread. The call is cancelled if all its futures are cancelled.
+        """
+
+        with self._lock:
+            call = self._future_calls.get(key)
+            owner = call is None
+            if call is None:
+                call = self._future_calls[key] = _FutureCall(concurrent.futures.Future())
+            else:
+                self.shared_count += 1
+            call.waiters += 1
+
+        waiter: concurrent.futures.Future = concurrent.futures.Future()
+        waiter.add_done_callback(lambda waiter: waiter.cancelled() and self._leave(key, call))
+        call.future.add_done_callback(lambda future: copy_future_state(future, waiter))
+
+        if owner:
+            try:
+                result = func()
+            except BaseException as exc:
+                self._discard_future_call(key, call)
+                if not call.future.done():
+                    call.future.set_exception(exc)
+                raise
+            result.add_done_callback(lambda result: self._discard_future_call(key, call))
+            result.add_done_callback(lambda result: copy_future_state(result, call.future))
+            call.future.add_done_callback(lambda future: future.cancelled() and result.cancel())
+        return waiter
+
+    def _leave(self, key: str, call: _FutureCall) -> None:
+        with self._lock:
+            call.waiters -= 1
+            if call.waiters:
+                return
+            if self._future_calls.get(key) is call:
+                del self._future_calls[key]
+        call.future.cancel()
+
+    def _discard_future_call(self, key: str, call: _FutureCall) -> None:
+        with self._lock:
+            if self._future_calls.get(key) is call:
+                del self._future_calls[key]
+
+    def _discard(self, key: str, call: _AsyncCall) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def call_async(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await func() or the same call made by another coroutine.
+        The call is cancelled if all the coroutines awaiting it are cancelled.
+        """
+
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _AsyncCall(asyncio.ensure_future(func()))
+            call.future.add_done_callback(lambda _, call=call: self._discard(key, call))
+        else:
+            self.shared_count += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.future)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.future.done():
+                call.future.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+
+def copy_future_state(source: concurrent.futures.Future,
+                      destination: concurrent.futures.Future) -> None:
+    """ Set the result (or the exception) of the done source future to the destination one """
+
+    if destination.done():
+        return
+    if source.cancelled():
+        destination.cancel()
+    elif source.exception() is not None:
+        destination.set_exception(source.exception())
+    else:
+        destination.set_result(source.result())
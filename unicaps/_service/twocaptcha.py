@@ -11,7 +11,7 @@ from ..common import CaptchaAlphabet
 
 __all__ = [
     'Service', 'GetBalanceRequest', 'GetStatusRequest',
-    'ReportGoodRequest', 'ReportBadRequest',
+    'ReportGoodRequest', 'ReportBadRequest', 'MultiSolutionRequest',
     'ImageCaptchaTaskRequest', 'ImageCaptchaSolutionRequest',
     'RecaptchaV2TaskRequest', 'RecaptchaV2SolutionRequest',
     'RecaptchaV3TaskRequest', 'RecaptchaV3SolutionRequest',
@@ -30,6 +30,9 @@ class Service(HTTPService):
     """ Main service class for 2captcha """
 
     BASE_URL = 'https://2captcha.com'
+    SUPPORTS_PINGBACK = True
+    SUPPORTS_MULTIPART_UPLOAD = True
+    MAX_IMAGE_FILESIZE = 100 * 1024
 
     def _post_init(self):
         """ Init settings """
@@ -62,8 +65,12 @@ class Request(HTTPRequestJSON):
         ###############
         # handle errors
         ###############
-        error_code = response_data["request"]
-        error_text = response_data.get("error_text", "")
+        self.raise_error(response_data["request"], response_data.get("error_text", ""))
+
+    @staticmethod
+    def raise_error(error_code: str, error_text: str = ""):
+        """ Raise an appropriate exception for the error code """
+
         error_msg = f"{error_code}: {error_text}"
 
         if error_code == 'CAPCHA_NOT_READY':  # pylint: disable=no-else-raise
@@ -74,9 +81,7 @@ class Request(HTTPRequestJSON):
         elif error_code in ('ERROR_ZERO_BALANCE',):
             raise exceptions.LowBalanceError(error_msg)
         elif error_code in ('ERROR_NO_SLOT_AVAILABLE',):
-            # If server returns ERROR_NO_SLOT_AVAILABLE make a 5 seconds timeout before sending
-            # next request.
-            # time.sleep(5)
+            # the next requests are slowed down by the rate limiter (if it's set)
             raise exceptions.ServiceTooBusy(error_msg)
         elif error_code in ('MAX_USER_TURN',) or error_code.startswith('ERROR:'):
             raise exceptions.TooManyRequestsError(error_msg)
@@ -203,6 +208,9 @@ class ReportBadRequest(ResRequest):
 class TaskRequest(InRequest):
     """ Common Task Request class """
 
+    # the request creates a paid task
+    idempotent = False
+
     # pylint: disable=arguments-differ,unused-argument
     def prepare(self, captcha, proxy, user_agent, cookies):
         """ Prepare a request """
@@ -228,6 +236,9 @@ class TaskRequest(InRequest):
         if user_agent:
             request['data']['userAgent'] = user_agent
 
+        if self._service.pingback_url:
+            request['data']['pingback'] = self._service.pingback_url
+
         return request
 
     def parse_response(self, response) -> dict:
@@ -298,6 +309,75 @@ class SolutionRequest(ResRequest):
         )
 
 
+class MultiSolutionMixin:
+    """
+    Solution request for several tasks at once (res.php?action=get&ids=...).
+    Mixed into the res.php request class of a service with the 2captcha API.
+    The answers lack the cost and the extra data, so the service fetches the solved tasks
+    one by one (the batch tells which ones are ready).
+    """
+
+    # CAPTCHAs with a plain string answer (the answers are separated by "|")
+    CAPTCHA_TYPES = frozenset((CaptchaType.IMAGE, CaptchaType.TEXT, CaptchaType.RECAPTCHAV2,
+                               CaptchaType.RECAPTCHAV3, CaptchaType.HCAPTCHA))
+    # CAPTCHAs whose answers may contain "|" (they are checked one by one)
+    UNBATCHED_CAPTCHA_TYPES = frozenset((CaptchaType.IMAGE, CaptchaType.TEXT))
+    # max number of task IDs per request
+    MAX_TASKS = 100
+
+    # pylint: disable=arguments-differ
+    def prepare(self, tasks) -> dict:  # type: ignore
+        """ Prepare request """
+
+        request = super().prepare(tasks=tasks)  # type: ignore
+        request["params"].update(
+            dict(action="get", ids=",".join(task.task_id for task in tasks))
+        )
+        return request
+
+    @classmethod
+    def is_batched(cls, captcha_type: CaptchaType) -> bool:
+        """ The tasks of the CAPTCHA type are checked in a batch """
+        return captcha_type in cls.CAPTCHA_TYPES and captcha_type not in cls.UNBATCHED_CAPTCHA_TYPES
+
+    def parse_response(self, response) -> dict:
+        """ Parse response and return a result (or an exception) for each task """
+
+        response_data = super().parse_response(response)  # type: ignore
+
+        tasks = self.source_data['tasks']  # type: ignore
+        answers = response_data.pop("request").split("|")
+        if len(answers) != len(tasks):
+            raise exceptions.ServiceError(
+                f"Unexpected number of answers: {len(answers)} (expected {len(tasks)})"
+            )
+
+        return dict(
+            results={task.task_id: self.parse_answer(task, answer)
+                     for task, answer in zip(tasks, answers)}
+        )
+
+    @classmethod
+    def parse_answer(cls, task, answer: str):
+        """ Parse an answer for the task and return the result (or an exception) """
+
+        if answer == 'CAPCHA_NOT_READY' or answer.startswith('ERROR'):
+            try:
+                cls.raise_error(answer)  # type: ignore
+            except exceptions.UnicapsException as exc:
+                return exc
+
+        return dict(
+            solution=task.captcha.get_solution_class()(answer),
+            cost=None,
+            extra={}
+        )
+
+
+class MultiSolutionRequest(MultiSolutionMixin, ResRequest):
+    """ Solution request for several tasks at once """
+
+
 class ImageCaptchaTaskRequest(TaskRequest):
     """ ImageCaptchaTask Request class """
 
@@ -313,12 +393,16 @@ class ImageCaptchaTaskRequest(TaskRequest):
         )
 
         # add required params
-        request['data'].update(
-            dict(
-                method="base64",
-                body=captcha.get_image_base64().decode('ascii')
+        if self._service.multipart_upload:
+            request['data']['method'] = 'post'
+            request['files'] = dict(file=captcha.get_image_file())
+        else:
+            request['data'].update(
+                dict(
+                    method="base64",
+                    body=captcha.get_image_base64().decode('ascii')
+                )
             )
-        )
 
         # add optional params
         request['data'].update(
@@ -4,15 +4,71 @@ CaptchaSolver class
 """
 import io
 import pathlib
-from typing import Union
-
-from .captcha import (
-    ImageCaptcha, TextCaptcha, RecaptchaV2, RecaptchaV3, HCaptcha, FunCaptcha, KeyCaptcha, GeeTest,
-    GeeTestV4, CapyPuzzle, TikTokCaptcha
-)
-from ._captcha.base import BaseCaptcha  # type: ignore
+import secrets
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, Iterator, Mapping, Optional, Tuple, Union
+from urllib.parse import urlsplit, urlunsplit
+
+from ._batch import CaptchaBatch, BATCH_MAX_WORKERS
+from ._captcha import CAPTCHA_REGISTRY, CaptchaType
+from ._captcha.base import BaseCaptcha, trusted_mode  # type: ignore
+from ._captcha.image_pipeline import ImagePipeline
+from ._misc.metrics import MetricsSink
+from ._misc.tracing import Tracer
 from ._service import CaptchaSolvingService, SOLVING_SERVICE
-from ._service.base import SolvedCaptcha, CaptchaTask
+from ._service.base import BaseService, SolvedCaptcha, CaptchaTask
+from ._service.cache import SolutionCache
+from ._service.circuit import CircuitBreaker, CircuitEvent
+from ._service.ratelimit import RateLimiter
+from ._service.singleflight import SingleFlight
+from ._service.polling import PollingStrategy
+from ._transport.http_transport import StandardHTTPTransport
+from ._transport.pingback import PingbackReceiver, get_pingback_path
+from .exceptions import UnicapsException
+
+# default max number of CAPTCHAs being solved at the same time by solve_many()
+SOLVE_MANY_MAX_IN_FLIGHT = 10
+
+
+def _parse_service_name(service_name: Union[CaptchaSolvingService, str]) -> CaptchaSolvingService:
+    """ Check the service name and convert it to CaptchaSolvingService """
+
+    if isinstance(service_name, CaptchaSolvingService):
+        return service_name
+
+    if isinstance(service_name, str):
+        try:
+            return CaptchaSolvingService(service_name)
+        except ValueError as exc:
+            raise ValueError(
+                f"'{service_name}' is not a valid CaptchaSolvingService. "
+                "Please use one of the following values: " + ', '.join(
+                    [f"'{i.value}'" for i in CaptchaSolvingService]
+                )
+            ) from exc
+
+    raise ValueError(
+        '"service_name" param must be an instance of str or CaptchaSolvingService!'
+    )
+
+
+def _parse_solve_item(item: Union[BaseCaptcha, Mapping]) -> Tuple[BaseCaptcha, Dict]:
+    """ Split an item of solve_many() into a CAPTCHA and proxy/user_agent/cookies kwargs """
+
+    if isinstance(item, BaseCaptcha):
+        return item, {}
+
+    kwargs = dict(item)
+    try:
+        captcha = kwargs.pop('captcha')
+    except KeyError as exc:
+        raise ValueError('"captcha" key is required for every item of solve_many()!') from exc
+
+    unknown_keys = set(kwargs) - {'proxy', 'user_agent', 'cookies'}
+    if unknown_keys:
+        raise ValueError(f"Unknown keys of solve_many() item: {', '.join(sorted(unknown_keys))}")
+    return captcha, kwargs
 
 
 class CaptchaSolver:
@@ -20,29 +76,28 @@ class CaptchaSolver:
 
     :param service_name: captcha solving service to use (enum CaptchaSolvingService or str).
     :param api_key: API key to access the solving service.
+    :param transport_settings: (optional) HTTP transport settings: http2, max_connections,
+                               max_keepalive_connections, keepalive_expiry, connect_timeout,
+                               read_timeout, write_timeout and pool_timeout.
+    :param transport: (optional) Transport shared with other solvers (it isn't closed
+                      by the solver).
+    :param trusted: (optional) Skip the type checks of the CAPTCHA params and the solutions.
     """
 
-    def __init__(self, service_name: Union[CaptchaSolvingService, str], api_key: str):
-        # check service_name
-        if isinstance(service_name, CaptchaSolvingService):
-            self.service_name = service_name
-        elif isinstance(service_name, str):
-            try:
-                self.service_name = CaptchaSolvingService(service_name)
-            except ValueError as exc:
-                raise ValueError(
-                    f"'{service_name}' is not a valid CaptchaSolvingService. "
-                    "Please use one of the following values: " + ', '.join(
-                        [f"'{i.value}'" for i in CaptchaSolvingService]
-                    )
-                ) from exc
-        else:
-            raise ValueError(
-                '"service_name" param must be an instance of str or CaptchaSolvingService!'
-            )
-
+    def __init__(self, service_name: Union[CaptchaSolvingService, str], api_key: str,
+                 transport_settings: Optional[Dict] = None,
+                 transport: Optional[StandardHTTPTransport] = None, trusted: bool = False):
+        self.service_name = _parse_service_name(service_name)
         self.api_key = api_key
-        self._service = SOLVING_SERVICE[self.service_name].Service(api_key)  # type: ignore
+        self._service = SOLVING_SERVICE[self.service_name].Service(  # type: ignore
+            api_key, transport_settings, transport
+        )
+        self._service.trusted = trusted
+        self._pingback_receiver: Optional[PingbackReceiver] = None
+
+    def _get_services(self) -> Dict[CaptchaSolvingService, BaseService]:
+        """ Services the settings of the solver are applied to """
+        return {self.service_name: self._service}
 
     def _solve_captcha(self, captcha_class, *args, **kwargs):
         proxy = kwargs.pop('proxy') if 'proxy' in kwargs else None
@@ -50,12 +105,19 @@ class CaptchaSolver:
         cookies = kwargs.pop('cookies') if 'cookies' in kwargs else None
 
         return self._service.solve_captcha(
-            captcha_class(*args, **kwargs),
+            self._create_captcha(captcha_class, *args, **kwargs),
             proxy=proxy,
             user_agent=user_agent,
             cookies=cookies
         )
 
+    def _create_captcha(self, captcha_class, *args, **kwargs) -> BaseCaptcha:
+        if isinstance(captcha_class, CaptchaType):
+            # the class registered for the type (its module is imported on the first use)
+            captcha_class = CAPTCHA_REGISTRY.get_classes(captcha_class)[0]
+        with trusted_mode() if self._service.trusted else nullcontext():
+            return captcha_class(*args, **kwargs)
+
     def solve_image_captcha(self,
                             image: Union[bytes, io.RawIOBase, io.BufferedIOBase, pathlib.Path],
                             **kwargs) -> SolvedCaptcha:
@@ -75,7 +137,7 @@ class CaptchaSolver:
         :rtype: unicaps.SolvedCaptcha
         """
 
-        return self._solve_captcha(ImageCaptcha, image, **kwargs)
+        return self._solve_captcha(CaptchaType.IMAGE, image, **kwargs)
 
     def solve_text_captcha(self, text: str, **kwargs) -> SolvedCaptcha:
         r"""Solves text CAPTCHA.
@@ -86,7 +148,7 @@ class CaptchaSolver:
         :return: :class:`SolvedCaptcha <SolvedCaptcha>` object
         :rtype: unicaps.SolvedCaptcha
         """
-        return self._solve_captcha(TextCaptcha, text, **kwargs)
+        return self._solve_captcha(CaptchaType.TEXT, text, **kwargs)
 
     def solve_recaptcha_v2(self, site_key: str, page_url: str, **kwargs) -> SolvedCaptcha:
         r"""Solves reCAPTCHA v2.
@@ -103,7 +165,7 @@ class CaptchaSolver:
         :return: :class:`SolvedCaptcha <SolvedCaptcha>` object
         :rtype: unicaps.SolvedCaptcha
         """
-        return self._solve_captcha(RecaptchaV2, site_key, page_url, **kwargs)
+        return self._solve_captcha(CaptchaType.RECAPTCHAV2, site_key, page_url, **kwargs)
 
     def solve_recaptcha_v3(self, site_key: str, page_url: str, **kwargs) -> SolvedCaptcha:
         r"""Solves reCAPTCHA v3.
@@ -120,7 +182,7 @@ class CaptchaSolver:
         :return: :class:`SolvedCaptcha <SolvedCaptcha>` object
         :rtype: unicaps.SolvedCaptcha
         """
-        return self._solve_captcha(RecaptchaV3, site_key, page_url, **kwargs)
+        return self._solve_captcha(CaptchaType.RECAPTCHAV3, site_key, page_url, **kwargs)
 
     def solve_hcaptcha(self, site_key: str, page_url: str, **kwargs) -> SolvedCaptcha:
         r"""Solves hCaptcha.
@@ -135,7 +197,7 @@ class CaptchaSolver:
         :return: :class:`SolvedCaptcha <SolvedCaptcha>` object
         :rtype: unicaps.SolvedCaptcha
         """
-        return self._solve_captcha(HCaptcha, site_key, page_url, **kwargs)
+        return self._solve_captcha(CaptchaType.HCAPTCHA, site_key, page_url, **kwargs)
 
     def solve_funcaptcha(self, public_key: str, page_url: str, **kwargs) -> SolvedCaptcha:
         r"""Solves FunCaptcha.
@@ -151,7 +213,7 @@ class CaptchaSolver:
         :return: :class:`SolvedCaptcha <SolvedCaptcha>` object
         :rtype: unicaps.SolvedCaptcha
         """
-        return self._solve_captcha(FunCaptcha, public_key, page_url, **kwargs)
+        return self._solve_captcha(CaptchaType.FUNCAPTCHA, public_key, page_url, **kwargs)
 
     def solve_keycaptcha(self, page_url: str, user_id: str, session_id: str, ws_sign: str,
                          ws_sign2: str, **kwargs) -> SolvedCaptcha:
@@ -166,7 +228,7 @@ class CaptchaSolver:
         :rtype: unicaps.SolvedCaptcha
         """
         return self._solve_captcha(
-            KeyCaptcha, page_url, user_id, session_id, ws_sign, ws_sign2, **kwargs
+            CaptchaType.KEYCAPTCHA, page_url, user_id, session_id, ws_sign, ws_sign2, **kwargs
         )
 
     def solve_geetest(self, page_url: str, gt_key: str, challenge: str,
@@ -180,7 +242,7 @@ class CaptchaSolver:
         :return: :class:`SolvedCaptcha <SolvedCaptcha>` object
         :rtype: unicaps.SolvedCaptcha
         """
-        return self._solve_captcha(GeeTest, page_url, gt_key, challenge, **kwargs)
+        return self._solve_captcha(CaptchaType.GEETEST, page_url, gt_key, challenge, **kwargs)
 
     def solve_geetest_v4(self, page_url: str, captcha_id: str, **kwargs) -> SolvedCaptcha:
         r"""Solves GeeTestV4.
@@ -190,7 +252,7 @@ class CaptchaSolver:
         :return: :class:`SolvedCaptcha <SolvedCaptcha>` object
         :rtype: unicaps.SolvedCaptcha
         """
-        return self._solve_captcha(GeeTestV4, page_url, captcha_id, **kwargs)
+        return self._solve_captcha(CaptchaType.GEETESTV4, page_url, captcha_id, **kwargs)
 
     def solve_capy_puzzle(self, site_key: str, page_url: str, **kwargs) -> SolvedCaptcha:
         r"""Solves Capy Puzzle CAPTCHA.
@@ -204,7 +266,7 @@ class CaptchaSolver:
         :return: :class:`SolvedCaptcha <SolvedCaptcha>` object
         :rtype: unicaps.SolvedCaptcha
         """
-        return self._solve_captcha(CapyPuzzle, site_key, page_url, **kwargs)
+        return self._solve_captcha(CaptchaType.CAPY, site_key, page_url, **kwargs)
 
     def solve_tiktok(self, page_url: str, **kwargs) -> SolvedCaptcha:
         r"""Solves TikTokCaptcha.
@@ -218,7 +280,238 @@ class CaptchaSolver:
         :return: :class:`SolvedCaptcha <SolvedCaptcha>` object
         :rtype: unicaps.SolvedCaptcha
         """
-        return self._solve_captcha(TikTokCaptcha, page_url, **kwargs)
+        return self._solve_captcha(CaptchaType.TIKTOK, page_url, **kwargs)
+
+    def solve_many(self, captchas: Iterable[Union[BaseCaptcha, Mapping]],
+                   max_in_flight: int = SOLVE_MANY_MAX_IN_FLIGHT
+                   ) -> Iterator[Union[SolvedCaptcha, Exception]]:
+        r"""Solves many CAPTCHAs concurrently.
+
+        Yields the results as they complete (not in the input order). An exception raised
+        while solving a CAPTCHA is yielded instead of its result.
+
+        :param captchas: Iterable of CAPTCHA objects or dicts with "captcha" key and optional
+                         "proxy", "user_agent" and "cookies" keys.
+        :param max_in_flight: (optional) Max number of CAPTCHAs being solved at the same time.
+        :return: Iterator of :class:`SolvedCaptcha <SolvedCaptcha>` objects or exceptions
+        """
+
+        captchas = iter(captchas)
+        with self.batch(max_workers=min(max_in_flight, BATCH_MAX_WORKERS)) as batch:
+            futures = set()
+            try:
+                while True:
+                    for item in captchas:
+                        captcha, kwargs = _parse_solve_item(item)
+                        futures.add(batch.submit(captcha, **kwargs))
+                        if len(futures) >= max_in_flight:
+                            break
+
+                    if not futures:
+                        return
+
+                    done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.exception() or future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def batch(self, max_workers: int = BATCH_MAX_WORKERS) -> CaptchaBatch:
+        r"""Creates a batch to solve CAPTCHAs in the background.
+
+        The tasks are created by a pool of worker threads and checked by a single shared poller,
+        so no thread is blocked while a CAPTCHA is being solved.
+
+        :param max_workers: (optional) Number of worker threads creating the tasks.
+        :return: :class:`CaptchaBatch <CaptchaBatch>` object
+        :rtype: unicaps.CaptchaBatch
+        """
+        return CaptchaBatch(self._service, max_workers=max_workers)
+
+    def enable_multipart_upload(self, enabled: bool = True) -> None:
+        r"""Upload images as files (multipart/form-data) instead of base64 strings.
+
+        It saves the memory and CPU spent on base64 encoding of large images.
+
+        :param enabled: (optional) Enable or disable the multipart upload.
+        :raises UnicapsException: The service doesn't support multipart upload.
+        """
+        services = self._get_services()
+        if enabled and not any(service.SUPPORTS_MULTIPART_UPLOAD
+                               for service in services.values()):
+            raise UnicapsException(
+                f"{', '.join(name.value for name in services)} doesn't support multipart "
+                "upload of images!"
+            )
+        for service in services.values():
+            # the services not supporting it keep base64
+            service.multipart_upload = enabled and service.SUPPORTS_MULTIPART_UPLOAD
+
+    def set_image_pipeline(self, pipeline: Optional[ImagePipeline]) -> None:
+        r"""Sets the pre-processing of image CAPTCHAs before upload.
+
+        :param pipeline: :class:`ImagePipeline <ImagePipeline>` object (None to disable it).
+        """
+        for service in self._get_services().values():
+            service.image_pipeline = pipeline
+
+    def set_solution_cache(self, cache: Optional[SolutionCache]) -> None:
+        r"""Sets the cache of the solutions of deterministic (image and text) CAPTCHAs.
+
+        A CAPTCHA with the same content and options is solved once, the next ones get
+        the cached solution at zero cost (SolvedCaptcha.cached is set).
+        A solution reported as bad is evicted from the cache.
+
+        :param cache: :class:`MemorySolutionCache <MemorySolutionCache>` or
+                      :class:`SQLiteSolutionCache <SQLiteSolutionCache>` object
+                      (None to disable caching).
+        """
+        self._service.solution_cache = cache
+        # the services evict the solutions reported as bad
+        for service in self._get_services().values():
+            service.solution_cache = cache
+
+    def enable_coalescing(self, enabled: bool = True, tokens: bool = False) -> None:
+        r"""Solves concurrent identical CAPTCHAs once: the requests share a single task
+        and get the same :class:`SolvedCaptcha <SolvedCaptcha>` object.
+
+        :param enabled: (optional) Enable or disable the coalescing.
+        :param tokens: (optional) Coalesce the CAPTCHAs with single-use solutions as well
+                       (reCAPTCHA, hCaptcha, GeeTest, etc.), otherwise only image and text
+                       CAPTCHAs are coalesced.
+        """
+        self._service.single_flight = SingleFlight(tokens=tokens) if enabled else None
+
+    def set_rate_limiter(self, rate_limiter: Optional[RateLimiter]) -> None:
+        r"""Sets the client-side rate limiter of the requests to the service.
+
+        The rate and the number of concurrent requests are limited separately for creating
+        tasks and the other requests, and they are lowered automatically when the service
+        reports overload (ServiceTooBusy or TooManyRequestsError).
+
+        :param rate_limiter: :class:`RateLimiter <RateLimiter>` object, it can be shared by
+                             several solvers using the same API key (None to disable it).
+        """
+        for service in self._get_services().values():
+            service.rate_limiter = rate_limiter
+
+    def enable_circuit_breaker(self, enabled: bool = True, failure_threshold: int = 5,
+                               reset_timeout: float = 30.0,
+                               listener: Optional[Callable[[CircuitEvent], None]] = None) -> None:
+        r"""Fails fast on the CAPTCHA types the service keeps failing on.
+
+        After failure_threshold consecutive failures (NetworkError or ServiceError) of
+        a CAPTCHA type, the next tasks of the type raise CircuitOpenError right away for
+        reset_timeout seconds. Then the status of the service is checked and a single trial
+        task is created: the circuit is closed if it's solved.
+
+        :param enabled: (optional) Enable or disable the circuit breaker.
+        :param failure_threshold: (optional) Number of consecutive failures opening the circuit.
+        :param reset_timeout: (optional) Seconds the circuit is open before a trial task.
+        :param listener: (optional) Callable receiving :class:`CircuitEvent <CircuitEvent>`
+                         of every state transition.
+        """
+        for name, service in self._get_services().items():
+            service.circuit_breaker = CircuitBreaker(
+                name.value, failure_threshold, reset_timeout, listener
+            ) if enabled else None
+
+    def set_metrics(self, sink: Optional[MetricsSink]) -> None:
+        r"""Sets the receiver of the metrics: HTTP requests (count and duration by host, path
+        and status), tasks created, tasks in flight, solving time, number of polls per solution,
+        errors by exception class and spend (by service and CAPTCHA type).
+
+        :param sink: :class:`PrometheusMetrics <PrometheusMetrics>` or another
+                     :class:`MetricsSink <MetricsSink>` object (None to disable the metrics).
+                     The metrics of the HTTP requests are set for the transport created by
+                     the solver, set the metrics attribute of a shared transport instead.
+        """
+        for name, service in self._get_services().items():
+            service.set_metrics(sink, name.value)
+
+    def set_tracer(self, tracer: Optional[Tracer]) -> None:
+        r"""Sets the receiver of the phases of solving: solving, creating the task, waiting for
+        the solution, every poll and every request to the service (preparing the data,
+        HTTP round-trip and parsing the response). The spans of a task carry its ID ("task_id").
+
+        :param tracer: :class:`HookTracer <HookTracer>`,
+                       :class:`OpenTelemetryTracer <OpenTelemetryTracer>` or another
+                       :class:`Tracer <Tracer>` object (None to disable the tracing).
+                       The tracer of the requests is set for the transport created by
+                       the solver, set the tracer attribute of a shared transport instead.
+        """
+        for name, service in self._get_services().items():
+            service.set_tracer(tracer, name.value)
+
+    def set_result_options(self, release_payload: bool = True, detach: bool = False) -> None:
+        r"""Sets what the solved CAPTCHAs keep to save memory when many of them are stored.
+
+        :param release_payload: (optional) Release the CAPTCHA payload (e.g. the image).
+        :param detach: (optional) Drop the reference to the service as well, the solutions
+                       can't be reported then.
+        """
+        for service in self._get_services().values():
+            service.release_results = release_payload or detach
+            service.detach_results = detach
+
+    def set_polling_strategy(self, strategy_factory: Callable[[], PollingStrategy]) -> None:
+        r"""Sets the strategy of checking for solutions.
+
+        Every CAPTCHA type gets its own instance of the strategy, as the solving time
+        depends a lot on the type.
+
+        :param strategy_factory: Callable returning a strategy instance, e.g.
+                                 :class:`AdaptivePollingStrategy <AdaptivePollingStrategy>`.
+        """
+        for service in self._get_services().values():
+            for settings in service.settings.values():
+                settings.polling_strategy = strategy_factory()
+
+    def enable_pingback(self, url: str, host: str = '127.0.0.1',
+                        port: Optional[int] = None, token: Optional[str] = None) -> None:
+        r"""Enables pingback mode: the service sends the solutions to the URL, so the tasks
+        are completed without polling (the tasks are still checked rarely as a fallback).
+
+        An embedded HTTP server receiving the callbacks is started in a background thread.
+        A secret token is appended to the path of the URL and only the callbacks sent to
+        that path are accepted, so the solutions can't be injected by anyone else.
+        Note: the URL (domain or IP) may need to be registered in your account first.
+
+        :param url: Public URL of the receiver the service sends the solutions to.
+        :param host: (optional) Host the receiver listens on: the local one by default
+                     (behind a reverse proxy), "0.0.0.0" to receive the callbacks directly.
+        :param port: (optional) Port the receiver listens on (the port of the URL by default).
+        :param token: (optional) Secret token (a random one by default).
+        """
+
+        if not self._service.SUPPORTS_PINGBACK:
+            raise UnicapsException(
+                f"Pingback is not supported by {self.service_name.value} service!"
+            )
+
+        url_parts = urlsplit(url)
+        if port is None:
+            port = url_parts.port or (443 if url_parts.scheme == 'https' else 80)
+        token = token or secrets.token_urlsafe(16)
+
+        self.disable_pingback()
+        self._pingback_receiver = PingbackReceiver(
+            self._service.handle_pingback, host=host, port=port, path=url_parts.path,
+            token=token
+        )
+        self._pingback_receiver.start()
+        self._service.pingback_url = urlunsplit(
+            url_parts._replace(path=get_pingback_path(url_parts.path, token))
+        )
+
+    def disable_pingback(self) -> None:
+        """Disables pingback mode and stops the receiver"""
+
+        self._service.pingback_url = None
+        if self._pingback_receiver is not None:
+            self._pingback_receiver.close()
+            self._pingback_receiver = None
 
     def create_task(self, captcha: BaseCaptcha) -> CaptchaTask:
         """Create task to solve CAPTCHA
@@ -247,6 +540,7 @@ class CaptchaSolver:
 
     def close(self) -> None:
         """Close all connections"""
+        self.disable_pingback()
         self._service.close()
 
     def __enter__(self):
@@ -1,17 +1,16 @@
 """
 AsyncCaptchaSolver class
 """
+import asyncio
 import io
 import pathlib
-from typing import Union
+from typing import AsyncIterator, Iterable, Mapping, Union
 
-from .captcha import (
-    ImageCaptcha, TextCaptcha, RecaptchaV2, RecaptchaV3, HCaptcha, FunCaptcha, KeyCaptcha, GeeTest,
-    GeeTestV4, CapyPuzzle, TikTokCaptcha
-)
+from ._captcha import CaptchaType
 from ._captcha.base import BaseCaptcha  # type: ignore
+from ._pool import TokenPool, TOKEN_SAFETY_MARGIN, TOKEN_TTL
 from ._service.base import AsyncSolvedCaptcha, AsyncCaptchaTask
-from ._solver import CaptchaSolver
+from ._solver import CaptchaSolver, SOLVE_MANY_MAX_IN_FLIGHT, _parse_solve_item
 
 
 class AsyncCaptchaSolver(CaptchaSolver):
@@ -19,6 +18,12 @@ class AsyncCaptchaSolver(CaptchaSolver):
 
     :param service_name: captcha solving service to use (enum CaptchaSolvingService or str).
     :param api_key: API key to access the solving service.
+    :param transport_settings: (optional) HTTP transport settings: http2, max_connections,
+                               max_keepalive_connections, keepalive_expiry, connect_timeout,
+                               read_timeout, write_timeout and pool_timeout.
+    :param transport: (optional) Transport shared with other solvers (it isn't closed
+                      by the solver).
+    :param trusted: (optional) Skip the type checks of the CAPTCHA params and the solutions.
     """
 
     async def _solve_captcha_async(self, captcha_class, *args, **kwargs):
@@ -27,7 +32,7 @@ class AsyncCaptchaSolver(CaptchaSolver):
         cookies = kwargs.pop('cookies') if 'cookies' in kwargs else None
 
         return await self._service.solve_captcha_async(
-            captcha_class(*args, **kwargs),
+            self._create_captcha(captcha_class, *args, **kwargs),
             proxy=proxy,
             user_agent=user_agent,
             cookies=cookies
@@ -53,7 +58,7 @@ class AsyncCaptchaSolver(CaptchaSolver):
         :rtype: unicaps.AsyncSolvedCaptcha
         """
 
-        return await self._solve_captcha_async(ImageCaptcha, image, **kwargs)
+        return await self._solve_captcha_async(CaptchaType.IMAGE, image, **kwargs)
 
     async def solve_text_captcha(self, text: str, **kwargs) -> AsyncSolvedCaptcha:  # type: ignore
         r"""Solves text CAPTCHA.
@@ -64,7 +69,7 @@ class AsyncCaptchaSolver(CaptchaSolver):
         :return: :class:`AsyncSolvedCaptcha <AsyncSolvedCaptcha>` object
         :rtype: unicaps.AsyncSolvedCaptcha
         """
-        return await self._solve_captcha_async(TextCaptcha, text, **kwargs)
+        return await self._solve_captcha_async(CaptchaType.TEXT, text, **kwargs)
 
     async def solve_recaptcha_v2(self, site_key: str, page_url: str,  # type: ignore
                                  **kwargs) -> AsyncSolvedCaptcha:
@@ -82,7 +87,9 @@ class AsyncCaptchaSolver(CaptchaSolver):
         :return: :class:`AsyncSolvedCaptcha <AsyncSolvedCaptcha>` object
         :rtype: unicaps.AsyncSolvedCaptcha
         """
-        return await self._solve_captcha_async(RecaptchaV2, site_key, page_url, **kwargs)
+        return await self._solve_captcha_async(
+            CaptchaType.RECAPTCHAV2, site_key, page_url, **kwargs
+        )
 
     async def solve_recaptcha_v3(self, site_key: str, page_url: str,  # type: ignore
                                  **kwargs) -> AsyncSolvedCaptcha:
@@ -100,7 +107,9 @@ class AsyncCaptchaSolver(CaptchaSolver):
         :return: :class:`AsyncSolvedCaptcha <AsyncSolvedCaptcha>` object
         :rtype: unicaps.AsyncSolvedCaptcha
         """
-        return await self._solve_captcha_async(RecaptchaV3, site_key, page_url, **kwargs)
+        return await self._solve_captcha_async(
+            CaptchaType.RECAPTCHAV3, site_key, page_url, **kwargs
+        )
 
     async def solve_hcaptcha(self, site_key: str, page_url: str,  # type: ignore
                              **kwargs) -> AsyncSolvedCaptcha:
@@ -116,7 +125,7 @@ class AsyncCaptchaSolver(CaptchaSolver):
         :return: :class:`AsyncSolvedCaptcha <AsyncSolvedCaptcha>` object
         :rtype: unicaps.AsyncSolvedCaptcha
         """
-        return await self._solve_captcha_async(HCaptcha, site_key, page_url, **kwargs)
+        return await self._solve_captcha_async(CaptchaType.HCAPTCHA, site_key, page_url, **kwargs)
 
     async def solve_funcaptcha(self, public_key: str, page_url: str,  # type: ignore
                                **kwargs) -> AsyncSolvedCaptcha:
@@ -133,7 +142,9 @@ class AsyncCaptchaSolver(CaptchaSolver):
         :return: :class:`AsyncSolvedCaptcha <AsyncSolvedCaptcha>` object
         :rtype: unicaps.AsyncSolvedCaptcha
         """
-        return await self._solve_captcha_async(FunCaptcha, public_key, page_url, **kwargs)
+        return await self._solve_captcha_async(
+            CaptchaType.FUNCAPTCHA, public_key, page_url, **kwargs
+        )
 
     async def solve_keycaptcha(self, page_url: str, user_id: str, session_id: str,   # type: ignore
                                ws_sign: str, ws_sign2: str, **kwargs) -> AsyncSolvedCaptcha:
@@ -148,7 +159,7 @@ class AsyncCaptchaSolver(CaptchaSolver):
         :rtype: unicaps.AsyncSolvedCaptcha
         """
         return await self._solve_captcha_async(
-            KeyCaptcha, page_url, user_id, session_id, ws_sign, ws_sign2, **kwargs
+            CaptchaType.KEYCAPTCHA, page_url, user_id, session_id, ws_sign, ws_sign2, **kwargs
         )
 
     async def solve_geetest(self, page_url: str, gt_key: str, challenge: str,  # type: ignore
@@ -162,7 +173,9 @@ class AsyncCaptchaSolver(CaptchaSolver):
         :return: :class:`AsyncSolvedCaptcha <AsyncSolvedCaptcha>` object
         :rtype: unicaps.AsyncSolvedCaptcha
         """
-        return await self._solve_captcha_async(GeeTest, page_url, gt_key, challenge, **kwargs)
+        return await self._solve_captcha_async(
+            CaptchaType.GEETEST, page_url, gt_key, challenge, **kwargs
+        )
 
     async def solve_geetest_v4(self, page_url: str, captcha_id: str,  # type: ignore
                                **kwargs) -> AsyncSolvedCaptcha:
@@ -173,7 +186,9 @@ class AsyncCaptchaSolver(CaptchaSolver):
         :return: :class:`AsyncSolvedCaptcha <AsyncSolvedCaptcha>` object
         :rtype: unicaps.AsyncSolvedCaptcha
         """
-        return await self._solve_captcha_async(GeeTestV4, page_url, captcha_id, **kwargs)
+        return await self._solve_captcha_async(
+            CaptchaType.GEETESTV4, page_url, captcha_id, **kwargs
+        )
 
     async def solve_capy_puzzle(self, site_key: str, page_url: str,  # type: ignore
                                 **kwargs) -> AsyncSolvedCaptcha:
@@ -188,7 +203,7 @@ class AsyncCaptchaSolver(CaptchaSolver):
         :return: :class:`AsyncSolvedCaptcha <AsyncSolvedCaptcha>` object
         :rtype: unicaps.AsyncSolvedCaptcha
         """
-        return await self._solve_captcha_async(CapyPuzzle, site_key, page_url, **kwargs)
+        return await self._solve_captcha_async(CaptchaType.CAPY, site_key, page_url, **kwargs)
 
     async def solve_tiktok(self, page_url: str, **kwargs) -> AsyncSolvedCaptcha:  # type: ignore
         r"""Solves TikTokCaptcha.
@@ -202,7 +217,63 @@ class AsyncCaptchaSolver(CaptchaSolver):
         :return: :class:`AsyncSolvedCaptcha <AsyncSolvedCaptcha>` object
         :rtype: unicaps.AsyncSolvedCaptcha
         """
-        return await self._solve_captcha_async(TikTokCaptcha, page_url, **kwargs)
+        return await self._solve_captcha_async(CaptchaType.TIKTOK, page_url, **kwargs)
+
+    async def solve_many(self,  # type: ignore
+                         captchas: Iterable[Union[BaseCaptcha, Mapping]],
+                         max_in_flight: int = SOLVE_MANY_MAX_IN_FLIGHT
+                         ) -> AsyncIterator[Union[AsyncSolvedCaptcha, Exception]]:
+        r"""Solves many CAPTCHAs concurrently.
+
+        Yields the results as they complete (not in the input order). An exception raised
+        while solving a CAPTCHA is yielded instead of its result. New tasks are created
+        as soon as the previous ones are solved, so up to max_in_flight tasks are always
+        being solved by the service.
+
+        :param captchas: Iterable of CAPTCHA objects or dicts with "captcha" key and optional
+                         "proxy", "user_agent" and "cookies" keys.
+        :param max_in_flight: (optional) Max number of CAPTCHAs being solved at the same time.
+        :return: Async iterator of :class:`AsyncSolvedCaptcha <AsyncSolvedCaptcha>` objects
+                 or exceptions
+        """
+
+        captchas = iter(captchas)
+        futures = set()
+        try:
+            while True:
+                for item in captchas:
+                    captcha, kwargs = _parse_solve_item(item)
+                    futures.add(
+                        asyncio.ensure_future(self._service.solve_captcha_async(captcha, **kwargs))
+                    )
+                    if len(futures) >= max_in_flight:
+                        break
+
+                if not futures:
+                    return
+
+                done, futures = await asyncio.wait(futures, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    yield future.exception() or future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def token_pool(self, max_size: int = 10, token_ttl: float = TOKEN_TTL,
+                   safety_margin: float = TOKEN_SAFETY_MARGIN) -> TokenPool:
+        r"""Creates a pool of pre-solved tokens of token CAPTCHAs (reCAPTCHA, hCaptcha, etc.).
+
+        The tokens are solved in the background, so they are handed out right away.
+        The number of tokens kept follows the demand.
+
+        :param max_size: (optional) Max number of tokens (solved and being solved) of a CAPTCHA.
+        :param token_ttl: (optional) Seconds a token is valid since it's solved.
+        :param safety_margin: (optional) A token expiring in less seconds isn't handed out.
+        :return: :class:`TokenPool <TokenPool>` object
+        :rtype: unicaps.pool.TokenPool
+        """
+        return TokenPool(self._service, max_size=max_size, token_ttl=token_ttl,
+                         safety_margin=safety_margin)
 
     async def create_task(self, captcha: BaseCaptcha) -> AsyncCaptchaTask:  # type: ignore
         """Create task to solve CAPTCHA
@@ -231,6 +302,7 @@ class AsyncCaptchaSolver(CaptchaSolver):
 
     async def close(self) -> None:  # type: ignore
         """Close all connections"""
+        self.disable_pingback()
         await self._service.close_async()
 
     async def __aenter__(self):
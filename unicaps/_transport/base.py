@@ -6,10 +6,16 @@ Base transport stuff
 from abc import ABC, abstractmethod
 from typing import Optional, Any
 
+from .._misc.tracing import (NO_TRACER, SPAN_HTTP, SPAN_PARSE, SPAN_PREPARE,
+                             SPAN_REQUEST, Tracer)
+
 
 class BaseRequest(ABC):
     """ Base request class """
 
+    # the request can be safely repeated (e.g. it doesn't create a paid task)
+    idempotent = True
+
     def __init__(self, service):
         # solving service instance
         self._service = service
@@ -39,26 +45,50 @@ class BaseRequest(ABC):
 class BaseTransport(ABC):  # pylint: disable=too-few-public-methods
     """ Base transport class """
 
+    # receiver of the metrics of the requests (MetricsSink)
+    metrics = None
+    # receiver of the phases of the requests
+    tracer: Tracer = NO_TRACER
+
     def __init__(self, settings: Optional[dict] = None):
         self.settings = settings or {}
 
     @abstractmethod
-    def _make_request(self, request_data: dict) -> Any:
+    def _make_request(self, request_data: dict, request: Optional[BaseRequest] = None) -> Any:
         """ Abstract method to make a request """
 
     @abstractmethod
-    async def _make_request_async(self, request_data: dict) -> Any:
+    async def _make_request_async(self, request_data: dict,
+                                  request: Optional[BaseRequest] = None) -> Any:
         """ Abstract method to make a request """
 
     def make_request(self, request: BaseRequest, *args) -> dict:
         """ Makes a request to the service """
-        response = self._make_request(request.prepare(*args))
-        return request.process_response(response)
+        tracer = self.tracer
+        with tracer.span(SPAN_REQUEST, request=type(request).__name__,
+                         task_id=_get_task_id(args)) as span:
+            with tracer.span(SPAN_PREPARE):
+                request_data = request.prepare(*args)
+            with tracer.span(SPAN_HTTP):
+                response = self._make_request(request_data, request)
+            with tracer.span(SPAN_PARSE):
+                result = request.process_response(response)
+            _set_created_task_id(span, result)
+            return result
 
     async def make_request_async(self, request: BaseRequest, *args) -> dict:
         """ Makes a request to the service """
-        response = await self._make_request_async(request.prepare(*args))
-        return request.process_response(response)
+        tracer = self.tracer
+        with tracer.span(SPAN_REQUEST, request=type(request).__name__,
+                         task_id=_get_task_id(args)) as span:
+            with tracer.span(SPAN_PREPARE):
+                request_data = request.prepare(*args)
+            with tracer.span(SPAN_HTTP):
+                response = await self._make_request_async(request_data, request)
+            with tracer.span(SPAN_PARSE):
+                result = request.process_response(response)
+            _set_created_task_id(span, result)
+            return result
 
     @abstractmethod
     def close(self):
@@ -67,3 +97,18 @@ class BaseTransport(ABC):  # pylint: disable=too-few-public-methods
     @abstractmethod
     async def close_async(self):
         """ Close connections (async) """
+
+
+def _get_task_id(args: tuple) -> Any:
+    """ ID of the task (or the list of IDs of the tasks) the request is about """
+
+    if not args:
+        return None
+    if isinstance(args[0], list):
+        return [task.task_id for task in args[0] if hasattr(task, 'task_id')] or None
+    return getattr(args[0], 'task_id', None)
+
+
+def _set_created_task_id(span, result: Any) -> None:
+    if isinstance(result, dict) and 'task_id' in result:
+        span.set_attribute('task_id', str(result['task_id']))
@@ -3,8 +3,16 @@
 Transport and requests for HTTP protocol
 """
 
+import asyncio
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from json.decoder import JSONDecodeError
-from typing import Optional, Dict
+from timeit import default_timer as timer
+from typing import Optional, Dict, Union
+from urllib.parse import urlsplit
 
 import httpx
 
@@ -16,30 +24,241 @@ from ..__version__ import __version__  # type: ignore
 HTTP_RETRY_MAX_COUNT = 5  # max retry count in case of http(s) errors
 HTTP_RETRY_BACKOFF_FACTOR = 0.5  # backoff factor for Retry
 HTTP_RETRY_STATUS_FORCELIST = {500, 502, 503, 504}  # status forcelist for Retry
+# status codes meaning the request was refused (safe to retry even a non-idempotent request)
+HTTP_RETRY_REFUSED_STATUSES = {429, 503}
+# errors raised before the request is sent (safe to retry even a non-idempotent request)
+HTTP_RETRY_CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+HTTP_RETRY_BACKOFF_MAX = 30.0  # max seconds between retries
+HTTP_RETRY_BUDGET_RATIO = 0.2  # max ratio of retries to requests
+HTTP_RETRY_BUDGET_MIN = 10  # number of retries allowed regardless of the ratio
+
+# default transport settings
+HTTP_DEFAULT_SETTINGS = dict(
+    max_retries=HTTP_RETRY_MAX_COUNT,
+    backoff_factor=HTTP_RETRY_BACKOFF_FACTOR,
+    backoff_max=HTTP_RETRY_BACKOFF_MAX,
+    retry_budget_ratio=HTTP_RETRY_BUDGET_RATIO,
+    retry_budget_min=HTTP_RETRY_BUDGET_MIN,
+    handle_http_errors=True,  # raise NetworkError on 4xx and 5xx status codes
+    http2=False,  # use HTTP/2 (requires httpx[http2] extra to be installed)
+    max_connections=100,  # max number of connections in the pool
+    max_keepalive_connections=20,  # max number of idle connections kept alive
+    keepalive_expiry=5.0,  # seconds an idle connection is kept alive
+    connect_timeout=30.0,  # seconds to establish a connection
+    read_timeout=30.0,  # seconds to wait for a chunk of data
+    write_timeout=30.0,  # seconds to send a chunk of data
+    pool_timeout=30.0  # seconds to wait for a connection from the pool
+)
+
+
+class RetryBudget:
+    """
+    Limits the number of retries to a ratio of requests, so the retries don't multiply the load
+    when a service is down. Every request deposits `ratio` of a token, every retry withdraws
+    a token, up to `min_retries` tokens are kept.
+    """
+
+    def __init__(self, ratio: float = HTTP_RETRY_BUDGET_RATIO,
+                 min_retries: int = HTTP_RETRY_BUDGET_MIN):
+        self._ratio = ratio
+        self._max_balance = float(min_retries)
+        self._balance = float(min_retries)
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        """ Record a request """
+
+        with self._lock:
+            self._balance = min(self._balance + self._ratio, self._max_balance)
+
+    def withdraw(self) -> bool:
+        """ Try to spend a token on a retry """
+
+        with self._lock:
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """ Parse Retry-After header value (seconds or HTTP date) """
+
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
 
 
 class StandardHTTPTransport(BaseTransport):  # pylint: disable=too-few-public-methods
     """ Standard HTTP Transport """
 
     def __init__(self, settings: Optional[Dict] = None):
-        super().__init__(settings)
-        self.settings.setdefault('max_retries', HTTP_RETRY_MAX_COUNT)
-        self.settings.setdefault('handle_http_errors', True)
+        super().__init__(dict(settings or {}))
+        unknown_settings = set(self.settings) - set(HTTP_DEFAULT_SETTINGS)
+        if unknown_settings:
+            raise ValueError(f"Unknown transport settings: {', '.join(sorted(unknown_settings))}")
 
-        default_headers = {
-            'User-Agent': f'python-unicaps/{__version__}'
-        }
+        for name, value in HTTP_DEFAULT_SETTINGS.items():
+            self.settings.setdefault(name, value)
 
-        self.session = httpx.Client(
-            headers=default_headers,
-            timeout=httpx.Timeout(timeout=30)
+        self._client_params = dict(
+            headers={'User-Agent': f'python-unicaps/{__version__}'},
+            http2=self.settings['http2'],
+            limits=httpx.Limits(
+                max_connections=self.settings['max_connections'],
+                max_keepalive_connections=self.settings['max_keepalive_connections'],
+                keepalive_expiry=self.settings['keepalive_expiry']
+            ),
+            timeout=httpx.Timeout(
+                connect=self.settings['connect_timeout'],
+                read=self.settings['read_timeout'],
+                write=self.settings['write_timeout'],
+                pool=self.settings['pool_timeout']
+            )
         )
-        self.session_async = httpx.AsyncClient(
-            headers=default_headers,
-            timeout=httpx.Timeout(timeout=30)
+
+        # the clients are created on the first use
+        self._session: Optional[httpx.Client] = None
+        self._session_async: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+        self._retry_budget = RetryBudget(self.settings['retry_budget_ratio'],
+                                         self.settings['retry_budget_min'])
+
+    @property
+    def session(self) -> httpx.Client:
+        """ HTTP client (sync) """
+
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = httpx.Client(**self._client_params)
+        return self._session
+
+    @session.setter
+    def session(self, value: httpx.Client):
+        self._session = value
+
+    @property
+    def session_async(self) -> httpx.AsyncClient:
+        """ HTTP client (async) """
+
+        if self._session_async is None:
+            with self._lock:
+                if self._session_async is None:
+                    self._session_async = httpx.AsyncClient(**self._client_params)
+        return self._session_async
+
+    @session_async.setter
+    def session_async(self, value: httpx.AsyncClient):
+        self._session_async = value
+
+    def _get_retry_delay(self, error: NetworkError, request: Optional[BaseRequest],
+                         attempt: int) -> Optional[float]:
+        """ Get the delay before the next attempt (None if the request mustn't be retried) """
+
+        if attempt >= self.settings['max_retries']:
+            return None
+
+        idempotent = getattr(request, 'idempotent', True)
+        cause = error.__cause__
+        retry_after = None
+        if isinstance(cause, httpx.HTTPStatusError):
+            status_code = cause.response.status_code
+            if status_code in HTTP_RETRY_REFUSED_STATUSES:
+                retry_after = _parse_retry_after(cause.response.headers.get('Retry-After'))
+            elif not idempotent or status_code not in HTTP_RETRY_STATUS_FORCELIST:
+                return None
+        elif not isinstance(cause, HTTP_RETRY_CONNECT_ERRORS):
+            # the request might have been processed
+            if not idempotent or not isinstance(cause, httpx.TransportError):
+                return None
+
+        if not self._retry_budget.withdraw():
+            return None
+
+        if retry_after is not None:
+            return min(retry_after, self.settings['backoff_max'])
+        # exponential backoff with full jitter
+        return random.uniform(
+            0, min(self.settings['backoff_max'], self.settings['backoff_factor'] * 2 ** attempt)
         )
 
-    def _make_request(self, request_data: Dict) -> httpx.Response:
+    def _make_request(self, request_data: Dict,
+                      request: Optional[BaseRequest] = None) -> httpx.Response:
+        handle_http_errors = self._handles_http_errors(request)
+        self._retry_budget.deposit()
+        attempt = 0
+        while True:
+            start_time = timer()
+            try:
+                response = self._send(request_data, handle_http_errors)
+            except NetworkError as exc:
+                if self.metrics is not None:
+                    self._record_request(request_data, start_time, exc)
+                delay = self._get_retry_delay(exc, request, attempt)
+                if delay is None:
+                    raise
+            else:
+                if self.metrics is not None:
+                    self._record_request(request_data, start_time, response)
+                return response
+            attempt += 1
+            time.sleep(delay)
+
+    async def _make_request_async(self, request_data: Dict,
+                                  request: Optional[BaseRequest] = None) -> httpx.Response:
+        handle_http_errors = self._handles_http_errors(request)
+        self._retry_budget.deposit()
+        attempt = 0
+        while True:
+            start_time = timer()
+            try:
+                response = await self._send_async(request_data, handle_http_errors)
+            except NetworkError as exc:
+                if self.metrics is not None:
+                    self._record_request(request_data, start_time, exc)
+                delay = self._get_retry_delay(exc, request, attempt)
+                if delay is None:
+                    raise
+            else:
+                if self.metrics is not None:
+                    self._record_request(request_data, start_time, response)
+                return response
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _record_request(self, request_data: Dict, start_time: float,
+                        result: Union[httpx.Response, NetworkError]) -> None:
+        """ Record the duration and the status code (or error) of an attempt """
+
+        if isinstance(result, httpx.Response):
+            status = str(result.status_code)
+        elif isinstance(result.__cause__, httpx.HTTPStatusError):
+            status = str(result.__cause__.response.status_code)
+        else:
+            status = type(result.__cause__ or result).__name__
+
+        url = urlsplit(request_data['url'])
+        labels = (('host', url.hostname or ''), ('path', url.path))
+        metrics = self.metrics
+        metrics.observe('unicaps_http_request_duration_seconds', labels,  # type: ignore
+                        timer() - start_time)
+        metrics.inc('unicaps_http_requests_total', labels + (('status', status),))  # type: ignore
+
+    def _handles_http_errors(self, request: Optional[BaseRequest]) -> bool:
+        return self.settings['handle_http_errors'] and getattr(request, 'handle_http_errors', True)
+
+    def _send(self, request_data: Dict, handle_http_errors: bool = True) -> httpx.Response:
         if 'headers' not in request_data:
             request_data['headers'] = {}
 
@@ -50,7 +269,7 @@ class StandardHTTPTransport(BaseTransport):  # pylint: disable=too-few-public-me
         except httpx.RequestError as exc:
             raise NetworkError('RequestError') from exc
 
-        if self.settings['handle_http_errors']:
+        if handle_http_errors:
             try:
                 response.raise_for_status()
             except httpx.HTTPStatusError as exc:
@@ -58,7 +277,8 @@ class StandardHTTPTransport(BaseTransport):  # pylint: disable=too-few-public-me
 
         return response
 
-    async def _make_request_async(self, request_data: Dict) -> httpx.Response:
+    async def _send_async(self, request_data: Dict,
+                          handle_http_errors: bool = True) -> httpx.Response:
         if 'headers' not in request_data:
             request_data['headers'] = {}
 
@@ -69,7 +289,7 @@ class StandardHTTPTransport(BaseTransport):  # pylint: disable=too-few-public-me
         except httpx.RequestError as exc:
             raise NetworkError('RequestError') from exc
 
-        if self.settings['handle_http_errors']:
+        if handle_http_errors:
             try:
                 response.raise_for_status()
             except httpx.HTTPStatusError as exc:
@@ -79,16 +299,41 @@ class StandardHTTPTransport(BaseTransport):  # pylint: disable=too-few-public-me
 
     def close(self):
         """ Close connections """
-        self.session.close()
+
+        session, self._session = self._session, None
+        if session is not None:
+            session.close()
+
+        session_async, self._session_async = self._session_async, None
+        if session_async is not None:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:  # no running event loop
+                try:
+                    asyncio.run(session_async.aclose())
+                except RuntimeError:  # the connections are bound to a closed event loop
+                    pass
+            else:
+                asyncio.ensure_future(session_async.aclose())
 
     async def close_async(self):
         """ Close connections (async) """
-        await self.session_async.aclose()
+
+        session, self._session = self._session, None
+        if session is not None:
+            session.close()
+
+        session_async, self._session_async = self._session_async, None
+        if session_async is not None:
+            await session_async.aclose()
 
 
 class HTTPRequestJSON(BaseRequest):
     """ HTTP Request that returns JSON response """
 
+    # raise NetworkError on 4xx and 5xx status codes (if the transport settings allow it)
+    handle_http_errors = True
+
     def prepare(self, **kwargs) -> Dict:
         """ Prepares request """
 
@@ -0,0 +1,165 @@
+# -*- coding: UTF-8 -*-
+"""
+Pingback (callback) receiver
+"""
+
+import asyncio
+import hmac
+import json
+import threading
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from ..exceptions import UnicapsException
+
+PINGBACK_MAX_BODY_SIZE = 1024 * 1024  # bytes
+PINGBACK_READ_TIMEOUT = 10  # seconds
+
+
+class PingbackReceiver:
+    """
+    Embedded HTTP server receiving the solutions sent by a solving service to the pingback URL.
+    It runs an asyncio event loop in a background thread and calls the handler
+    with the task ID and the code (solution or error) of every valid callback.
+
+    The callbacks are accepted only on the path ending with the secret token, so other hosts
+    able to reach the port can't inject solutions without knowing the pingback URL.
+
+    :param handler: Callable accepting the task ID and the code.
+    :param host: (optional) Host to listen on.
+    :param port: (optional) Port to listen on (0 - pick any free port).
+    :param path: (optional) URL path of the callbacks (other paths get 404).
+    :param token: (optional) Secret token, the last segment of the path of the callbacks.
+    """
+
+    def __init__(self, handler: Callable[[str, str], None], host: str = '127.0.0.1',
+                 port: int = 0, path: str = '/', token: Optional[str] = None):
+        self._handler = handler
+        self._host = host
+        self._port = port
+        self._path = get_pingback_path(path, token)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        """ Port the receiver listens on """
+        return self._port
+
+    def start(self) -> None:
+        """ Start the receiver (returns when it's ready to accept the callbacks) """
+
+        if self._thread is not None:
+            return
+
+        started = threading.Event()
+        errors = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._server = self._loop.run_until_complete(
+                    asyncio.start_server(self._handle_connection, self._host, self._port)
+                )
+            except OSError as exc:
+                errors.append(exc)
+                self._loop.close()
+                started.set()
+                return
+
+            self._port = self._server.sockets[0].getsockname()[1]
+            started.set()
+            try:
+                self._loop.run_forever()
+            finally:
+                self._server.close()
+                self._loop.run_until_complete(self._server.wait_closed())
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name='unicaps-pingback', daemon=True)
+        self._thread.start()
+        started.wait()
+
+        if errors:
+            self._thread = None
+            raise UnicapsException(f"Unable to start the pingback receiver: {errors[0]}")
+
+    def close(self) -> None:
+        """ Stop the receiver """
+
+        if self._thread is None:
+            return
+
+        self._loop.call_soon_threadsafe(self._loop.stop)  # type: ignore
+        self._thread.join()
+        self._thread = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter):
+        try:
+            status = await asyncio.wait_for(self._handle_request(reader), PINGBACK_READ_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                ValueError):
+            status = '400 Bad Request'
+        except Exception:  # pylint: disable=broad-except
+            # the handler failed: the service retries the callback or the task is polled
+            status = '500 Internal Server Error'
+
+        body = status.split(' ', maxsplit=1)[1].encode()
+        writer.write(
+            f'HTTP/1.1 {status}\r\nContent-Type: text/plain\r\n'
+            f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def _handle_request(self, reader: asyncio.StreamReader) -> str:
+        head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+        request_line, *header_lines = head.split('\r\n')
+        method, target, _ = request_line.split(' ', maxsplit=2)
+        headers = {}
+        for line in header_lines:
+            if ':' in line:
+                name, value = line.split(':', maxsplit=1)
+                headers[name.strip().lower()] = value.strip()
+
+        url = urlsplit(target)
+        if not hmac.compare_digest(url.path.encode(), self._path.encode()):
+            return '404 Not Found'
+        if method not in ('GET', 'POST'):
+            return '405 Method Not Allowed'
+
+        params = dict(parse_qsl(url.query))
+        content_length = int(headers.get('content-length', 0))
+        if content_length > PINGBACK_MAX_BODY_SIZE:
+            return '413 Payload Too Large'
+        if content_length:
+            body = await reader.readexactly(content_length)
+            params.update(self._parse_body(body, headers.get('content-type', '')))
+
+        if not params.get('id') or 'code' not in params:
+            return '400 Bad Request'
+
+        self._handler(str(params['id']), str(params['code']))
+        return '200 OK'
+
+    @staticmethod
+    def _parse_body(body: bytes, content_type: str) -> Dict:
+        if content_type.startswith('application/json'):
+            data = json.loads(body)
+            if not isinstance(data, dict):
+                raise ValueError("JSON object is expected")
+            return data
+        return dict(parse_qsl(body.decode()))
+
+
+def get_pingback_path(path: str, token: Optional[str] = None) -> str:
+    """ URL path of the callbacks: the path with the token appended as the last segment """
+
+    if not token:
+        return path or '/'
+    return path.rstrip('/') + '/' + token
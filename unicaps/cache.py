@@ -0,0 +1,14 @@
+# -*- coding: UTF-8 -*-
+"""
+Solution cache
+~~~~~~~~~~~~~~
+"""
+
+# pylint: disable=unused-import,import-error
+from ._service.cache import MemorySolutionCache, SolutionCache, SQLiteSolutionCache
+
+__all__ = (
+    'SolutionCache',
+    'MemorySolutionCache',
+    'SQLiteSolutionCache'
+)
@@ -4,9 +4,15 @@ Supported CAPTCHAs
 ~~~~~~~~~~~~~~~~~~
 """
 
+from typing import TYPE_CHECKING
+
 # pylint: disable=unused-import,import-error
-from ._captcha import (ImageCaptcha, TextCaptcha, RecaptchaV2, RecaptchaV3, HCaptcha, FunCaptcha,
-                       KeyCaptcha, GeeTest, GeeTestV4, CapyPuzzle, TikTokCaptcha, CaptchaType)
+from . import _captcha
+from ._captcha import CaptchaType, CAPTCHA_REGISTRY
+
+if TYPE_CHECKING:
+    from ._captcha import (ImageCaptcha, TextCaptcha, RecaptchaV2, RecaptchaV3, HCaptcha,
+                           FunCaptcha, KeyCaptcha, GeeTest, GeeTestV4, CapyPuzzle, TikTokCaptcha)
 
 __all__ = (
     'ImageCaptcha',
@@ -20,5 +26,17 @@ __all__ = (
     'GeeTestV4',
     'CapyPuzzle',
     'TikTokCaptcha',
-    'CaptchaType'
+    'CaptchaType',
+    'CAPTCHA_REGISTRY'
 )
+
+
+def __getattr__(name: str):
+    # the CAPTCHA classes are imported on the first use
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(_captcha, name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
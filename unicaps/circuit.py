@@ -0,0 +1,14 @@
+# -*- coding: UTF-8 -*-
+"""
+Circuit breaker
+~~~~~~~~~~~~~~~
+"""
+
+# pylint: disable=unused-import,import-error
+from ._service.circuit import CircuitBreaker, CircuitEvent, CircuitState
+
+__all__ = (
+    'CircuitBreaker',
+    'CircuitEvent',
+    'CircuitState'
+)
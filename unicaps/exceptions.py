@@ -62,6 +62,16 @@ class SolutionWaitTimeout(ServiceError):
     """
 
 
+class CircuitOpenError(ServiceError):
+    """
+    The service keeps failing for the CAPTCHA type, the request isn't sent
+    """
+
+    def __init__(self, message: str = '', retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 class TooManyRequestsError(ServiceError):
     """
     Exceeded request limit
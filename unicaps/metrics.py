@@ -0,0 +1,14 @@
+# -*- coding: UTF-8 -*-
+"""
+Metrics
+~~~~~~~
+"""
+
+# pylint: disable=unused-import,import-error
+from ._misc.metrics import METRICS, MetricsSink, PrometheusMetrics
+
+__all__ = (
+    'METRICS',
+    'MetricsSink',
+    'PrometheusMetrics'
+)
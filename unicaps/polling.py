@@ -0,0 +1,13 @@
+# -*- coding: UTF-8 -*-
+"""
+Polling strategies
+~~~~~~~~~~~~~~~~~~
+"""
+
+# pylint: disable=unused-import,import-error
+from ._service.polling import PollingStrategy, AdaptivePollingStrategy
+
+__all__ = (
+    'PollingStrategy',
+    'AdaptivePollingStrategy'
+)
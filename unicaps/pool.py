@@ -0,0 +1,13 @@
+# -*- coding: UTF-8 -*-
+"""
+Token pool
+~~~~~~~~~~
+"""
+
+# pylint: disable=unused-import,import-error
+from ._pool import TokenPool, TokenPoolStats
+
+__all__ = (
+    'TokenPool',
+    'TokenPoolStats'
+)
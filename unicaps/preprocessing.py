@@ -0,0 +1,13 @@
+# -*- coding: UTF-8 -*-
+"""
+Image pre-processing
+~~~~~~~~~~~~~~~~~~~~
+"""
+
+# pylint: disable=unused-import,import-error
+from ._captcha.image_pipeline import ImagePipeline, ImagePipelineStats
+
+__all__ = (
+    'ImagePipeline',
+    'ImagePipelineStats'
+)
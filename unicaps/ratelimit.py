@@ -0,0 +1,14 @@
+# -*- coding: UTF-8 -*-
+"""
+Rate limiting
+~~~~~~~~~~~~~
+"""
+
+# pylint: disable=unused-import,import-error
+from ._service.ratelimit import RateLimit, RateLimiter, RateLimitStats
+
+__all__ = (
+    'RateLimiter',
+    'RateLimit',
+    'RateLimitStats'
+)
@@ -0,0 +1,15 @@
+# -*- coding: UTF-8 -*-
+"""
+Routing between several services
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+# pylint: disable=unused-import,import-error
+from ._router import Scoreboard, HedgingPolicy, HedgingStats, FAILOVER_EXCEPTIONS
+
+__all__ = (
+    'Scoreboard',
+    'HedgingPolicy',
+    'HedgingStats',
+    'FAILOVER_EXCEPTIONS'
+)
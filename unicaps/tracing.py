@@ -0,0 +1,15 @@
+# -*- coding: UTF-8 -*-
+"""
+Tracing
+~~~~~~~
+"""
+
+# pylint: disable=unused-import,import-error
+from ._misc.tracing import HookTracer, OpenTelemetryTracer, Span, Tracer
+
+__all__ = (
+    'HookTracer',
+    'OpenTelemetryTracer',
+    'Span',
+    'Tracer'
+)
@@ -0,0 +1,10 @@
+# -*- coding: UTF-8 -*-
+"""
+Transport
+~~~~~~~~~
+"""
+
+# pylint: disable=unused-import,import-error
+from ._transport.http_transport import StandardHTTPTransport
+
+__all__ = 'StandardHTTPTransport',